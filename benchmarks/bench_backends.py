@@ -0,0 +1,61 @@
+"""Throughput of ast.parse for each backend on the same sources.
+
+The synthetic source is in standard Lua, which all the backends parse.
+A source a backend cannot parse is reported instead of timed. "same" is
+"yes" when the tree equals the one of the builder backend with
+comments=False.
+
+usage: python -m benchmarks.bench_backends [file|directory ...]
+"""
+import gc
+import sys
+import time
+
+from luaparser import ast, backends
+from luaparser.builder import SyntaxException
+from benchmarks.corpus import load_sources, synthetic_source
+
+N_FUNCTIONS = 100
+REPEAT = 3
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    sources = load_sources(sys.argv[1:]) if sys.argv[1:] else [
+        ("synthetic", synthetic_source(N_FUNCTIONS, dialect=False))
+    ]
+    for name, source in sources:
+        lines = source.count("\n") + 1
+        print(name, "(%d lines)" % lines)
+        expected = ast.parse(source, comments=False)
+        for backend in sorted(backends.BACKENDS):
+            try:
+                tree = ast.parse(source, comments=False, backend=backend)
+            except SyntaxException as e:
+                print("  %-8s %s" % (backend, e))
+                continue
+            elapsed = best_time(lambda: ast.parse(source, backend=backend))
+            print(
+                "  %-8s %8.1fms %9.0f lines/s %8.0f KiB/s  same: %s"
+                % (
+                    backend,
+                    elapsed * 1000,
+                    lines / elapsed,
+                    len(source) / 1024 / elapsed,
+                    "yes" if tree == expected else "no",
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
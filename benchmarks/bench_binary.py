@@ -0,0 +1,57 @@
+"""Size and encode/decode time of a tree as binary, JSON and pickle.
+
+JSON cannot be read back into nodes, its decode time is json.loads only.
+The binary and pickle encodings keep the token positions, the JSON one
+does not.
+
+usage: python -m benchmarks.bench_binary [file|directory ...]
+"""
+import gc
+import json
+import pickle
+import sys
+import time
+
+from luaparser import ast
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 5
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    formats = [
+        ("binary", ast.dump_binary, ast.load_binary),
+        ("json", lambda tree: ast.to_pretty_json(tree).encode(), json.loads),
+        (
+            "pickle",
+            lambda tree: pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL),
+            pickle.loads,
+        ),
+    ]
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        tree = ast.parse(source)
+        print(name, "(%d lines, %d bytes)" % (source.count("\n"), len(source)))
+        for label, encode, decode in formats:
+            data = encode(tree)
+            encode_time = best_time(lambda: encode(tree))
+            decode_time = best_time(lambda: decode(data))
+            print(
+                "  %-7s %10d bytes %8.1fms encode %8.1fms decode"
+                % (label, len(data), encode_time * 1000, decode_time * 1000)
+            )
+
+
+if __name__ == "__main__":
+    main()
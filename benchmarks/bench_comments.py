@@ -0,0 +1,122 @@
+"""Parse heavily commented sources with and without the hidden token pass.
+
+The uncached variant builds Comment nodes from the hidden tokens at every
+handle_hidden_left/right call, like Builder used to do, so backtracking
+over a comment rebuilds it. Reports the parse time and how many Comment
+nodes were created, with and without the packrat memo table.
+
+Then compares the default parse with a comments=False parse, with both
+lexers.
+
+usage: python -m benchmarks.bench_comments [file|directory ...]
+"""
+import gc
+import sys
+import time
+
+from luaparser import builder
+from luaparser.astnodes import Comment
+from luaparser.builder import Builder
+from luaparser.parser.LuaLexer import LuaLexer
+from benchmarks.corpus import load_sources, synthetic_source
+
+N_FUNCTIONS = 200
+REPEAT = 3
+
+
+def uncached_queue_hidden(self, first):
+    for t in self._stream.tokens[first : self._stream.next_default[first]]:
+        if t.type == LuaLexer.LINE_COMMENT:
+            self.comments.append(builder.Comment(t.text, first_token=t, last_token=t))
+        elif t.type == LuaLexer.COMMENT:
+            self.comments.append(builder.Comment(t.text, True, first_token=t, last_token=t))
+        elif t.type == LuaLexer.NEWLINE:
+            self.comments += t.text.count("\n") * [None]
+
+
+def no_hidden_gaps(self):
+    return None
+
+
+class CountingComment(Comment):
+    __slots__ = ()
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        CountingComment.created += 1
+        super().__init__(*args, **kwargs)
+
+
+def commented_source(n_functions: int) -> str:
+    """The synthetic source with comments around and inside every line."""
+    lines = []
+    for i, line in enumerate(synthetic_source(n_functions).splitlines()):
+        indent = line[: len(line) - len(line.lstrip())]
+        lines.append(indent + "-- before line %d" % i)
+        if i % 5 == 0:
+            lines.append(indent + "--[[ block comment\n%s   on two lines ]]" % indent)
+        if line.strip() and not line.strip().startswith("--"):
+            line += " -- after line %d" % i
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    sources = load_sources(sys.argv[1:]) if sys.argv[1:] else [
+        ("commented synthetic", commented_source(N_FUNCTIONS)),
+        ("synthetic", synthetic_source(N_FUNCTIONS)),
+    ]
+    cached = (Builder._queue_hidden, Builder._hidden_gaps)
+    builder.Comment = CountingComment
+    try:
+        for name, source in sources:
+            print(name, "(%d lines)" % source.count("\n"))
+            for packrat in (True, False):
+                timings = []
+                for label, (queue_hidden, hidden_gaps) in [
+                    ("uncached", (uncached_queue_hidden, no_hidden_gaps)),
+                    ("cached", cached),
+                ]:
+                    Builder._queue_hidden, Builder._hidden_gaps = queue_hidden, hidden_gaps
+                    CountingComment.created = 0
+                    Builder(source, packrat=packrat, fast_lexer=True).process()
+                    created = CountingComment.created
+                    elapsed = best_time(
+                        lambda: Builder(source, packrat=packrat, fast_lexer=True).process()
+                    )
+                    timings.append(elapsed)
+                    print(
+                        "  packrat=%-5s %-8s %8.1fms %8d Comment nodes"
+                        % (packrat, label, elapsed * 1000, created)
+                    )
+                print("  packrat=%-5s speedup %.2fx" % (packrat, timings[0] / timings[1]))
+    finally:
+        Builder._queue_hidden, Builder._hidden_gaps = cached
+        builder.Comment = Comment
+
+    for name, source in sources:
+        print(name, "comments=False")
+        for fast_lexer in (False, True):
+            timings = [
+                best_time(lambda: Builder(source, fast_lexer=fast_lexer, comments=comments).process())
+                for comments in (True, False)
+            ]
+            print(
+                "  fast_lexer=%-5s %8.1fms -> %8.1fms (%.2fx)"
+                % (fast_lexer, timings[0] * 1000, timings[1] * 1000, timings[0] / timings[1])
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Time and peak memory of the JSON export, json.dumps vs JSONWriter.
+
+The json.dumps variant is the to_pretty_json code used before the
+document was streamed: it builds the whole text, then writes it. Both
+write to a temporary file. The peak memory is the one tracemalloc sees
+on top of the parsed tree.
+
+usage: python -m benchmarks.bench_json [file|directory ...]
+"""
+import gc
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from luaparser import ast
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 3
+
+
+def dumps_to_file(tree, out, indent):
+    out.write(json.dumps(tree, cls=ast.JSONEncoder, indent=indent))
+
+
+def stream_to_file(tree, out, indent):
+    ast.to_pretty_json(tree, indent=indent, out=out)
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_kb(fn) -> int:
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak // 1024
+
+
+def main():
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        tree = ast.parse(source)
+        print(name, "(%d lines)" % source.count("\n"))
+        for indent in (4, None):
+            for label, export in [("json.dumps", dumps_to_file), ("JSONWriter", stream_to_file)]:
+                with tempfile.TemporaryFile("w") as out:
+                    run = lambda: export(tree, out, indent)  # noqa: E731
+                    elapsed = best_time(run)
+                    peak = peak_kb(run)
+                print(
+                    "  indent=%-4s %-10s %8.1fms %10d KiB peak"
+                    % (indent, label, elapsed * 1000, peak)
+                )
+
+
+if __name__ == "__main__":
+    main()
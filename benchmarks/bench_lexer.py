@@ -0,0 +1,71 @@
+"""Lexing throughput of the antlr LuaLexer and the hand-written FastLuaLexer.
+
+Both lexers fill a CommonTokenStream, like Builder does; the whole parse
+is timed too.
+
+usage: python -m benchmarks.bench_lexer [file|directory ...]
+"""
+import gc
+import sys
+import time
+
+from antlr4 import CommonTokenStream, InputStream
+
+from luaparser.builder import Builder
+from luaparser.lexer import FastLuaLexer
+from luaparser.parser.LuaLexer import LuaLexer
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 5
+
+LEXERS = [
+    ("antlr", lambda source: LuaLexer(InputStream(source))),
+    ("fast", FastLuaLexer),
+]
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def lex(make_lexer, source: str) -> int:
+    stream = CommonTokenStream(make_lexer(source))
+    stream.fill()
+    return len(stream.tokens)
+
+
+def main():
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        lines = source.count("\n")
+        print(name, "(%d lines, %d chars)" % (lines, len(source)))
+        lex_times = {}
+        parse_times = {}
+        for label, make_lexer in LEXERS:
+            # warm up the antlr lexer DFA cache
+            tokens = lex(make_lexer, source)
+            lex_times[label] = elapsed = best_time(lambda: lex(make_lexer, source))
+            print(
+                "  lex   %-6s %8.1fms %10.0f tokens/s %8.0f lines/s"
+                % (label, elapsed * 1000, tokens / elapsed, lines / elapsed)
+            )
+        for label, fast_lexer in [("antlr", False), ("fast", True)]:
+            parse_times[label] = elapsed = best_time(
+                lambda: Builder(source, fast_lexer=fast_lexer).process()
+            )
+            print("  parse %-6s %8.1fms %10.0f lines/s" % (label, elapsed * 1000, lines / elapsed))
+        print(
+            "  speedup: lex %.2fx, parse %.2fx"
+            % (lex_times["antlr"] / lex_times["fast"], parse_times["antlr"] / parse_times["fast"])
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Time ast.to_lua_source, to a string and streamed to a file.
+
+The handler table of LuaOutputVisitor is compared with the multimethod
+dispatch it replaced, rebuilt here from the same emit_ methods.
+
+Also renders nested do ... end blocks of growing depth: with a linear
+emitter the time per output line stays flat as the depth grows.
+
+usage: python -m benchmarks.bench_lua_output [file|directory ...]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+
+from multimethod import multimethod
+
+from luaparser import ast
+from luaparser.astnodes import Expression
+from luaparser.printers import LuaOutputVisitor
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 5
+DEPTHS = [5, 25, 50, 100]
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def multimethod_visitor_class():
+    handlers = [
+        getattr(LuaOutputVisitor, name)
+        for name in dir(LuaOutputVisitor)
+        if name.startswith("emit_")
+    ]
+    emit = multimethod(handlers[0])
+    for handler in handlers[1:]:
+        emit.register(handler)
+
+    class MultimethodLuaOutputVisitor(LuaOutputVisitor):
+        def do_emit(self, node):
+            if isinstance(node, Expression) and node.wrapped:
+                self._write("(")
+                self.emit(node)
+                self._write(")")
+            else:
+                self.emit(node)
+
+    MultimethodLuaOutputVisitor.emit = emit
+    return MultimethodLuaOutputVisitor
+
+
+def nested_source(depth: int, width: int = 20) -> str:
+    """depth nested do blocks, each holding width statements."""
+    lines = []
+    for level in range(depth):
+        lines.extend("x%d = y + %d" % (level, i) for i in range(width))
+        lines.append("do")
+    lines.extend("end" for _ in range(depth))
+    return "\n".join(lines)
+
+
+def to_file(tree, path):
+    with open(path, "w") as f:
+        ast.to_lua_source(tree, out=f)
+
+
+def main():
+    fd, path = tempfile.mkstemp(suffix=".lua")
+    os.close(fd)
+    reference = multimethod_visitor_class()
+    try:
+        for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+            tree = ast.parse(source)
+            lines = ast.to_lua_source(tree).count("\n") + 1
+            assert reference(indent_size=4).visit(tree) == ast.to_lua_source(tree)
+            print(name, "(%d output lines)" % lines)
+            for label, fn in [
+                ("multimethod", lambda: reference(indent_size=4).visit(tree)),
+                ("string", lambda: ast.to_lua_source(tree)),
+                ("file", lambda: to_file(tree, path)),
+            ]:
+                elapsed = best_time(fn)
+                print("  %-12s %8.1fms %10.0f lines/s" % (label, elapsed * 1000, lines / elapsed))
+
+        print("nested blocks")
+        for depth in DEPTHS:
+            tree = ast.parse(nested_source(depth))
+            lines = ast.to_lua_source(tree).count("\n") + 1
+            elapsed = best_time(lambda: ast.to_lua_source(tree))
+            print(
+                "  depth %-4d %6d lines %8.1fms %6.2fus/line"
+                % (depth, lines, elapsed * 1000, elapsed / lines * 1e6)
+            )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
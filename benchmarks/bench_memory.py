@@ -0,0 +1,111 @@
+"""Peak RSS of a parse, with the AST kept alive, and size of the AST.
+
+The AST size is measured with tracemalloc while unpickling a copy of it.
+
+Every source is parsed in a fresh interpreter so ru_maxrss is not polluted
+by a previous run. With --legacy, nodes keep a stream-less clone of their
+first and last tokens, like before position records were introduced.
+
+usage: python -m benchmarks.bench_memory [--legacy] [file|directory ...]
+"""
+import gc
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+
+
+def _cloned_token(token):
+    if token is None:
+        return None
+    token = token.clone()
+    token.source = token.EMPTY_SOURCE
+    return token
+
+
+def _use_cloned_tokens(astnodes):
+    init = astnodes.Node.__init__
+
+    def cloning_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        # first and last tokens used to be cloned separately
+        if self._last_position is self._first_position:
+            self._last_position = _cloned_token(self._first_position)
+
+    astnodes._position = _cloned_token
+    astnodes.Node.__init__ = cloning_init
+
+
+def _max_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _tree_size_kb(tree) -> int:
+    """Memory allocated to rebuild tree from a pickle."""
+    data = pickle.dumps(tree)
+    gc.collect()
+    tracemalloc.start()
+    copy = pickle.loads(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copy
+    return size // 1024
+
+
+def child(path: str, legacy: bool):
+    from luaparser import ast, astnodes
+
+    if legacy:
+        _use_cloned_tokens(astnodes)
+
+    with open(path) as f:
+        source = f.read()
+    gc.collect()
+    before = _max_rss_kb()
+    tree = ast.parse(source)
+    gc.collect()
+    peak = _max_rss_kb()
+    nodes = sum(isinstance(o, astnodes.Node) for o in gc.get_objects())
+    print(before, peak, _tree_size_kb(tree), nodes)
+
+
+def measure(source: str, legacy: bool = False):
+    """Return (rss before parse, peak rss, tree size, node count), sizes in KiB."""
+    with tempfile.NamedTemporaryFile("w", suffix=".lua") as f:
+        f.write(source)
+        f.flush()
+        args = [sys.executable, "-m", "benchmarks.bench_memory", "--child", f.name]
+        if legacy:
+            args.append("--legacy")
+        output = subprocess.check_output(args, universal_newlines=True)
+    return tuple(int(v) for v in output.split())
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "--child":
+        child(args[1], "--legacy" in args)
+        return
+    variants = [("tokens", True), ("positions", False)]
+    if "--legacy" in args:
+        args.remove("--legacy")
+        variants = variants[:1]
+
+    for name, source in load_sources(args, n_functions=N_FUNCTIONS):
+        print(name, "(%d lines)" % source.count("\n"))
+        for label, legacy in variants:
+            before, peak, tree, nodes = measure(source, legacy)
+            print(
+                "  %-10s peak %7d KiB, parse +%7d KiB, tree %7d KiB, %d nodes"
+                % (label, peak, peak - before, tree, nodes)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare Builder with and without the packrat memo table.
+
+Counts how many times the parse_var and parse_expr rule bodies really run
+(memo hits are not counted) and the best parse time out of a few runs.
+
+usage: python -m benchmarks.bench_packrat [file|directory ...]
+"""
+import sys
+import time
+from collections import Counter
+
+from luaparser import builder
+from luaparser.builder import Builder
+from benchmarks.corpus import load_sources
+
+COUNTED_RULES = {"parse_var_chain": "parse_var", "parse_expr": "parse_expr"}
+REPEAT = 5
+
+
+def _install_counters(counter: Counter):
+    for attr, label in COUNTED_RULES.items():
+        rule = getattr(Builder, attr).__wrapped__
+
+        def counting(self, _rule=rule, _label=label):
+            counter[_label] += 1
+            return _rule(self)
+
+        counting.__name__ = rule.__name__
+        setattr(Builder, attr, builder.memoize(counting))
+
+
+def main():
+    counter = Counter()
+    _install_counters(counter)
+
+    for name, source in load_sources(sys.argv[1:]):
+        print(name, "(%d lines)" % source.count("\n"))
+        # warm up the antlr lexer DFA cache
+        Builder(source).process()
+        results = {}
+        for packrat in (False, True):
+            timings = []
+            for _ in range(REPEAT):
+                counter.clear()
+                start = time.perf_counter()
+                Builder(source, packrat=packrat).process()
+                timings.append(time.perf_counter() - start)
+            results[packrat] = (min(timings), dict(counter))
+
+        for label in COUNTED_RULES.values():
+            before, after = results[False][1][label], results[True][1][label]
+            print(
+                "  %-10s %8d -> %8d runs (%.1fx fewer)"
+                % (label, before, after, before / max(after, 1))
+            )
+        before, after = results[False][0], results[True][0]
+        print("  %-10s %8.3fs -> %7.3fs (%.2fx)" % ("time", before, after, before / after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Time of ast.parse on one large source, serial vs cut in parts.
+
+The synthetic source has about 100k lines. "parts, 1 job" parses the
+parts one after the other in this process: it is the cost of the cut
+and of the join. The pool runs one process per CPU, its speedup depends
+on the number of CPUs.
+
+usage: python -m benchmarks.bench_parallel [file|directory ...]
+"""
+import gc
+import os
+import sys
+import time
+
+from luaparser import ast, parallel
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 2600
+REPEAT = 1
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    jobs = os.cpu_count() or 1
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        parts = parallel.split(source)
+        print(name, "(%d lines, %d parts, %d CPUs)" % (source.count("\n"), len(parts), jobs))
+        for label, run in [
+            ("serial", lambda: ast.parse(source)),
+            ("parts, 1 job", lambda: parallel.parse(source, jobs=1)),
+            ("pool of %d" % jobs, lambda: parallel.parse(source, jobs=jobs)),
+        ]:
+            print("  %-14s %8.1fms" % (label, best_time(run) * 1000))
+
+
+if __name__ == "__main__":
+    main()
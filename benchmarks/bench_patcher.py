@@ -0,0 +1,66 @@
+"""Throughput of lua_patcher, one regex search per rule vs LinePatcher.
+
+The per rule variant is the fix_line loop used before LinePatcher: every
+pattern is searched in every line. The synthetic source uses ``+=`` for
+its increments so that every rule has lines to patch. Both variants are
+checked to give the same lines.
+
+usage: python -m benchmarks.bench_patcher [file|directory ...]
+"""
+import gc
+import re
+import sys
+import time
+
+import lua_patcher
+from lua_patcher import LinePatcher
+from benchmarks.corpus import load_sources, synthetic_source
+
+N_FUNCTIONS = 500
+REPEAT = 5
+
+
+def per_rule_fix_line(line):
+    corrected_line = line
+    for pattern, func in lua_patcher.patterns.items():
+        match = re.search(pattern, line)
+        if match:
+            corrected_line = func(line, match)
+    return corrected_line
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    sources = load_sources(sys.argv[1:]) if sys.argv[1:] else [
+        ("synthetic", synthetic_source(N_FUNCTIONS).replace("x = x + 1", "x += 1"))
+    ]
+    for name, source in sources:
+        lines = source.splitlines(True)
+        print(name, "(%d lines)" % len(lines))
+        patcher = LinePatcher(lua_patcher.rules)
+        if [per_rule_fix_line(line) for line in lines] != [patcher.fix_line(line) for line in lines]:
+            print("  output differs")
+        timings = []
+        for label, fix_line in [("per rule", per_rule_fix_line), ("LinePatcher", patcher.fix_line)]:
+            elapsed = best_time(lambda: [fix_line(line) for line in lines])
+            timings.append(elapsed)
+            print("  %-12s %8.1fms %10.0f lines/s" % (label, elapsed * 1000, len(lines) / elapsed))
+        print("  speedup %.2fx" % (timings[0] / timings[1]))
+        patcher = LinePatcher(lua_patcher.rules)
+        for line in lines:
+            patcher.fix_line(line)
+        print("  hits", ", ".join("%s=%d" % item for item in patcher.hits.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Time of the generated parsers in full LL prediction mode vs SLL first,
+with a fallback to LL when SLL fails.
+
+"fallbacks" is the number of sources parsed twice. The synthetic source
+is in standard Lua. Only gen2 tries SLL first by default: with gen, SLL
+falls back on nearly every source, see gen_converter.SLL_FIRST.
+
+usage: python -m benchmarks.bench_prediction [file|directory ...]
+"""
+import gc
+import sys
+import time
+
+from luaparser import gen_converter
+from luaparser.builder import SyntaxException
+from benchmarks.corpus import load_sources, synthetic_source
+
+N_FUNCTIONS = 100
+REPEAT = 3
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    sources = load_sources(sys.argv[1:]) if sys.argv[1:] else [
+        ("synthetic", synthetic_source(N_FUNCTIONS, dialect=False))
+    ]
+    for name, source in sources:
+        print(name, "(%d lines)" % source.count("\n"))
+        for package in gen_converter.PACKAGES:
+            try:
+                gen_converter.parse(source, package)
+            except SyntaxException as e:
+                print("  %-5s %s" % (package, e))
+                continue
+            for label, sll in [("LL", False), ("SLL, LL", True)]:
+                gen_converter.counters.reset()
+                elapsed = best_time(lambda: gen_converter.parse(source, package, sll=sll))
+                print(
+                    "  %-5s %-8s %8.1fms  fallbacks: %d/%d"
+                    % (
+                        package,
+                        label,
+                        elapsed * 1000,
+                        gen_converter.counters.fallbacks,
+                        gen_converter.counters.parses,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
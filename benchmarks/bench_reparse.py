@@ -0,0 +1,65 @@
+"""Time of ast.parse on an edited source vs ast.reparse of the edit.
+
+Each edit inserts a statement in the body of one function, cycling
+through the functions of the source. The tree is kept from one edit to
+the next, like an editor would.
+
+usage: python -m benchmarks.bench_reparse [file|directory ...]
+"""
+import gc
+import re
+import sys
+import time
+
+from luaparser import ast
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+N_EDITS = 10
+EDIT = "local edited = 1\n  "
+
+_FUNCTION_BODY = re.compile(r"^ *(?:local +)?function\b[^\n]*\n( *)", re.MULTILINE)
+
+
+def edit_offsets(source: str):
+    """Offsets of the first statement of each function body."""
+    return [m.end() for m in _FUNCTION_BODY.finditer(source)]
+
+
+def main():
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        offsets = edit_offsets(source)
+        if not offsets:
+            print(name, "(no function)")
+            continue
+        step = max(1, len(offsets) // N_EDITS)
+        print(name, "(%d lines, %d edits)" % (source.count("\n"), len(offsets[::step])))
+
+        tree = ast.parse(source)
+        text = source
+        full = incremental = 0.0
+        reused = 0
+        # from the end, so that the offsets of the next edits stay valid
+        for offset in reversed(offsets[::step]):
+            gc.collect()
+            start = time.perf_counter()
+            ast.parse(text[:offset] + EDIT + text[offset:])
+            full += time.perf_counter() - start
+
+            gc.collect()
+            start = time.perf_counter()
+            new_tree = ast.reparse(tree, text, offset, offset, EDIT)
+            incremental += time.perf_counter() - start
+            reused += new_tree is tree
+            tree, text = new_tree, text[:offset] + EDIT + text[offset:]
+
+        edits = len(offsets[::step])
+        print("  ast.parse   %8.1fms per edit" % (full / edits * 1000))
+        print(
+            "  ast.reparse %8.1fms per edit, %d/%d in place"
+            % (incremental / edits * 1000, reused, edits)
+        )
+
+
+if __name__ == "__main__":
+    main()
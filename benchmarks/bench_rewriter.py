@@ -0,0 +1,55 @@
+"""Time of rendering a parsed tree with LuaOutputVisitor vs LuaRewriter,
+and the number of source lines each of them changes.
+
+Changed lines are the ones difflib reports as removed or added between
+the source and the output.
+
+usage: python -m benchmarks.bench_rewriter [file|directory ...]
+"""
+import difflib
+import gc
+import sys
+import time
+
+from luaparser import ast
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 3
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def changed_lines(source: str, output: str) -> int:
+    diff = difflib.unified_diff(source.splitlines(), output.splitlines(), lineterm="", n=0)
+    return sum(1 for line in diff if line[:1] in "+-" and line[:3] not in ("+++", "---"))
+
+
+def main():
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        tree = ast.parse(source)
+        print(name, "(%d lines)" % source.count("\n"))
+        renderers = [
+            ("full print", lambda: ast.to_lua_source(tree)),
+            ("rewrite", lambda: ast.to_lua_source(tree, source=source, original=tree)),
+            ("reparse", lambda: ast.to_lua_source(tree, source=source)),
+        ]
+        for label, render in renderers:
+            elapsed = best_time(render)
+            print(
+                "  %-10s %8.1fms %8d changed lines"
+                % (label, elapsed * 1000, changed_lines(source, render()))
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Compare parse_stat first-token dispatch with trying every statement in turn.
+
+Reports, per statement kind, the time spent in parse_stat excluding nested
+statements (e.g. a Function does not include its body statements). Both
+variants run alternately and the best run is kept for each kind. The
+number of backtracking points (Builder.save calls) is reported too, as it
+does not depend on machine noise.
+
+usage: python -m benchmarks.bench_stat_dispatch [file|directory ...]
+"""
+import gc
+import sys
+import time
+from collections import Counter, defaultdict
+
+from luaparser.builder import Builder, STATEMENTS
+from benchmarks.corpus import load_sources
+
+REPEAT = 5
+
+
+def sequential_parse_stat(self):
+    """parse_stat without the dispatch table."""
+    comments = self.get_comments()
+    for parse, _, _, keep_comments in STATEMENTS:
+        stat = parse(self)
+        if stat:
+            if keep_comments:
+                stat.comments = comments
+            return stat
+    return None
+
+
+def timed(parse_stat, timings, counts):
+    stack = []
+
+    def wrapper(self):
+        stack.append(0.0)
+        start = time.perf_counter()
+        stat = parse_stat(self)
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        kind = type(stat).__name__ if stat else "(end of block)"
+        timings[kind] += elapsed - nested
+        counts[kind] += 1
+        return stat
+
+    return wrapper
+
+
+def count_saves(source, parse_stat):
+    saves = 0
+    save = Builder.save
+
+    def counting_save(self):
+        nonlocal saves
+        saves += 1
+        save(self)
+
+    Builder.parse_stat, Builder.save = parse_stat, counting_save
+    try:
+        Builder(source).process()
+    finally:
+        Builder.save = save
+    return saves
+
+
+def measure(source, parse_stat, best):
+    timings, counts = defaultdict(float), Counter()
+    Builder.parse_stat = timed(parse_stat, timings, counts)
+    gc.collect()
+    Builder(source).process()
+    for kind, elapsed in timings.items():
+        best[kind] = min(best.get(kind, elapsed), elapsed)
+    return counts
+
+
+def main():
+    dispatch_parse_stat = Builder.parse_stat
+    try:
+        for name, source in load_sources(sys.argv[1:]):
+            print(name, "(%d lines)" % source.count("\n"))
+            # warm up the antlr lexer DFA cache
+            Builder(source).process()
+            sequential, dispatch = {}, {}
+            for _ in range(REPEAT):
+                counts = measure(source, sequential_parse_stat, sequential)
+                measure(source, dispatch_parse_stat, dispatch)
+
+            print("  %-16s %7s %12s %12s %8s" % ("statement", "count", "sequential", "dispatch", "speedup"))
+            for kind in sorted(sequential, key=sequential.get, reverse=True):
+                print(
+                    "  %-16s %7d %10.1fms %10.1fms %7.2fx"
+                    % (
+                        kind,
+                        counts[kind],
+                        sequential[kind] * 1000,
+                        dispatch[kind] * 1000,
+                        sequential[kind] / max(dispatch[kind], 1e-9),
+                    )
+                )
+            total_seq, total_dispatch = sum(sequential.values()), sum(dispatch.values())
+            print(
+                "  %-16s %7s %10.1fms %10.1fms %7.2fx"
+                % ("total", "", total_seq * 1000, total_dispatch * 1000, total_seq / total_dispatch)
+            )
+            saves_seq = count_saves(source, sequential_parse_stat)
+            saves_dispatch = count_saves(source, dispatch_parse_stat)
+            print(
+                "  %-16s %7s %12d %12d %7.2fx"
+                % ("save() calls", "", saves_seq, saves_dispatch, saves_seq / saves_dispatch)
+            )
+    finally:
+        Builder.parse_stat = dispatch_parse_stat
+
+
+if __name__ == "__main__":
+    main()
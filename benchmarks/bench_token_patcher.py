@@ -0,0 +1,54 @@
+"""Time to patch a source with TokenPatcher vs the parse and print path.
+
+The parse and print path is what main.py does: ast.parse then
+ast.to_lua_source, both with the antlr and the fast lexer. LinePatcher is
+shown for reference. The patched source is checked to parse to the same
+tree as the original one.
+
+usage: python -m benchmarks.bench_token_patcher [file|directory ...]
+"""
+import gc
+import sys
+import time
+
+import lua_patcher
+from lua_patcher import LinePatcher, TokenPatcher
+from luaparser import ast
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 3
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        print(name, "(%d lines)" % source.count("\n"))
+        patched = TokenPatcher().patch(source)
+        if ast.parse(patched, comments=False) != ast.parse(source, comments=False):
+            print("  patched source parses to another tree")
+
+        timings = {}
+        for label, patch in [
+            ("parse+print", lambda: ast.to_lua_source(ast.parse(source))),
+            ("parse+print fast lexer", lambda: ast.to_lua_source(ast.parse(source, fast_lexer=True))),
+            ("LinePatcher", lambda: LinePatcher(lua_patcher.rules).patch(source)),
+            ("TokenPatcher", lambda: TokenPatcher().patch(source)),
+        ]:
+            timings[label] = elapsed = best_time(patch)
+            print("  %-24s %8.1fms" % (label, elapsed * 1000))
+        print("  TokenPatcher speedup %.2fx" % (timings["parse+print fast lexer"] / timings["TokenPatcher"]))
+
+
+if __name__ == "__main__":
+    main()
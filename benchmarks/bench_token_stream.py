@@ -0,0 +1,86 @@
+"""Cost of Builder.next_is_rc on CommonTokenStream and ArrayTokenStream.
+
+Walks every default channel token of the source with next_is_rc, once
+with a matching type (consume) and once with a wrong one (miss), hidden
+tokens left aside. The CommonTokenStream variant is the next_is_rc code
+Builder used before the token store was materialized.
+
+usage: python -m benchmarks.bench_token_stream [file|directory ...]
+"""
+import gc
+import sys
+import time
+
+from antlr4 import CommonTokenStream
+
+from luaparser.builder import Builder
+from luaparser.lexer import FastLuaLexer
+from luaparser.stream import ArrayTokenStream
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 5
+
+
+def common_next_is_rc(self, type_to_seek, hidden_right=True):
+    token = self._stream.LT(1)
+    tok_type = token.type
+    self._right_index = self._stream.index
+
+    if tok_type == type_to_seek:
+        self.text = token.text
+        self.type = tok_type
+        self._stream.consume()
+        self._hidden_handled = False
+        if hidden_right:
+            self.handle_hidden_right()
+        return token
+    self._expected.append(type_to_seek)
+    return None
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def walk(builder, next_is_rc, types):
+    builder._stream.seek(0)
+    for tok_type in types:
+        next_is_rc(builder, -2, False)
+        next_is_rc(builder, tok_type, False)
+        builder._expected = []
+
+
+def main():
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        builder = Builder(source, fast_lexer=True)
+        store = builder._stream
+        types = [store.types[i] for i in sorted(set(store.next_default[:-1]))][:-1]
+        calls = 2 * len(types)
+        print(name, "(%d tokens, %d next_is_rc calls)" % (len(store.tokens), calls))
+
+        timings = {}
+        common = CommonTokenStream(FastLuaLexer(source))
+        common.fill()
+        for label, stream, next_is_rc in [
+            ("CommonTokenStream", common, common_next_is_rc),
+            ("ArrayTokenStream", store, Builder.next_is_rc),
+        ]:
+            builder._stream = stream
+            timings[label] = elapsed = best_time(lambda: walk(builder, next_is_rc, types))
+            print("  %-18s %8.1fms %8.0fns/call" % (label, elapsed * 1000, elapsed / calls * 1e9))
+        print("  speedup %.2fx" % (timings["CommonTokenStream"] / timings["ArrayTokenStream"]))
+
+        elapsed = best_time(lambda: ArrayTokenStream(FastLuaLexer(source)))
+        print("  %-18s %8.1fms (lexing included)" % ("store build", elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Time ast.walk and ast.to_pretty_str with and without the dispatch cache.
+
+The uncached variant resolves the visitor method on every call, walking
+the argument class bases, like luaparser.utils.visitor used to do.
+
+usage: python -m benchmarks.bench_visitor [file|directory ...]
+"""
+import gc
+import sys
+import time
+
+from luaparser import ast, printers
+from luaparser.utils import visitor
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 500
+REPEAT = 5
+VISITORS = [ast.WalkVisitor, printers.PythonStyleVisitor, printers.HTMLStyleVisitor]
+
+
+def uncached_visitor_impl(self, arg):
+    method = visitor._resolve(type(self), type(arg))
+    if method is None:
+        raise visitor.VisitorException("No visitor found for class " + str(type(arg)))
+    return method(self, arg)
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    benchmarks = [
+        ("walk", lambda tree: sum(1 for _ in ast.walk(tree))),
+        ("to_pretty_str", ast.to_pretty_str),
+        ("to_xml_str", ast.to_xml_str),
+    ]
+    cached_impl = visitor._visitor_impl
+    try:
+        for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+            tree = ast.parse(source)
+            print(name, "(%d lines, %d nodes)" % (source.count("\n"), len(list(ast.walk(tree)))))
+            print("  %-16s %12s %12s %8s" % ("", "uncached", "cached", "speedup"))
+            for label, fn in benchmarks:
+                timings = []
+                for impl in (uncached_visitor_impl, cached_impl):
+                    for cls in VISITORS:
+                        cls.visit = impl
+                    timings.append(best_time(lambda: fn(tree)))
+                print(
+                    "  %-16s %10.1fms %10.1fms %7.2fx"
+                    % (label, timings[0] * 1000, timings[1] * 1000, timings[0] / timings[1])
+                )
+    finally:
+        for cls in VISITORS:
+            cls.visit = cached_impl
+
+
+if __name__ == "__main__":
+    main()
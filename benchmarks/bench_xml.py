@@ -0,0 +1,78 @@
+"""Time and peak memory of the XML export, minidom vs XMLWriter.
+
+The minidom variant is the get_xml_string code used before XMLWriter: it
+builds an ElementTree with HTMLStyleVisitor, serializes it, then parses
+it again with minidom to indent it. Both write to a temporary file, and
+their output is checked to be the same. The peak memory is the one
+tracemalloc sees on top of the parsed tree.
+
+usage: python -m benchmarks.bench_xml [file|directory ...]
+"""
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ElementTree
+from xml.dom import minidom
+
+from luaparser import ast, printers
+from benchmarks.corpus import load_sources
+
+N_FUNCTIONS = 200
+REPEAT = 3
+
+
+def minidom_xml(tree) -> str:
+    doc = ElementTree.Element("doc")
+    doc.append(printers.HTMLStyleVisitor().visit(tree))
+    return minidom.parseString(ElementTree.tostring(doc)).toprettyxml(indent="   ")
+
+
+def minidom_to_file(tree, out):
+    out.write(minidom_xml(tree))
+
+
+def stream_to_file(tree, out):
+    ast.to_xml_str(tree, out=out)
+
+
+def best_time(fn):
+    best = None
+    for _ in range(REPEAT):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_kb(fn) -> int:
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak // 1024
+
+
+def main():
+    for name, source in load_sources(sys.argv[1:], n_functions=N_FUNCTIONS):
+        tree = ast.parse(source)
+        print(name, "(%d lines)" % source.count("\n"))
+        if minidom_xml(tree) != ast.to_xml_str(tree):
+            print("  output differs")
+        timings = []
+        for label, export in [("minidom", minidom_to_file), ("XMLWriter", stream_to_file)]:
+            with tempfile.TemporaryFile("w") as out:
+                run = lambda: export(tree, out)  # noqa: E731
+                elapsed = best_time(run)
+                peak = peak_kb(run)
+            timings.append(elapsed)
+            print("  %-10s %8.1fms %10d KiB peak" % (label, elapsed * 1000, peak))
+        print("  speedup %.2fx" % (timings[0] / timings[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+    ``corpus`` module
+    =================
+
+    Lua inputs shared by the benchmarks: either the .lua files given on the
+    command line (files or directories) or a synthetic mod-like script
+    using the dialect extensions (pipes, ``..name``, ``for k,v ; t``,
+    missing ``then``/``do``).
+"""
+import os
+import random
+from typing import List, Tuple
+
+_FUNCTION = """\
+-- function number {i}
+-- helper computing stuff for empire {i}
+function mod.f{i}(a, b, ...)
+  local x = a.b.c[{i}]:get(b, 'str', "dq") + {i} * 2 ^ 3 - -b
+  if x > {i} and not b or #a == 0
+    x = x + 1
+  elseif x ~= 3 then
+    x = x .. 'a' .. b
+  else
+    return nil
+  end
+  for k,v ; tbl
+    print(k, v) -- inline comment
+  end
+  for _,e in ipairs | all_empires
+    push | e
+  end
+  local t = {{ a = 1, [2] = 'b', ..x, 3; 4, f = function(q) return q end }}
+  while x < 10 do x = x + 1 end
+  repeat x = x - 1 until x <= 0
+  local u = strong_memoize | function(e)
+    return e : attitude(b)
+  end
+  print(..x, y, ..z)
+  obj:method{{1, 2}}
+  obj:m 'str'
+  a.b!.c = a.d?
+  describe("case", function()
+    it(function()
+      do
+        local z = (x + 1) * 2
+      end
+    end)
+  end)
+  ::lbl{i}:: goto lbl{i}
+end
+
+"""
+
+
+# _FUNCTION in standard Lua, for the parsers without the extensions
+_STANDARD_FUNCTION = """\
+-- function number {i}
+-- helper computing stuff for empire {i}
+function mod.f{i}(a, b, ...)
+  local x = a.b.c[{i}]:get(b, 'str', "dq") + {i} * 2 ^ 3 - -b
+  if x > {i} and not b or #a == 0 then
+    x = x + 1
+  elseif x ~= 3 then
+    x = x .. 'a' .. b
+  else
+    return nil
+  end
+  for k, v in pairs(tbl) do
+    print(k, v) -- inline comment
+  end
+  for _, e in ipairs(all_empires) do
+    push(e)
+  end
+  local t = {{ a = 1, [2] = 'b', x, 3; 4, f = function(q) return q end }}
+  while x < 10 do x = x + 1 end
+  repeat x = x - 1 until x <= 0
+  local u = strong_memoize(function(e)
+    return e:attitude(b)
+  end)
+  print(x, y, z)
+  obj:method{{1, 2}}
+  obj:m 'str'
+  a.b.c = a.d
+  describe("case", function()
+    it(function()
+      do
+        local z = (x + 1) * 2
+      end
+    end)
+  end)
+  ::lbl{i}:: goto lbl{i}
+end
+
+"""
+
+
+def synthetic_source(n_functions: int = 100, seed: int = 0, dialect: bool = True) -> str:
+    """Generate a Lua script of roughly 40 lines per function, in standard
+    Lua without dialect."""
+    rand = random.Random(seed)
+    template = _FUNCTION if dialect else _STANDARD_FUNCTION
+    out = []
+    for i in range(n_functions):
+        out.append(template.format(i=i))
+        numbers = ", ".join(
+            str(rand.randint(0, 1000)) + (".5" if j % 3 == 0 else "")
+            for j in range(30)
+        )
+        out.append("local data{} = {{ {} }}\n\n".format(i, numbers))
+    return "".join(out)
+
+
+def load_sources(paths: List[str], n_functions: int = 100) -> List[Tuple[str, str]]:
+    """Return (name, source) pairs for paths, or a synthetic source if empty."""
+    if not paths:
+        return [("synthetic", synthetic_source(n_functions))]
+
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if filename.endswith(".lua"):
+                        sources.append(_read(os.path.join(dirpath, filename)))
+        else:
+            sources.append(_read(path))
+    return sources
+
+
+def _read(path: str) -> Tuple[str, str]:
+    with open(path, "r", encoding="ISO-8859-1") as f:
+        return path, f.read()
@@ -1,74 +1,459 @@
+import abc
+import io
 import logging
 import re
 import os
-import shutil
+from collections import Counter
+from optparse import OptionParser
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+from antlr4 import Token
+
+from luaparser import ast
+from luaparser.parser.LuaLexer import LuaLexer
+from rebuild import Manifest, clean_directory
 
 # Specify your source and target directories here
 source_directory = "/home/fred/tmp/Stars in Shadow/Lua state"
 target_directory = "/home/fred/tmp/LuaState/"
 
-# Create the target directory if it does not exist
-os.makedirs(target_directory, exist_ok=True)
+# Bump when patterns change so previous outputs are rebuilt
+PATCHER_VERSION = "regex-1"
+# Same for the rules of TokenPatcher
+TOKEN_PATCHER_VERSION = "tokens-1"
+
+
+class Rule(NamedTuple):
+    name: str
+    # searched in the line, must not use numbered backreferences
+    pattern: str
+    # called with the line and the match, returns the patched line
+    fix: Callable
+    # a line can only match if it holds one of these
+    keywords: Tuple[str, ...]
+
 
 # Regular expression pattern to find if statements without then
 # elseif w.is_heavy
-patterns = {
-    r'(?<=\bif\b)(?!.*then).*': lambda line, match: line[:match.end()] + ' then' + line[match.end():],
-    r'(?<=\belseif\b)(?!.*then).*': lambda line, match: line[:match.end()] + ' then' + line[match.end():],
-    r'(?<=\bfor\b).*in(?!.*do).*': lambda line, match: line[:match.end()] + ' do' + line[match.end():],
-    r'(?<=\bfor\b).*;(?!.*do).*': lambda line, match: line[:match.end()].replace(';', ' in') + ' do' + line[match.end():],
-    r'([\w\[\]]+)\s*\+=\s*([\w\[\]]+)': lambda line, match: f'{match.group(1)} = {match.group(1)} + {match.group(2)}' + line[match.end():],
-    # Add more patterns and functions as needed
-}
+rules = [
+    Rule('if-then', r'(?<=\bif\b)(?!.*then).*',
+         lambda line, match: line[:match.end()] + ' then' + line[match.end():], ('if',)),
+    Rule('elseif-then', r'(?<=\belseif\b)(?!.*then).*',
+         lambda line, match: line[:match.end()] + ' then' + line[match.end():], ('elseif',)),
+    Rule('for-in-do', r'(?<=\bfor\b).*in(?!.*do).*',
+         lambda line, match: line[:match.end()] + ' do' + line[match.end():], ('for',)),
+    Rule('for-semicolon-do', r'(?<=\bfor\b).*;(?!.*do).*',
+         lambda line, match: line[:match.end()].replace(';', ' in') + ' do' + line[match.end():], ('for',)),
+    Rule('plus-assign', r'([\w\[\]]+)\s*\+=\s*([\w\[\]]+)',
+         lambda line, match: f'{match.group(1)} = {match.group(1)} + {match.group(2)}' + line[match.end():], ('+=',)),
+    # Add more rules as needed
+]
+
+patterns = {rule.pattern: rule.fix for rule in rules}
+
+
+class Patcher(abc.ABC):
+    """Base of the patch engines.
+
+    Attributes:
+        hits: Number of patches made by each rule, by rule name.
+    """
+
+    hits: Counter
+
+    @abc.abstractmethod
+    def patch(self, source: str) -> str:
+        """Return the patched source."""
+
+    def log_hits(self):
+        for name, count in self.hits.items():
+            logging.info('Rule %s patched %d times', name, count)
+
+
+class LinePatcher(Patcher):
+    """Apply a rule set to lines.
+
+    Like the original loop over patterns, each rule is searched in the
+    line and the last matching rule gives the patched line. All rules are
+    compiled once into a single regex of optional lookaheads, one named
+    group per rule, so a line is scanned once. Lines holding none of the
+    rule keywords are returned right away.
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules: List[Rule] = list(rules)
+        self.hits: Counter = Counter({rule.name: 0 for rule in self.rules})
+        self._regexes = [re.compile(rule.pattern) for rule in self.rules]
+        # each lookahead finds the leftmost match of a rule, like re.search
+        self._scan = re.compile(''.join(
+            '(?:(?=(?s:.*?)(?P<rule%d>%s)))?' % (i, rule.pattern) for i, rule in enumerate(self.rules)
+        ))
+        self._groups = [self._scan.groupindex['rule%d' % i] for i in range(len(self.rules))]
+        self._prefilter = None
+        if all(rule.keywords for rule in self.rules):
+            keywords = sorted({k for rule in self.rules for k in rule.keywords}, key=len, reverse=True)
+            self._prefilter = re.compile('|'.join(re.escape(k) for k in keywords)).search
+
+    def fix_line(self, line):
+        if self._prefilter is not None and not self._prefilter(line):
+            return line
+        scan = self._scan.match(line)
+        for i in range(len(self.rules) - 1, -1, -1):
+            if scan.start(self._groups[i]) >= 0:
+                rule = self.rules[i]
+                self.hits[rule.name] += 1
+                return rule.fix(line, self._regexes[i].search(line))
+        return line
+
+    def patch(self, source: str) -> str:
+        return ''.join(self.fix_line(line) for line in io.StringIO(source))
+
+
+class TokenPatcher(Patcher):
+    """Patch the dialect over the tokens of a source.
+
+    Unlike the line rules, it works on the default channel tokens, so
+    strings and comments are left alone and an ``if`` condition may span
+    several lines. The end of an expression is found by scanning its
+    tokens, without building a tree. Patches are text edits at character
+    offsets, the rest of the source is kept as is:
+
+    - ``then`` is added after ``if`` and ``elseif`` conditions lacking it
+    - ``for k, v ; t`` becomes ``for k, v in pairs(t)``, like the parser
+      reads it
+    - ``do`` is added after ``for`` headers lacking it
+    - ``a += b`` becomes ``a = a + b``, with parentheses around ``b``
+      when needed
+    """
+
+    RULES = ('if-then', 'elseif-then', 'for-semicolon-pairs', 'for-do', 'plus-assign')
+
+    def __init__(self):
+        self.hits: Counter = Counter({name: 0 for name in self.RULES})
+        self._source = ''
+        self._tokens: List[Token] = []
+        self._types: List[int] = []
+        # matching bracket of every bracket token, both ways
+        self._match: Dict[int, int] = {}
+
+    def patch(self, source: str) -> str:
+        self._source = source
+        stream = ast.get_token_stream(source, fast_lexer=True)
+        stream.fill()
+        self._tokens = [
+            t for t in stream.tokens if t.channel == Token.DEFAULT_CHANNEL and t.type != Token.EOF
+        ]
+        self._types = types = [t.type for t in self._tokens]
+        self._match = self._match_brackets()
+
+        # (start, stop, text) of each edit, stop excluded
+        edits: List[Tuple[int, int, str]] = []
+        for i, tok_type in enumerate(types):
+            if tok_type == LuaLexer.IF or tok_type == LuaLexer.ELSEIF:
+                end = self._expression_end(i + 1)
+                if end > i and not self._is(end + 1, LuaLexer.THEN):
+                    edits.append(self._insert_after(end, ' then'))
+                    self.hits['if-then' if tok_type == LuaLexer.IF else 'elseif-then'] += 1
+            elif tok_type == LuaLexer.FOR:
+                edits += self._patch_for(i)
+            elif tok_type == LuaLexer.ADD and self._is(i + 1, LuaLexer.ASSIGN):
+                edits += self._patch_plus_assign(i)
+
+        parts = []
+        position = 0
+        # edits at the same offset stay in order
+        for start, stop, text in sorted(edits, key=lambda edit: edit[:2]):
+            parts.append(source[position:start])
+            parts.append(text)
+            position = stop
+        parts.append(source[position:])
+        return ''.join(parts)
+
+    def _is(self, i: int, tok_type: int) -> bool:
+        return i < len(self._types) and self._types[i] == tok_type
+
+    def _insert_after(self, i: int, text: str) -> Tuple[int, int, str]:
+        position = self._tokens[i].stop + 1
+        return position, position, text
+
+    def _for_header(self, i: int) -> Optional[Tuple[int, int, int]]:
+        """Tokens of the header of the for at token i, None if it is not one.
 
-# Clean the target directory
-def clean_directory(target_directory):
-    for filename in os.listdir(target_directory):
-        file_path = os.path.join(target_directory, filename)
-        try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
-                os.unlink(file_path)
-            elif os.path.isdir(file_path):
-                shutil.rmtree(file_path)
-        except Exception as e:
-            print(f'Failed to delete {file_path}. Reason: {e}')
+        Returns:
+            The "=", "in" or ";" token, the last token of the first
+            expression and the last token of the header.
+        """
+        # names, then "=", "in" or ";"
+        j = i + 1
+        while self._is(j, LuaLexer.NAME) and self._is(j + 1, LuaLexer.COMMA):
+            j += 2
+        if not self._is(j, LuaLexer.NAME) or j + 1 >= len(self._types):
+            return None
+        j += 1
+        if self._types[j] not in (LuaLexer.ASSIGN, LuaLexer.IN, LuaLexer.SEMCOL):
+            return None
 
+        end = first_end = self._expression_end(j + 1)
+        while end > j and self._is(end + 1, LuaLexer.COMMA):
+            end = self._expression_end(end + 2)
+        if end <= j:
+            return None
+        return j, first_end, end
 
-clean_directory(target_directory)
+    def _patch_for(self, i: int) -> List[Tuple[int, int, str]]:
+        edits = []
+        header = self._for_header(i)
+        if header is None:
+            return edits
+        j, first_end, end = header
+        if self._types[j] == LuaLexer.SEMCOL:
+            # only the first expression is iterated
+            separator, first = self._tokens[j], self._tokens[j + 1]
+            edits.append((separator.start, separator.stop + 1, 'in'))
+            edits.append((first.start, first.start, 'pairs('))
+            edits.append(self._insert_after(first_end, ')'))
+            if end > first_end:
+                edits.append((self._tokens[first_end].stop + 1, self._tokens[end].stop + 1, ''))
+            self.hits['for-semicolon-pairs'] += 1
+        if not self._is(end + 1, LuaLexer.DO):
+            edits.append(self._insert_after(end, ' do'))
+            self.hits['for-do'] += 1
+        return edits
+
+    def _patch_plus_assign(self, i: int) -> List[Tuple[int, int, str]]:
+        plus, assign = self._tokens[i], self._tokens[i + 1]
+        if plus.stop + 1 != assign.start:
+            return []
+        start = self._target_start(i - 1)
+        operators = []
+        end = self._expression_end(i + 2, operators)
+        if start is None or end < i + 2:
+            return []
+
+        target = self._source[self._tokens[start].start:plus.start].rstrip()
+        edits = [(plus.start, assign.stop + 1, '= ' + target + ' +')]
+        if any(op not in _BINDS_TIGHTER_THAN_ADD for op in operators):
+            edits.append((self._tokens[i + 2].start, self._tokens[i + 2].start, '('))
+            edits.append(self._insert_after(end, ')'))
+        self.hits['plus-assign'] += 1
+        return edits
+
+    def _target_start(self, i: int) -> Optional[int]:
+        """First token of the variable ending at token i, if it is one."""
+        types = self._types
+        while i >= 0:
+            tok_type = types[i]
+            if tok_type in (LuaLexer.REQFIELD, LuaLexer.OPTIONALFIELD):
+                i -= 1
+            elif tok_type == LuaLexer.CBRACK or tok_type == LuaLexer.CPAR:
+                if i not in self._match:
+                    return None
+                i = self._match[i] - 1
+            elif tok_type == LuaLexer.NAME:
+                if i > 1 and types[i - 1] == LuaLexer.DOT:
+                    i -= 2
+                else:
+                    return i
+            else:
+                return None
+        return None
+
+    def _expression_end(self, i: int, operators: Optional[List[int]] = None) -> int:
+        """Last token of the expression starting at token i, i - 1 if
+        there is none.
+
+        Binary operators found outside of brackets are appended to
+        operators.
+        """
+        types = self._types
+        n = len(types)
+        last = i - 1
+        operand = True
+        while i < n:
+            tok_type = types[i]
+            if operand:
+                if tok_type in _UNARY_OPERATORS:
+                    i += 1
+                    continue
+                if tok_type in _ATOMS:
+                    last = i
+                elif tok_type == LuaLexer.OPAR or tok_type == LuaLexer.OBRACE:
+                    if i not in self._match:
+                        return last
+                    last = self._match[i]
+                elif tok_type == LuaLexer.FUNCTION:
+                    last = self._function_end(i)
+                else:
+                    return last
+                operand = False
+                i = last + 1
+            elif tok_type in (LuaLexer.DOT, LuaLexer.COL) and self._is(i + 1, LuaLexer.NAME):
+                last = i = i + 1
+                i += 1
+            elif tok_type in (LuaLexer.REQFIELD, LuaLexer.OPTIONALFIELD, LuaLexer.STRING):
+                last = i
+                i += 1
+            elif tok_type in (LuaLexer.OPAR, LuaLexer.OBRACK, LuaLexer.OBRACE):
+                # call or index
+                if i not in self._match:
+                    return last
+                last = self._match[i]
+                i = last + 1
+            elif tok_type in _BINARY_OPERATORS:
+                if operators is not None:
+                    operators.append(tok_type)
+                operand = True
+                i += 1
+            else:
+                return last
+        return last
+
+    def _function_end(self, i: int) -> int:
+        """The "end" of the function starting at token i."""
+        types = self._types
+        depth = 0
+        j = i
+        while j < len(types):
+            tok_type = types[j]
+            if tok_type in (LuaLexer.FUNCTION, LuaLexer.IF, LuaLexer.REPEAT, LuaLexer.DO):
+                depth += 1
+            elif tok_type == LuaLexer.WHILE or tok_type == LuaLexer.FOR:
+                depth += 1
+                # the "do" of a loop may be missing, so only the one right
+                # after its header belongs to it
+                if tok_type == LuaLexer.FOR:
+                    header = self._for_header(j)
+                    end = j if header is None else header[2]
+                else:
+                    end = self._expression_end(j + 1)
+                j = end + 1 if self._is(end + 1, LuaLexer.DO) else end
+            elif tok_type == LuaLexer.END or tok_type == LuaLexer.UNTIL:
+                depth -= 1
+                if depth == 0:
+                    return j
+            j += 1
+        return len(types) - 1
+
+    def _match_brackets(self) -> Dict[int, int]:
+        match = {}
+        opened = []
+        for i, tok_type in enumerate(self._types):
+            if tok_type in _CLOSING_OF:
+                opened.append(i)
+            elif opened and tok_type == _CLOSING_OF[self._types[opened[-1]]]:
+                j = opened.pop()
+                match[i], match[j] = j, i
+        return match
+
+
+_UNARY_OPERATORS = {LuaLexer.NOT, LuaLexer.MINUS, LuaLexer.LENGTH, LuaLexer.BITNOT}
+_BINARY_OPERATORS = {
+    LuaLexer.AND, LuaLexer.OR, LuaLexer.ADD, LuaLexer.MINUS, LuaLexer.MULT, LuaLexer.DIV,
+    LuaLexer.FLOOR, LuaLexer.MOD, LuaLexer.POW, LuaLexer.EQ, LuaLexer.NEQ, LuaLexer.LTEQ,
+    LuaLexer.GTEQ, LuaLexer.LT, LuaLexer.GT, LuaLexer.BITAND, LuaLexer.BITOR, LuaLexer.BITNOT,
+    LuaLexer.BITRSHIFT, LuaLexer.BITRLEFT, LuaLexer.CONCAT,
+}
+_BINDS_TIGHTER_THAN_ADD = {LuaLexer.MULT, LuaLexer.DIV, LuaLexer.FLOOR, LuaLexer.MOD, LuaLexer.POW}
+_ATOMS = {
+    LuaLexer.NAME, LuaLexer.NUMBER, LuaLexer.STRING, LuaLexer.NIL, LuaLexer.TRUE, LuaLexer.FALSE,
+    LuaLexer.VARARGS,
+}
+_CLOSING_OF = {LuaLexer.OPAR: LuaLexer.CPAR, LuaLexer.OBRACE: LuaLexer.CBRACE, LuaLexer.OBRACK: LuaLexer.CBRACK}
+
+
+_patcher = LinePatcher(rules)
 
 
 def fix_line(line):
-    corrected_line = line
-    for pattern, func in patterns.items():
-        match = re.search(pattern, line)
-        if match:
-            corrected_line = func(line, match)
-    return corrected_line
-
-
-for dirpath, dirnames, filenames in os.walk(source_directory):
-    for filename in filenames:
-        if filename.endswith('.lua'):
-            source_filepath = os.path.join(dirpath, filename)
-
-            # Create the equivalent path in the target directory
-            target_dirpath = dirpath.replace(source_directory, target_directory)
-            os.makedirs(target_dirpath, exist_ok=True)
-            target_filepath = os.path.join(target_dirpath, filename)
-
-            # Open each .lua file and read its content
-            logging.info('Processing %s', source_filepath)
-            logging.info('Writing to %s', target_filepath)
-            with open(source_filepath, 'r', encoding='ISO-8859-1') as f:
-                lines = f.readlines()
-
-            # Go through each line and find if statements without then
-            with open(target_filepath, 'w') as f:
-                for line in lines:
-                    fixed_line = fix_line(line)
-                    f.write(fixed_line)
+    return _patcher.fix_line(line)
+
+
+def patch_file(source_filepath, target_filepath, patcher=_patcher):
+    # Open each .lua file and read its content
+    logging.info('Processing %s', source_filepath)
+    logging.info('Writing to %s', target_filepath)
+    with open(source_filepath, 'r', encoding='ISO-8859-1') as f:
+        source = f.read()
+
+    with open(target_filepath, 'w') as f:
+        f.write(patcher.patch(source))
+
+
+def patch_directory(source_directory, target_directory, manifest=None, patcher=None):
+    """Patch every .lua file of source_directory into target_directory.
+
+    Files are patched by the line rules unless another patcher is given.
+    When a manifest is given, unchanged files are skipped and outputs of
+    vanished sources are deleted. The number of patches made by each rule
+    is logged at the end.
+    """
+    if patcher is None:
+        patcher = LinePatcher(rules)
+    for dirpath, dirnames, filenames in os.walk(source_directory):
+        for filename in filenames:
+            if filename.endswith('.lua'):
+                source_filepath = os.path.join(dirpath, filename)
+
+                # Create the equivalent path in the target directory
+                target_dirpath = dirpath.replace(source_directory, target_directory)
+                os.makedirs(target_dirpath, exist_ok=True)
+                target_filepath = os.path.join(target_dirpath, filename)
+
+                if manifest is not None and manifest.is_up_to_date(source_filepath, target_filepath):
+                    continue
+                patch_file(source_filepath, target_filepath, patcher)
+                if manifest is not None:
+                    manifest.record(source_filepath, target_filepath, True)
+
+    patcher.log_hits()
+    if manifest is not None:
+        for target_filepath in manifest.remove_stale():
+            logging.info('Removed %s', target_filepath)
+        manifest.save()
+
+
+def main():
+    parser = OptionParser(usage="usage: %prog [options] [source_directory target_directory]")
+    parser.add_option(
+        "--full",
+        action="store_true",
+        dest="full",
+        help="ignore the build manifest and rebuild every file",
+        default=False,
+    )
+    parser.add_option(
+        "--tokens",
+        action="store_true",
+        dest="tokens",
+        help="patch the tokens of each file instead of its lines",
+        default=False,
+    )
+    (options, args) = parser.parse_args()
+
+    source, target = source_directory, target_directory
+    if args:
+        if len(args) != 2:
+            parser.error("expected a source and a target directory")
+        source, target = args
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    # Create the target directory if it does not exist
+    os.makedirs(target, exist_ok=True)
+    if options.tokens:
+        patcher, version = TokenPatcher(), TOKEN_PATCHER_VERSION
+    else:
+        patcher, version = LinePatcher(rules), PATCHER_VERSION
+    manifest = Manifest.load(target, version)
+    if options.full or not manifest.entries:
+        clean_directory(target)
+        manifest = Manifest(target, version)
+
+    patch_directory(source, target, manifest, patcher)
+
+
+if __name__ == '__main__':
+    main()
 
 
 # in_regex = r'(local\s+)?(\w+(\s*,\s*\w+)*)\s+in\s+([\w!?]+)'
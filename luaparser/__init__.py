@@ -1 +1,8 @@
 __version__ = "3.2.1"
+
+# Revision of the trees the parse backends give: bump it whenever their
+# nodes, fields or token positions change, so that trees cached or
+# converted by an older revision are not reused.
+# 2: statements have first and last token positions
+# 3: token positions keep the token text
+TREE_REVISION = 3
@@ -1,3 +1,4 @@
+import functools
 import sys
 from optparse import OptionParser, OptionGroup
 import luaparser
@@ -40,6 +41,13 @@ def main():
         help="set output format to python ast pretty print style",
         default=False,
     )
+    cli_group.add_option(
+        "--compact",
+        action="store_true",
+        dest="compact",
+        help="write json on a single line, without indentation",
+        default=False,
+    )
     cli_group.add_option(
         "-o",
         "--output",
@@ -67,10 +75,21 @@ def main():
         # output format
         if options.pretty:
             output = ast.to_pretty_str(tree)
-        elif options.xml:
-            output = ast.to_xml_str(tree)
         else:
-            output = ast.to_pretty_json(tree)
+            # json and xml are streamed to the output
+            if options.xml:
+                export = ast.to_xml_str
+            else:
+                export = functools.partial(
+                    ast.to_pretty_json, indent=None if options.compact else 4
+                )
+            if options.output:
+                with open(options.output, "w") as content_file:
+                    export(tree, out=content_file)
+            else:
+                export(tree, out=sys.stdout)
+                print()
+            return
 
         # output
         if options.output:
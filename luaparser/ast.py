@@ -1,22 +1,68 @@
 from antlr4 import InputStream, CommonTokenStream
 from luaparser.parser.LuaLexer import LuaLexer
 from luaparser.astnodes import *
-from luaparser import printers
+from luaparser import backends, binary, incremental, printers
 from luaparser.builder import Builder
+from luaparser.lexer import FastLuaLexer
 from luaparser.utils.visitor import *
 from antlr4.error.ErrorListener import ErrorListener
 import json
 from typing import Generator
 
 
-def parse(source: str) -> Chunk:
-    """Parse Lua source to a Chunk."""
-    return Builder(source).process()
+def parse(
+    source: str,
+    fast_lexer: bool = False,
+    comments: bool = True,
+    cache=None,
+    backend: str = backends.DEFAULT_BACKEND,
+) -> Chunk:
+    """Parse Lua source to a Chunk.
 
+    With fast_lexer, the source is tokenized by the hand-written
+    luaparser.lexer.FastLuaLexer, which produces the same tokens as the
+    antlr lexer.
 
-def get_token_stream(source: str) -> CommonTokenStream:
-    """Get the antlr token stream."""
-    lexer = LuaLexer(InputStream(source))
+    With comments=False, comments are left out of the tree, which makes
+    parsing faster. Keep the default to render the tree back to Lua.
+
+    When a luaparser.cache.ASTCache is given as cache, a tree it holds for
+    the same source and options is returned instead of parsing again.
+
+    backend names the parser, see ``luaparser.backends``: "builder", the
+    default, or "gen" and "gen2", the antlr generated parsers of standard
+    Lua, which give trees without comments nor token positions.
+
+    Raises:
+        ValueError: Unknown backend.
+    """
+    parse_source = backends.get(backend)
+    if cache is not None:
+        return cache.parse(source, fast_lexer=fast_lexer, comments=comments, backend=backend)
+    return parse_source(source, fast_lexer=fast_lexer, comments=comments)
+
+
+def reparse(
+    tree: Chunk, source: str, start: int, stop: int, text: str, fast_lexer: bool = False, comments: bool = True
+) -> Chunk:
+    """Parse source with source[start:stop] replaced by text.
+
+    tree is the Chunk of source, parsed with the same options. Only the
+    function, or top level statement, holding the edit is parsed again
+    when possible: tree is then updated in place and returned. Otherwise
+    the whole new source is parsed. See ``incremental.reparse``.
+    """
+    return incremental.reparse(
+        tree, source, start, stop, text, fast_lexer=fast_lexer, comments=comments
+    )
+
+
+def get_token_stream(source: str, fast_lexer: bool = False) -> CommonTokenStream:
+    """Get the antlr token stream.
+
+    With fast_lexer, the tokens come from luaparser.lexer.FastLuaLexer.
+    """
+    lexer = FastLuaLexer(source) if fast_lexer else LuaLexer(InputStream(source))
     stream = CommonTokenStream(lexer)
     return stream
 
@@ -36,13 +82,33 @@ def to_pretty_str(root: Node, indent=2) -> str:
     return printers.PythonStyleVisitor(indent).visit(root)
 
 
-def to_lua_source(root: Node, indent=4) -> str:
-    return printers.LuaOutputVisitor(indent_size=indent).visit(root)
+def to_lua_source(root: Node, indent=4, out=None, source: str = None, original: Chunk = None) -> str:
+    """Render root as Lua source.
+
+    When the source root was parsed from is given, its text is kept for
+    the statements that need no change, see ``printers.LuaRewriter``. The
+    statements changed since are found by comparing root with original,
+    the tree parsed from source and left unchanged. Without original, the
+    source is parsed again; a caller printing the tree it just parsed can
+    give the tree itself.
+
+    When a text file is given as out, the source is streamed to it and
+    None is returned.
+    """
+    if source is not None:
+        if original is None:
+            original = parse(source, comments=False)
+        return printers.LuaRewriter(source, original, indent_size=indent, out=out).visit(root)
+    return printers.LuaOutputVisitor(indent_size=indent, out=out).visit(root)
+
 
+def to_xml_str(tree, out=None):
+    """Render tree as indented XML.
 
-def to_xml_str(tree):
-    tree_visitor = printers.HTMLStyleVisitor()
-    return tree_visitor.get_xml_string(tree)
+    When a text file is given as out, the document is streamed to it and
+    None is returned.
+    """
+    return printers.XMLWriter(out).write(tree)
 
 
 class JSONEncoder(json.JSONEncoder):
@@ -56,8 +122,33 @@ class JSONEncoder(json.JSONEncoder):
             return {k: v for k, v in o.__dict__.items() if not k.startswith("_")}
 
 
-def to_pretty_json(root: Node) -> str:
-    return json.dumps(root, cls=JSONEncoder, indent=4)
+def to_pretty_json(root: Node, indent=4, out=None) -> str:
+    """Render root as JSON, or as compact JSON if indent is None.
+
+    The document is written without being built in memory: when a text
+    file is given as out, it is streamed to it and None is returned.
+
+    Each node has its ``start_char``, ``stop_char`` and ``line``. Since
+    tree revision 2 (see luaparser.TREE_REVISION) they are set for every
+    statement: ``If``, loops, ``Do``, ``Label``, ``Goto``, ``Break`` and
+    the other statements built without tokens of their own had null ones.
+    """
+    return printers.JSONWriter(out, indent=indent, default=JSONEncoder().default).write(root)
+
+
+def dump_binary(root: Node) -> bytes:
+    """Encode root, token positions included, in the compact binary
+    format of luaparser.binary."""
+    return binary.dump(root)
+
+
+def load_binary(data: bytes) -> Node:
+    """Decode a tree written by dump_binary.
+
+    Raises:
+        ValueError: data is not a tree written by a compatible version.
+    """
+    return binary.load(data)
 
 
 class ASTVisitor:
@@ -78,11 +169,8 @@ class ASTVisitor:
                     tree_visitor(node)
 
                 # add childs
-                children = [
-                    attr for attr in node.__dict__.keys() if not attr.startswith("_")
-                ]
-                for child in children:
-                    node_stack.append(node.__dict__[child])
+                for child in node._fields:
+                    node_stack.append(getattr(node, child))
             elif isinstance(node, list):
                 # append node list in reversal order
                 for n in reversed(node):
@@ -106,11 +194,8 @@ class ASTRecursiveVisitor:
                     parent_type = parent_type.__bases__[0]
 
             # visit all object public attributes:
-            children = [
-                attr for attr in node.__dict__.keys() if not attr.startswith("_")
-            ]
-            for child in children:
-                self.visit(node.__dict__[child])
+            for child in node._fields:
+                self.visit(getattr(node, child))
 
             # call exit node method
             # if no visitor method found for this arg type,
@@ -324,6 +409,20 @@ class WalkVisitor:
     def visit(self, node):
         self._nodes.append(node)
 
+    @visitor(StringifiedName)
+    def visit(self, node):
+        self._nodes.append(node)
+
+    @visitor(RequiredField)
+    def visit(self, node):
+        self._nodes.append(node)
+        self.visit(node.value)
+
+    @visitor(OptionalField)
+    def visit(self, node):
+        self._nodes.append(node)
+        self.visit(node.value)
+
     @visitor(Index)
     def visit(self, node):
         self._nodes.append(node)
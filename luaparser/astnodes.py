@@ -4,60 +4,108 @@
 
     Contains all Ast Node definitions.
 """
+import functools
+import sys
 from enum import Enum
-from typing import List, Optional
+from typing import List, NamedTuple, Optional, Union
 
-from antlr4.Token import CommonToken
+from antlr4.Token import CommonToken, Token
 
 Comments = Optional[List["Comment"]]
 
 
-def _equal_dicts(d1, d2, ignore_keys):
-    ignored = set(ignore_keys)
-    for k1, v1 in d1.items():
-        if k1 not in ignored and (k1 not in d2 or d2[k1] != v1):
-            return False
-    for k2, v2 in d2.items():
-        if k2 not in ignored and k2 not in d1:
-            return False
-    return True
+@functools.lru_cache(maxsize=None)
+def _all_slots(cls) -> tuple:
+    return tuple(
+        slot
+        for klass in reversed(cls.__mro__)
+        for slot in klass.__dict__.get("__slots__", ())
+    )
+
+
+class TokenPosition(NamedTuple):
+    """Position of an Antlr token in the source.
+
+    Nodes keep this small immutable record instead of a copy of the token,
+    it has no stream and can be shared between nodes. The token text is
+    kept, interned, so that ``to_token`` gives it back.
+    """
+
+    start: int
+    stop: int
+    line: int
+    column: int
+    token_index: int
+    type: int
+    text: Optional[str] = None
+
+    def to_token(self) -> CommonToken:
+        """Build a stream-less token at this position, with its text."""
+        token = CommonToken(type=self.type, start=self.start, stop=self.stop)
+        token.text = self.text
+        token.line = self.line
+        token.column = self.column
+        token.tokenIndex = self.token_index
+        return token
+
+
+TokenOrPosition = Union[Token, TokenPosition]
+
+
+def _position(token: Optional[TokenOrPosition]) -> Optional[TokenPosition]:
+    if token is None or isinstance(token, TokenPosition):
+        return token
+    text = token.text
+    return TokenPosition(
+        token.start,
+        token.stop,
+        token.line,
+        token.column,
+        token.tokenIndex,
+        token.type,
+        None if text is None else sys.intern(text),
+    )
 
 
 class Node:
-    """Base class for AST node."""
+    """Base class for AST node.
+
+    Nodes have no instance dict. Each class lists its public attributes,
+    in order, in ``_fields``: walkers, equality, printers and JSON export
+    only look at these.
+    """
+
+    __slots__ = ("_name", "comments", "_first_position", "_last_position")
+    _fields = ("comments",)
 
     def __init__(
         self,
         name: str,
         comments: Comments = None,
-        first_token: Optional[CommonToken] = None,
-        last_token: Optional[CommonToken] = None,
+        first_token: Optional[TokenOrPosition] = None,
+        last_token: Optional[TokenOrPosition] = None,
     ):
         """
 
         Args:
             name: Node display name
             comments: Optional comments
-            first_token: First Antlr token
-            last_token: Last Antlr token
+            first_token: First Antlr token, or its position
+            last_token: Last Antlr token, or its position
         """
         if comments is None:
             comments = []
         self._name: str = name
         self.comments: Comments = comments
-        self._first_token: Optional[CommonToken] = first_token
-        self._last_token: Optional[CommonToken] = last_token
 
         # We want to have nodes be serializable with pickle.
-        # To allow that we must not have mutable fields such as streams.
-        # Tokens have streams, create a stream-less copy of tokens.
-        if self._first_token is not None:
-            self._first_token = self._first_token.clone()
-            self._first_token.source = CommonToken.EMPTY_SOURCE
-
-        if self._last_token is not None:
-            self._last_token = self._last_token.clone()
-            self._last_token.source = CommonToken.EMPTY_SOURCE
+        # To allow that we must not have mutable fields such as streams,
+        # only the position of tokens is kept.
+        self._first_position: Optional[TokenPosition] = _position(first_token)
+        if last_token is first_token:
+            self._last_position: Optional[TokenPosition] = self._first_position
+        else:
+            self._last_position: Optional[TokenPosition] = _position(last_token)
 
     @property
     def display_name(self) -> str:
@@ -65,62 +113,84 @@ class Node:
 
     def __eq__(self, other) -> bool:
         if isinstance(self, other.__class__):
-            return _equal_dicts(
-                self.__dict__, other.__dict__, ["_first_token", "_last_token"]
+            return (
+                self._name == other._name
+                and self._fields == other._fields
+                and all(getattr(self, f) == getattr(other, f) for f in self._fields)
             )
         return False
 
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in _all_slots(type(self))}
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            # pickled by an older version, with a __dict__ holding tokens
+            if key in ("_first_token", "_last_token"):
+                key, value = key.replace("_token", "_position"), _position(value)
+            setattr(self, key, value)
+
+    @property
+    def first_position(self) -> Optional[TokenPosition]:
+        """Position of the first token of a node."""
+        return self._first_position
+
+    @property
+    def last_position(self) -> Optional[TokenPosition]:
+        """Position of the last token of a node."""
+        return self._last_position
+
     @property
     def first_token(self) -> Optional[CommonToken]:
         """
         First token of a node.
 
-        Note: Token is disconnected from underline source streams.
+        Note: Token is built on each access from the node position,
+        it is disconnected from underline source streams.
         """
-        return self._first_token
+        if self._first_position is None:
+            return None
+        return self._first_position.to_token()
 
     @first_token.setter
-    def first_token(self, val: Optional[CommonToken]):
+    def first_token(self, val: Optional[TokenOrPosition]):
         if val is not None:
-            self._first_token = val.clone()
-            self._first_token.source = CommonToken.EMPTY_SOURCE
+            self._first_position = _position(val)
 
     @property
     def last_token(self) -> Optional[CommonToken]:
         """
         Last token of a node.
 
-        Note: Token is disconnected from underline source streams.
+        Note: Token is built on each access from the node position,
+        it is disconnected from underline source streams.
         """
-        return self._last_token
+        if self._last_position is None:
+            return None
+        return self._last_position.to_token()
 
     @last_token.setter
-    def last_token(self, val: Optional[CommonToken]):
+    def last_token(self, val: Optional[TokenOrPosition]):
         if val is not None:
-            self._last_token = val.clone()
-            self._last_token.source = CommonToken.EMPTY_SOURCE
+            self._last_position = _position(val)
 
     @property
     def start_char(self) -> Optional[int]:
-        return self._first_token.start if self._first_token else None
+        return self._first_position.start if self._first_position else None
 
     @property
     def stop_char(self) -> Optional[int]:
-        return self._last_token.stop if self._last_token else None
+        return self._last_position.stop if self._last_position else None
 
     @property
     def line(self) -> Optional[int]:
         """Line number."""
-        return self._first_token.line if self._first_token else None
+        return self._first_position.line if self._first_position else None
 
     def to_json(self) -> any:
         return {
             self._name: {
-                **{
-                    k: v
-                    for k, v in self.__dict__.items()
-                    if not k.startswith("_") and v
-                },
+                **{k: getattr(self, k) for k in self._fields if getattr(self, k)},
                 **{
                     "start_char": self.start_char,
                     "stop_char": self.stop_char,
@@ -131,6 +201,9 @@ class Node:
 
 
 class Comment(Node):
+    __slots__ = ("s", "is_multi_line")
+    _fields = Node._fields + __slots__
+
     def __init__(self, s: str, is_multi_line: bool = False, **kwargs):
         super().__init__("Comment", **kwargs)
         self.s: str = s
@@ -143,6 +216,10 @@ class Expression(Node):
     Attributes:
         wrapped (`bool`): True if expression is between parentheses
     """
+
+    __slots__ = ("wrapped",)
+    _fields = Node._fields + __slots__
+
     wrapped: bool
 
     def __init__(
@@ -158,10 +235,15 @@ class Expression(Node):
 class Statement(Expression):
     """Base class for Lua statement."""
 
+    __slots__ = ()
+
 
 class Block(Node):
     """Define a Lua Block."""
 
+    __slots__ = ("body",)
+    _fields = Node._fields + __slots__
+
     def __init__(self, body: List[Statement], **kwargs):
         super().__init__("Block", **kwargs)
         self.body: List[Statement] = body
@@ -174,6 +256,9 @@ class Chunk(Node):
         body (`Block`): Chunk body.
     """
 
+    __slots__ = ("body",)
+    _fields = Node._fields + __slots__
+
     def __init__(self, body: Block, **kwargs):
         super(Chunk, self).__init__("Chunk", **kwargs)
         self.body = body
@@ -191,6 +276,8 @@ Left Hand Side expression.
 class Lhs(Expression):
     """Define a Lua Left Hand Side expression."""
 
+    __slots__ = ()
+
 
 class Name(Lhs):
     """Define a Lua name expression.
@@ -199,6 +286,9 @@ class Name(Lhs):
         id (`string`): Id.
     """
 
+    __slots__ = ("id",)
+    _fields = Lhs._fields + __slots__
+
     def __init__(self, identifier: str, **kwargs):
         super(Name, self).__init__("Name", **kwargs)
         self.id: str = identifier
@@ -211,6 +301,9 @@ class StringifiedName(Lhs):
         id (`string`): Id.
     """
 
+    __slots__ = ("id",)
+    _fields = Lhs._fields + __slots__
+
     def __init__(self, identifier: str, **kwargs):
         super(StringifiedName, self).__init__("StringifiedName", **kwargs)
         self.id: str = identifier
@@ -223,6 +316,9 @@ class RequiredField(Lhs):
         id (`string`): Id.
     """
 
+    __slots__ = ("value",)
+    _fields = Lhs._fields + __slots__
+
     def __init__(self, value: Expression, **kwargs):
         super(RequiredField, self).__init__("RequiredField", **kwargs)
         self.value: Expression = value
@@ -233,11 +329,16 @@ class OptionalField(Lhs):
 
     Attributes:
         id (`string`): Id.
+        value (`Expression`): Expression the field is read from.
     """
 
-    def __init__(self, identifier: str, **kwargs):
+    __slots__ = ("id", "value")
+    _fields = Lhs._fields + __slots__
+
+    def __init__(self, identifier: str, value: Expression = None, **kwargs):
         super(OptionalField, self).__init__("OptionalField", **kwargs)
         self.id: str = identifier
+        self.value: Expression = value
 
 
 class IndexNotation(Enum):
@@ -253,6 +354,9 @@ class Index(Lhs):
         value (`string`): Id.
     """
 
+    __slots__ = ("idx", "value", "notation")
+    _fields = Lhs._fields + __slots__
+
     def __init__(
         self,
         idx: Expression,
@@ -280,6 +384,9 @@ class Assign(Statement):
 
     """
 
+    __slots__ = ("targets", "values")
+    _fields = Statement._fields + __slots__
+
     def __init__(self, targets: List[Node], values: List[Node], **kwargs):
         super().__init__("Assign", **kwargs)
         self.targets: List[Node] = targets
@@ -294,6 +401,8 @@ class LocalAssign(Assign):
         values (`list<Node>`): List of values.
     """
 
+    __slots__ = ()
+
     def __init__(self, targets: List[Node], values: List[Node], **kwargs):
         super().__init__(targets, values, **kwargs)
         self._name: str = "LocalAssign"
@@ -307,6 +416,9 @@ class While(Statement):
         body (`Block`): List of statements to execute.
     """
 
+    __slots__ = ("test", "body")
+    _fields = Statement._fields + __slots__
+
     def __init__(self, test: Expression, body: Block, **kwargs):
         super().__init__("While", **kwargs)
         self.test: Expression = test
@@ -320,6 +432,9 @@ class Do(Statement):
         body (`Block`): List of statements to execute.
     """
 
+    __slots__ = ("body",)
+    _fields = Statement._fields + __slots__
+
     def __init__(self, body: Block, **kwargs):
         super().__init__("Do", **kwargs)
         self.body: Block = body
@@ -333,6 +448,9 @@ class Repeat(Statement):
         body (`Block`): List of statements to execute.
     """
 
+    __slots__ = ("body", "test")
+    _fields = Statement._fields + __slots__
+
     def __init__(self, body: Block, test: Expression, **kwargs):
         super().__init__("Repeat", **kwargs)
         self.body: Block = body
@@ -348,6 +466,9 @@ class ElseIf(Statement):
         orelse (`list<Statement> or ElseIf`): List of statements or ElseIf if test if false.
     """
 
+    __slots__ = ("test", "body", "orelse")
+    _fields = Statement._fields + __slots__
+
     def __init__(self, test: Node, body: Block, orelse, **kwargs):
         super().__init__("ElseIf", **kwargs)
         self.test: Node = test
@@ -364,6 +485,9 @@ class If(Statement):
         orelse (`list<Statement> or ElseIf`): List of statements or ElseIf if test if false.
     """
 
+    __slots__ = ("test", "body", "orelse")
+    _fields = Statement._fields + __slots__
+
     def __init__(
         self, test: Expression, body: Block, orelse: List[Statement] or ElseIf, **kwargs
     ):
@@ -380,6 +504,9 @@ class Label(Statement):
         id (`Name`): Label name.
     """
 
+    __slots__ = ("id",)
+    _fields = Statement._fields + __slots__
+
     def __init__(self, label_id: Name, **kwargs):
         super(Label, self).__init__("Label", **kwargs)
         self.id: Name = label_id
@@ -392,6 +519,9 @@ class Goto(Statement):
         label (`Name`): Label node.
     """
 
+    __slots__ = ("label",)
+    _fields = Statement._fields + __slots__
+
     def __init__(self, label: Name, **kwargs):
         super(Goto, self).__init__("Goto", **kwargs)
         self.label: Name = label
@@ -400,6 +530,8 @@ class Goto(Statement):
 class SemiColon(Statement):
     """Define the semi-colon lua statement."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(SemiColon, self).__init__("SemiColon", **kwargs)
 
@@ -407,6 +539,8 @@ class SemiColon(Statement):
 class Break(Statement):
     """Define the break lua statement."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(Break, self).__init__("Break", **kwargs)
 
@@ -418,6 +552,9 @@ class Return(Statement):
         values (`list<Expression>`): Values to return.
     """
 
+    __slots__ = ("values",)
+    _fields = Statement._fields + __slots__
+
     def __init__(self, values, **kwargs):
         super(Return, self).__init__("Return", **kwargs)
         self.values = values
@@ -434,6 +571,9 @@ class Fornum(Statement):
         body (`Block`): List of statements to execute.
     """
 
+    __slots__ = ("target", "start", "stop", "step", "body")
+    _fields = Statement._fields + __slots__
+
     def __init__(
         self,
         target: Name,
@@ -460,6 +600,9 @@ class Forin(Statement):
         targets (`list<Name>`): Start index value.
     """
 
+    __slots__ = ("body", "iter", "targets")
+    _fields = Statement._fields + __slots__
+
     def __init__(
         self, body: Block, iter: List[Expression], targets: List[Name], **kwargs
     ):
@@ -477,6 +620,9 @@ class Call(Statement):
         args (`list<Expression>`): Function call arguments.
     """
 
+    __slots__ = ("func", "args")
+    _fields = Statement._fields + __slots__
+
     def __init__(self, func: Expression, args: List[Expression], **kwargs):
         super(Call, self).__init__("Call", **kwargs)
         self.func: Expression = func
@@ -492,6 +638,9 @@ class Invoke(Statement):
         args (`list<Expression>`): Function call arguments.
     """
 
+    __slots__ = ("source", "func", "args")
+    _fields = Statement._fields + __slots__
+
     def __init__(
         self, source: Expression, func: Expression, args: List[Expression], **kwargs
     ):
@@ -510,6 +659,9 @@ class Function(Statement):
         body (`Block`): List of statements to execute.
     """
 
+    __slots__ = ("name", "args", "body")
+    _fields = Statement._fields + __slots__
+
     def __init__(self, name: Expression, args: List[Expression], body: Block, **kwargs):
         super(Function, self).__init__("Function", **kwargs)
         self.name: Expression = name
@@ -526,6 +678,9 @@ class LocalFunction(Statement):
         body (`list<Statement>`): List of statements to execute.
     """
 
+    __slots__ = ("name", "args", "body")
+    _fields = Statement._fields + __slots__
+
     def __init__(self, name: Expression, args: List[Expression], body: Block, **kwargs):
         super(LocalFunction, self).__init__("LocalFunction", **kwargs)
         self.name: Expression = name
@@ -543,6 +698,9 @@ class Method(Statement):
         body (`Block`): List of statements to execute.
     """
 
+    __slots__ = ("source", "name", "args", "body")
+    _fields = Statement._fields + __slots__
+
     def __init__(
         self,
         source: Expression,
@@ -570,6 +728,8 @@ class Method(Statement):
 class Nil(Expression):
     """Define the Lua nil expression."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(Nil, self).__init__("Nil", **kwargs)
 
@@ -577,6 +737,8 @@ class Nil(Expression):
 class TrueExpr(Expression):
     """Define the Lua true expression."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(TrueExpr, self).__init__("True", **kwargs)
 
@@ -584,6 +746,8 @@ class TrueExpr(Expression):
 class FalseExpr(Expression):
     """Define the Lua false expression."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(FalseExpr, self).__init__("False", **kwargs)
 
@@ -598,6 +762,9 @@ class Number(Expression):
         n (`int|float`): Numeric value.
     """
 
+    __slots__ = ("n",)
+    _fields = Expression._fields + __slots__
+
     def __init__(self, n: NumberType, **kwargs):
         super(Number, self).__init__("Number", **kwargs)
         self.n: NumberType = n
@@ -606,6 +773,8 @@ class Number(Expression):
 class Varargs(Expression):
     """Define the Lua Varargs expression (...)."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super(Varargs, self).__init__("Varargs", **kwargs)
 
@@ -624,6 +793,9 @@ class String(Expression):
         delimiter (`StringDelimiter`): The string delimiter
     """
 
+    __slots__ = ("s", "delimiter")
+    _fields = Expression._fields + __slots__
+
     def __init__(
         self,
         s: str,
@@ -643,6 +815,9 @@ class Field(Expression):
         value (`Expression`): Value.
     """
 
+    __slots__ = ("key", "value", "between_brackets")
+    _fields = Expression._fields + __slots__
+
     def __init__(
         self,
         key: Expression,
@@ -663,6 +838,9 @@ class Table(Expression):
         fields (`list<Field>`): Table fields.
     """
 
+    __slots__ = ("fields",)
+    _fields = Expression._fields + __slots__
+
     def __init__(self, fields: List[Field], **kwargs):
         super().__init__("Table", **kwargs)
         self.fields: List[Field] = fields
@@ -671,6 +849,8 @@ class Table(Expression):
 class Dots(Expression):
     """Define the Lua dots (...) expression."""
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__("Dots", **kwargs)
 
@@ -683,6 +863,9 @@ class AnonymousFunction(Expression):
         body (`Block`): List of statements to execute.
     """
 
+    __slots__ = ("args", "body")
+    _fields = Expression._fields + __slots__
+
     def __init__(self, args: List[Expression], body: Block, **kwargs):
         super(AnonymousFunction, self).__init__("AnonymousFunction", **kwargs)
         self.args: List[Expression] = args
@@ -697,6 +880,8 @@ class AnonymousFunction(Expression):
 class Op(Expression):
     """Base class for Lua operators."""
 
+    __slots__ = ()
+
 
 class BinaryOp(Op):
     """Base class for Lua 'Left Op Right' Operators.
@@ -706,6 +891,9 @@ class BinaryOp(Op):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ("left", "right")
+    _fields = Op._fields + __slots__
+
     def __init__(self, name, left: Expression, right: Expression, **kwargs):
         super(BinaryOp, self).__init__(name, **kwargs)
         self.left: Expression = left
@@ -720,6 +908,8 @@ class BinaryOp(Op):
 class AriOp(BinaryOp):
     """Base class for Arithmetic Operators"""
 
+    __slots__ = ()
+
 
 class AddOp(AriOp):
     """Add expression.
@@ -729,6 +919,8 @@ class AddOp(AriOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("AddOp", left, right, **kwargs)
 
@@ -741,6 +933,8 @@ class SubOp(AriOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("SubOp", left, right, **kwargs)
 
@@ -753,6 +947,8 @@ class MultOp(AriOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("MultOp", left, right, **kwargs)
 
@@ -765,6 +961,8 @@ class FloatDivOp(AriOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("FloatDivOp", left, right, **kwargs)
 
@@ -777,6 +975,8 @@ class FloorDivOp(AriOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("FloorDivOp", left, right, **kwargs)
 
@@ -789,6 +989,8 @@ class ModOp(AriOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("ModOp", left, right, **kwargs)
 
@@ -801,6 +1003,8 @@ class ExpoOp(AriOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("ExpoOp", left, right, **kwargs)
 
@@ -813,6 +1017,8 @@ class ExpoOp(AriOp):
 class BitOp(BinaryOp):
     """Base class for bitwise Operators."""
 
+    __slots__ = ()
+
 
 class BAndOp(BitOp):
     """Bitwise and expression.
@@ -822,6 +1028,8 @@ class BAndOp(BitOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("BAndOp", left, right, **kwargs)
 
@@ -834,6 +1042,8 @@ class BOrOp(BitOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("BOrOp", left, right, **kwargs)
 
@@ -846,6 +1056,8 @@ class BXorOp(BitOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("BXorOp", left, right, **kwargs)
 
@@ -858,6 +1070,8 @@ class BShiftROp(BitOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("BShiftROp", left, right, **kwargs)
 
@@ -870,6 +1084,8 @@ class BShiftLOp(BitOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("BShiftLOp", left, right, **kwargs)
 
@@ -882,6 +1098,8 @@ class BShiftLOp(BitOp):
 class RelOp(BinaryOp):
     """Base class for Lua relational operators."""
 
+    __slots__ = ()
+
 
 class LessThanOp(RelOp):
     """Less than expression.
@@ -891,6 +1109,8 @@ class LessThanOp(RelOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("RLtOp", left, right, **kwargs)
 
@@ -903,6 +1123,8 @@ class GreaterThanOp(RelOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("RGtOp", left, right, **kwargs)
 
@@ -915,6 +1137,8 @@ class LessOrEqThanOp(RelOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("RLtEqOp", left, right, **kwargs)
 
@@ -927,6 +1151,8 @@ class GreaterOrEqThanOp(RelOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("RGtEqOp", left, right, **kwargs)
 
@@ -939,6 +1165,8 @@ class EqToOp(RelOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("REqOp", left, right, **kwargs)
 
@@ -951,6 +1179,8 @@ class NotEqToOp(RelOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("RNotEqOp", left, right, **kwargs)
 
@@ -963,6 +1193,8 @@ class NotEqToOp(RelOp):
 class LoOp(BinaryOp):
     """Base class for logical operators."""
 
+    __slots__ = ()
+
 
 class AndLoOp(LoOp):
     """Logical and expression.
@@ -972,6 +1204,8 @@ class AndLoOp(LoOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("LAndOp", left, right, **kwargs)
 
@@ -984,6 +1218,8 @@ class OrLoOp(LoOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("LOrOp", left, right, **kwargs)
 
@@ -1001,6 +1237,8 @@ class Concat(BinaryOp):
         right (`Expression`): Right expression.
     """
 
+    __slots__ = ()
+
     def __init__(self, left: Expression, right: Expression, **kwargs):
         super().__init__("Concat", left, right, **kwargs)
 
@@ -1017,6 +1255,9 @@ class UnaryOp(Expression):
         operand (`Expression`): Operand.
     """
 
+    __slots__ = ("operand",)
+    _fields = Expression._fields + __slots__
+
     def __init__(self, name: str, operand: Expression, **kwargs):
         super().__init__(name, **kwargs)
         self.operand = operand
@@ -1029,6 +1270,8 @@ class UMinusOp(UnaryOp):
         operand (`Expression`): Operand.
     """
 
+    __slots__ = ()
+
     def __init__(self, operand: Expression, **kwargs):
         super().__init__("UMinusOp", operand, **kwargs)
 
@@ -1040,6 +1283,8 @@ class UBNotOp(UnaryOp):
         operand (`Expression`): Operand.
     """
 
+    __slots__ = ()
+
     def __init__(self, operand: Expression, **kwargs):
         super().__init__("UBNotOp", operand, **kwargs)
 
@@ -1051,6 +1296,8 @@ class ULNotOp(UnaryOp):
         operand (`Expression`): Operand.
     """
 
+    __slots__ = ()
+
     def __init__(self, operand: Expression, **kwargs):
         super().__init__("ULNotOp", operand, **kwargs)
 
@@ -1063,5 +1310,7 @@ class ULNotOp(UnaryOp):
 class ULengthOP(UnaryOp):
     """Length operator."""
 
+    __slots__ = ()
+
     def __init__(self, operand: Expression, **kwargs):
         super().__init__("ULengthOp", operand, **kwargs)
@@ -0,0 +1,55 @@
+"""
+    ``backends`` module
+    ===================
+
+    Parsers turning a source into a Chunk, by name, see
+    ``ast.parse(source, backend=...)``.
+
+    A backend is called as backend(source, fast_lexer=..., comments=...)
+    and raises ``builder.SyntaxException`` on invalid sources. Options a
+    backend has no use for are ignored.
+"""
+from typing import Callable, Dict
+
+from luaparser import gen_converter
+from luaparser.astnodes import Chunk
+from luaparser.builder import Builder
+
+Backend = Callable[..., Chunk]
+
+DEFAULT_BACKEND = "builder"
+
+
+def _builder(source: str, fast_lexer: bool = False, comments: bool = True) -> Chunk:
+    return Builder(source, fast_lexer=fast_lexer, comments=comments).process()
+
+
+def _generated(package: str) -> Backend:
+    def parse(source: str, **options) -> Chunk:
+        return gen_converter.parse(source, package)
+
+    return parse
+
+
+BACKENDS: Dict[str, Backend] = {"builder": _builder}
+# antlr generated parsers, the trees have no comments nor token positions
+BACKENDS.update((package, _generated(package)) for package in gen_converter.PACKAGES)
+
+
+def register(name: str, backend: Backend) -> None:
+    """Make backend available as ast.parse(source, backend=name)."""
+    BACKENDS[name] = backend
+
+
+def get(name: str) -> Backend:
+    """Backend registered as name.
+
+    Raises:
+        ValueError: No backend has this name.
+    """
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            "unknown backend %r, expected one of %s" % (name, ", ".join(sorted(BACKENDS)))
+        ) from None
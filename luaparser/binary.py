@@ -0,0 +1,279 @@
+"""
+    ``binary`` module
+    =================
+
+    Compact binary encoding of an ast tree, see ``ast.dump_binary`` and
+    ``ast.load_binary``.
+
+    Layout (all integers are LEB128 varints, signed ones zigzag encoded)::
+
+        magic "LUAB", format version byte
+        string table: count, then utf-8 length and bytes of each string
+        node kinds: count, then (class name, display name) string indexes
+        root value
+
+    A value starts with a tag byte: None, False, True, int, float (8
+    bytes, little endian), string (table index), list (item count then
+    items), enum (class name index, member value) or a node. Node tags
+    hold the node kind, followed by a flag byte telling which token
+    positions are present, the positions, then the node fields in
+    ``_fields`` order. Each position is stored as deltas from the previous
+    one written, its token text as a string table index plus one, zero
+    for no text.
+"""
+import struct
+from enum import Enum
+from typing import Dict, List, Tuple
+
+from luaparser import astnodes
+from luaparser.astnodes import Node, TokenPosition
+
+MAGIC = b"LUAB"
+VERSION = 2
+
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _LIST, _ENUM, _NODE = range(9)
+# node kinds below 240 are packed in the tag, others follow a _NODE tag
+_FIRST_KIND_TAG = 16
+_PACKED_KINDS = 256 - _FIRST_KIND_TAG
+
+# position flags
+_HAS_FIRST = 1
+_HAS_LAST = 2
+_LAST_IS_FIRST = 4
+
+_DOUBLE = struct.Struct("<d")
+
+
+def _varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _zigzag(out: bytearray, n: int) -> None:
+    _varint(out, n << 1 if n >= 0 else (-n << 1) - 1)
+
+
+def dump(root) -> bytes:
+    """Encode a node, or any value held by a node field."""
+    strings: Dict[str, int] = {}
+    kinds: Dict[Tuple[type, str], int] = {}
+    body = bytearray()
+    write = body.append
+    # previous position: start, line, token index
+    previous = [0, 0, 0]
+
+    def intern(s: str) -> int:
+        index = strings.get(s)
+        if index is None:
+            index = strings[s] = len(strings)
+        return index
+
+    def string(s: str) -> None:
+        _varint(body, intern(s))
+
+    def position(p: TokenPosition) -> None:
+        _zigzag(body, p.start - previous[0])
+        _zigzag(body, p.stop - p.start)
+        _zigzag(body, p.line - previous[1])
+        _zigzag(body, p.column)
+        _zigzag(body, p.token_index - previous[2])
+        _zigzag(body, p.type)
+        _varint(body, 0 if p.text is None else intern(p.text) + 1)
+        previous[0], previous[1], previous[2] = p.start, p.line, p.token_index
+
+    def value(v) -> None:
+        if isinstance(v, Node):
+            cls = type(v)
+            kind = kinds.get((cls, v._name))
+            if kind is None:
+                kind = kinds[(cls, v._name)] = len(kinds)
+            if kind < _PACKED_KINDS:
+                write(_FIRST_KIND_TAG + kind)
+            else:
+                write(_NODE)
+                _varint(body, kind)
+
+            first, last = v._first_position, v._last_position
+            flags = 0
+            if first is not None:
+                flags |= _HAS_FIRST
+            if last is not None:
+                flags |= _LAST_IS_FIRST if last == first else _HAS_LAST
+            write(flags)
+            if first is not None:
+                position(first)
+            if flags & _HAS_LAST:
+                position(last)
+
+            for field in cls._fields:
+                value(getattr(v, field))
+        elif isinstance(v, list):
+            write(_LIST)
+            _varint(body, len(v))
+            for item in v:
+                value(item)
+        elif isinstance(v, str):
+            write(_STR)
+            string(v)
+        elif v is None:
+            write(_NONE)
+        elif v is True:
+            write(_TRUE)
+        elif v is False:
+            write(_FALSE)
+        elif isinstance(v, Enum):
+            write(_ENUM)
+            string(type(v).__name__)
+            _varint(body, v.value)
+        elif isinstance(v, int):
+            write(_INT)
+            _zigzag(body, v)
+        elif isinstance(v, float):
+            write(_FLOAT)
+            body.extend(_DOUBLE.pack(v))
+        else:
+            raise TypeError("cannot encode value of type " + type(v).__name__)
+
+    value(root)
+
+    kind_table = bytearray()
+    _varint(kind_table, len(kinds))
+    for cls, name in kinds:
+        _varint(kind_table, intern(cls.__name__))
+        _varint(kind_table, intern(name))
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _varint(out, len(strings))
+    for s in strings:
+        encoded = s.encode("utf-8", "surrogatepass")
+        _varint(out, len(encoded))
+        out += encoded
+    out += kind_table
+    out += body
+    return bytes(out)
+
+
+def load(data: bytes):
+    """Decode data written by dump.
+
+    Raises:
+        ValueError: data is not a binary tree of a supported version.
+    """
+    if data[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a binary lua tree")
+    if len(data) <= len(MAGIC) or data[len(MAGIC)] != VERSION:
+        raise ValueError("unsupported binary lua tree version")
+    pos = len(MAGIC) + 1
+    # previous position: start, line, token index
+    previous = [0, 0, 0]
+
+    def varint() -> int:
+        nonlocal pos
+        b = data[pos]
+        pos += 1
+        if b < 0x80:
+            return b
+        n = b & 0x7F
+        shift = 7
+        while True:
+            b = data[pos]
+            pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def zigzag() -> int:
+        n = varint()
+        return -((n + 1) >> 1) if n & 1 else n >> 1
+
+    def position() -> TokenPosition:
+        start = previous[0] + zigzag()
+        stop = start + zigzag()
+        line = previous[1] + zigzag()
+        column = zigzag()
+        token_index = previous[2] + zigzag()
+        previous[0], previous[1], previous[2] = start, line, token_index
+        token_type = zigzag()
+        text = varint()
+        return tuple.__new__(
+            TokenPosition,
+            (start, stop, line, column, token_index, token_type, strings[text - 1] if text else None),
+        )
+
+    def node(cls: type, name: str):
+        nonlocal pos
+        v = cls.__new__(cls)
+        v._name = name
+        flags = data[pos]
+        pos += 1
+        first = position() if flags & _HAS_FIRST else None
+        v._first_position = first
+        if flags & _LAST_IS_FIRST:
+            v._last_position = first
+        else:
+            v._last_position = position() if flags & _HAS_LAST else None
+        for field in cls._fields:
+            setattr(v, field, value())
+        return v
+
+    def value():
+        nonlocal pos
+        tag = data[pos]
+        pos += 1
+        if tag >= _FIRST_KIND_TAG:
+            return node(*kinds[tag - _FIRST_KIND_TAG])
+        if tag == _LIST:
+            return [value() for _ in range(varint())]
+        if tag == _STR:
+            return strings[varint()]
+        if tag == _NONE:
+            return None
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            return zigzag()
+        if tag == _FLOAT:
+            pos += _DOUBLE.size
+            return _DOUBLE.unpack_from(data, pos - _DOUBLE.size)[0]
+        if tag == _ENUM:
+            enum = _enum_class(strings[varint()])
+            return enum(varint())
+        if tag == _NODE:
+            return node(*kinds[varint()])
+        raise ValueError("invalid tag %d at offset %d" % (tag, pos - 1))
+
+    try:
+        strings: List[str] = []
+        for _ in range(varint()):
+            length = varint()
+            strings.append(bytes(data[pos: pos + length]).decode("utf-8", "surrogatepass"))
+            pos += length
+        kinds: List[Tuple[type, str]] = [
+            (_node_class(strings[varint()]), strings[varint()]) for _ in range(varint())
+        ]
+        root = value()
+    except (IndexError, UnicodeDecodeError, struct.error) as e:
+        raise ValueError("truncated or corrupted binary lua tree") from e
+    if pos != len(data):
+        raise ValueError("trailing data after binary lua tree")
+    return root
+
+
+def _node_class(name: str) -> type:
+    cls = getattr(astnodes, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Node)):
+        raise ValueError("unknown node class " + name)
+    return cls
+
+
+def _enum_class(name: str) -> type:
+    cls = getattr(astnodes, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, Enum)):
+        raise ValueError("unknown enum " + name)
+    return cls
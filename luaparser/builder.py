@@ -1,11 +1,14 @@
 import ast
+import functools
 import re
 
-from antlr4 import InputStream, CommonTokenStream
+from antlr4 import InputStream
 
 from luaparser.astnodes import *
+from luaparser.lexer import FastLuaLexer
 from luaparser.parser.LuaLexer import LuaLexer
-from typing import List, Tuple, Literal
+from luaparser.stream import ArrayTokenStream
+from typing import List, Optional, Tuple, Literal
 from antlr4.Token import Token
 
 
@@ -33,6 +36,15 @@ class Expr(Enum):
     ATOM = 10
 
 
+def _operators_from(operators: dict) -> dict:
+    """Token types of the operators of each level or a tighter one, by
+    level."""
+    return {
+        level.value: [t for t, (op_level, _) in operators.items() if op_level >= level.value]
+        for level in Expr
+    }
+
+
 # class Tokens:
 #     AND = 1
 #     BREAK = 2
@@ -176,6 +188,75 @@ def _listify(obj):
         return obj
 
 
+def _same_items(l1, l2) -> bool:
+    """True if both sequences hold the very same objects."""
+    return len(l1) == len(l2) and all(a is b for a, b in zip(l1, l2))
+
+
+def memoize(rule):
+    """Packrat memoization of an argument-less Builder rule.
+
+    When the builder memo table is enabled, the rule body runs at most once
+    per (rule, token index) for a given builder state. The memo entry holds
+    the builder state and comment list on entry, the result node, and the
+    state on exit (end index, comment list, expected tokens...). Replaying
+    it leaves the builder exactly as if the rule had run.
+    """
+    key = rule.__name__
+
+    @functools.wraps(rule)
+    def wrapper(self):
+        memo = self._memo
+        if memo is None:
+            return rule(self)
+
+        index = self._stream.index
+        state_in = (self._hidden_handled, self._right_index, self._pipe_in_function_call)
+        entry = memo.get((key, index))
+        if (
+                entry is not None
+                and entry[0] == state_in
+                and _same_items(entry[1], self.comments)
+        ):
+            (
+                _, _, result, end_index, state_out, comments, text, tok_type,
+                expected_reset, expected,
+            ) = entry
+            self._stream.index = end_index
+            self._hidden_handled, self._right_index, self._pipe_in_function_call = state_out
+            self.comments = list(comments)
+            self.text = text
+            self.type = tok_type
+            if expected_reset:
+                self._expected = list(expected)
+            else:
+                self._expected.extend(expected)
+            return result
+
+        comments_in = tuple(self.comments)
+        expected = self._expected
+        n_expected = len(expected)
+
+        result = rule(self)
+
+        expected_reset = self._expected is not expected
+        memo[(key, index)] = (
+            state_in,
+            comments_in,
+            result,
+            self._stream.index,
+            (self._hidden_handled, self._right_index, self._pipe_in_function_call),
+            tuple(self.comments),
+            self.text,
+            self.type,
+            expected_reset,
+            tuple(self._expected) if expected_reset else tuple(self._expected[n_expected:]),
+        )
+        return result
+
+    return wrapper
+
+
 class Builder:
     CLOSING_TOKEN = [LuaLexer.END, LuaLexer.CBRACE, LuaLexer.CPAR]
 
@@ -188,25 +269,74 @@ class Builder:
         -2,
     ]
 
-    REL_OPERATORS = [
-        LuaLexer.LT,
-        LuaLexer.GT,
-        LuaLexer.LTEQ,
-        LuaLexer.GTEQ,
-        LuaLexer.NEQ,
-        LuaLexer.EQ,
-    ]
-
-    def __init__(self, source):
-        self._stream = CommonTokenStream(LuaLexer(InputStream(source)))
+    # token type -> (precedence level, node class), all left associative
+    BINARY_OPERATORS = {
+        LuaLexer.OR: (Expr.OR.value, OrLoOp),
+        LuaLexer.AND: (Expr.AND.value, AndLoOp),
+        LuaLexer.LT: (Expr.REL.value, LessThanOp),
+        LuaLexer.GT: (Expr.REL.value, GreaterThanOp),
+        LuaLexer.LTEQ: (Expr.REL.value, LessOrEqThanOp),
+        LuaLexer.GTEQ: (Expr.REL.value, GreaterOrEqThanOp),
+        LuaLexer.NEQ: (Expr.REL.value, NotEqToOp),
+        LuaLexer.EQ: (Expr.REL.value, EqToOp),
+        LuaLexer.CONCAT: (Expr.CONCAT.value, Concat),
+        LuaLexer.ADD: (Expr.ADD.value, AddOp),
+        LuaLexer.MINUS: (Expr.ADD.value, SubOp),
+        LuaLexer.MULT: (Expr.MULT.value, MultOp),
+        LuaLexer.DIV: (Expr.MULT.value, FloatDivOp),
+        LuaLexer.MOD: (Expr.MULT.value, ModOp),
+        LuaLexer.FLOOR: (Expr.MULT.value, FloorDivOp),
+        LuaLexer.BITAND: (Expr.BITWISE.value, BAndOp),
+        LuaLexer.BITOR: (Expr.BITWISE.value, BOrOp),
+        LuaLexer.BITNOT: (Expr.BITWISE.value, BXorOp),
+        LuaLexer.BITRSHIFT: (Expr.BITWISE.value, BShiftROp),
+        LuaLexer.BITRLEFT: (Expr.BITWISE.value, BShiftLOp),
+    }
+    # what the rules of the levels tighter than an operator expect before it
+    BINARY_OPERATORS_FROM = _operators_from(BINARY_OPERATORS)
+
+    # tokens a var (callee) can start with
+    VAR_FIRST_TOKENS = [LuaLexer.OPAR, LuaLexer.CONCAT, LuaLexer.NAME]
+
+    UNARY_OPERATORS = {
+        LuaLexer.MINUS: UMinusOp,
+        LuaLexer.LENGTH: ULengthOP,
+        LuaLexer.NOT: ULNotOp,
+        LuaLexer.BITNOT: UBNotOp,
+    }
+
+    def __init__(
+            self,
+            source,
+            packrat: bool = True,
+            fast_lexer: bool = False,
+            comments: bool = True,
+            offset: Optional[Tuple[int, int, int, int]] = None,
+    ):
+        """
+
+        Args:
+            source: Lua source code
+            packrat: Memoize backtracking rules by token index
+            fast_lexer: Tokenize with the hand-written FastLuaLexer instead
+                of the antlr generated one
+            comments: Attach comments to the nodes. When False, hidden
+                tokens are skipped and no Comment node is built
+            offset: Optional (char, line, column, token index) of the
+                start of source in a larger source, see ArrayTokenStream:
+                positions of the tree and of errors are the ones in the
+                larger source
+        """
+        lexer = FastLuaLexer(source) if fast_lexer else LuaLexer(InputStream(source))
+        self._stream = ArrayTokenStream(lexer, offset)
         # contains a list of CommonTokens
         self._line_count: int = 0
         self._right_index: int = 0
         self._last_expr_type: Optional[int] = None
 
-        # following stack are used to backup values
-        self._index_stack: List[int] = []
-        self._right_index_stack: List[int] = []
+        # backtracking points: (token index, right index, comment count,
+        # hidden handled), see save()
+        self._save_stack: List[Tuple[int, int, int, bool]] = []
         self.text: str = ""  # last token text
         self.type: int = -1  # last token type
 
@@ -214,18 +344,31 @@ class Builder:
         self._expected = []
 
         # comments waiting to be inserted into ast nodes
-        self._comments_index_stack: List[int] = []
         self.comments: List[Comment] = []
         self._hidden_handled: bool = False
-        self._hidden_handled_stack: List[bool] = []
+        self._with_comments: bool = comments
+        # comments of each run of hidden tokens, see _hidden_gaps
+        self._gaps: Optional[List[Optional[Tuple[Optional[Comment], ...]]]] = (
+            self._hidden_gaps() if comments else None
+        )
 
         # special case for stupid PIPE in function call
         self._pipe_in_function_call: bool = False
 
+        # packrat memo table: (rule name, token index) -> memo entry
+        self._memo: Optional[dict] = {} if packrat else None
+
     @property
     def _LT(self) -> CommonToken:
         """Last token that was consumed in next_i*_* method."""
-        return self._stream.LT(-1)
+        stream = self._stream
+        index = stream.prev_default[stream.index]
+        return stream.tokens[index] if index >= 0 else None
+
+    def _next_type(self) -> int:
+        """Type of the next default channel token."""
+        stream = self._stream
+        return stream.types[stream.index]
 
     def process(self) -> Chunk:
         node = self.parse_chunk()
@@ -236,65 +379,56 @@ class Builder:
 
     def save(self):
         # logging.debug('trying ' + inspect.stack()[1][3])
-        self._index_stack.append(self._stream.index)
-        self._right_index_stack.append(self._right_index)
-        self._comments_index_stack.append(len(self.comments))
-        self._hidden_handled_stack.append(self._hidden_handled)
+        self._save_stack.append(
+            (self._stream.index, self._right_index, len(self.comments), self._hidden_handled)
+        )
 
     def success(self):
-        self._index_stack.pop()
-        self._right_index_stack.pop()
-        self._comments_index_stack.pop()
-        self._hidden_handled_stack.pop()
+        self._save_stack.pop()
         return True
 
+    def _restore(self, saved: Tuple[int, int, int, bool]) -> None:
+        # saved indexes are always on a default channel token, no need to
+        # seek. Queued comments are shared nodes (see _hidden_gaps): going
+        # back only drops the references queued since.
+        self._stream.index, self._right_index, n_comments, self._hidden_handled = saved
+        del self.comments[n_comments:]
+
     def failure(self):
-        self._stream.seek(self._index_stack.pop())
-        self._right_index = self._right_index_stack.pop()
-        self._hidden_handled = self._hidden_handled_stack.pop()
-        n_elem_to_delete = len(self.comments) - self._comments_index_stack.pop()
-        if n_elem_to_delete >= 1:
-            del self.comments[-n_elem_to_delete:]
+        self._restore(self._save_stack.pop())
         return False
 
     def failure_save(self):
-        self._stream.seek(self._index_stack.pop())
-        self._right_index = self._right_index_stack.pop()
-        self._hidden_handled = self._hidden_handled_stack.pop()
-        n_elem_to_delete = len(self.comments) - self._comments_index_stack.pop()
-        if n_elem_to_delete >= 1:
-            del self.comments[-n_elem_to_delete:]
-
-        self._index_stack.append(self._stream.index)
-        self._right_index_stack.append(self._right_index)
-        self._comments_index_stack.append(len(self.comments))
-        self._hidden_handled_stack.append(self._hidden_handled)
+        self._restore(self._save_stack[-1])
+        self._save_stack[-1] = (
+            self._stream.index, self._right_index, len(self.comments), self._hidden_handled
+        )
 
     def next_is_rc(
             self, type_to_seek: int, hidden_right: bool = True
     ) -> Optional[Token]:
-        token = self._stream.LT(1)
-        tok_type: int = token.type
-        self._right_index = self._stream.index
-
-        if tok_type == type_to_seek:
-            self.text = token.text
-            self.type = tok_type
-            self._stream.consume()
+        stream = self._stream
+        index = stream.index
+        self._right_index = index
+
+        if stream.types[index] == type_to_seek:
+            self.text = stream.texts[index]
+            self.type = type_to_seek
+            stream.index = stream.next_default[index + 1]
             self._hidden_handled = False
             if hidden_right:
                 self.handle_hidden_right()
-            return token
+            return stream.tokens[index]
         self._expected.append(type_to_seek)
         return None
 
     def next_is_c(self, type_to_seek: int, hidden_right: bool = True) -> bool:
-        token = self._stream.LT(1)
-        tok_type: int = token.type
-        self._right_index = self._stream.index
+        stream = self._stream
+        index = stream.index
+        self._right_index = index
 
-        if tok_type == type_to_seek:
-            self._stream.consume()
+        if stream.types[index] == type_to_seek:
+            stream.index = stream.next_default[index + 1]
             self._hidden_handled = False
             if hidden_right:
                 self.handle_hidden_right()
@@ -303,23 +437,27 @@ class Builder:
         return False
 
     def next_is(self, type_to_seek) -> bool:
-        if self._stream.LT(1).type == type_to_seek:
+        stream = self._stream
+        if stream.types[stream.index] == type_to_seek:
             return True
         else:
             self._expected.append(type_to_seek)
             return False
 
     def prev_is(self, type_to_seek) -> bool:
-        return self._stream.LT(-1).type == type_to_seek
+        stream = self._stream
+        index = stream.prev_default[stream.index]
+        return index >= 0 and stream.types[index] == type_to_seek
 
     def next_in_rc(self, types: List[int], hidden_right: bool = True) -> bool:
-        token = self._stream.LT(1)
-        tok_type: int = token.type
-        self._right_index = self._stream.index
+        stream = self._stream
+        index = stream.index
+        tok_type: int = stream.types[index]
+        self._right_index = index
 
         if tok_type in types:
             self.type = tok_type
-            self._stream.consume()
+            stream.index = stream.next_default[index + 1]
             self._hidden_handled = False
             if hidden_right:
                 self.handle_hidden_right()
@@ -328,68 +466,77 @@ class Builder:
         return False
 
     def next_in(self, types: List[int]) -> bool:
-        if self._stream.LT(1).type in types:
+        stream = self._stream
+        if stream.types[stream.index] in types:
             return True
         else:
             self._expected.extend(types)
             return False
 
-    def handle_hidden_left(self) -> None:
-        if self._hidden_handled:
-            return
-        tokens = self._stream.getHiddenTokensToLeft(self._stream.index)
-        if tokens:
-            for t in tokens:
-                if t.type == LuaLexer.LINE_COMMENT:
-                    self.comments.append(
-                        Comment(
-                            t.text,
-                            first_token=t,
-                            last_token=t,
-                        )
+    def _hidden_items(self, first: int) -> Tuple[Optional[Comment], ...]:
+        """Comments and newline markers (None) of the hidden tokens from
+        index first up to the next default channel token."""
+        items = []
+        stream = self._stream
+        for t in stream.tokens[first: stream.next_default[first]]:
+            if t.type == LuaLexer.LINE_COMMENT:
+                items.append(
+                    Comment(
+                        t.text,
+                        first_token=t,
+                        last_token=t,
                     )
-                elif t.type == LuaLexer.COMMENT:
-                    self.comments.append(
-                        Comment(
-                            t.text,
-                            True,
-                            first_token=t,
-                            last_token=t,
-                        )
+                )
+            elif t.type == LuaLexer.COMMENT:
+                items.append(
+                    Comment(
+                        t.text,
+                        True,
+                        first_token=t,
+                        last_token=t,
                     )
-                elif t.type == LuaLexer.NEWLINE:
-                    # append n time a None value (indicate newline)
-                    self.comments += t.text.count("\n") * [None]
+                )
+            elif t.type == LuaLexer.NEWLINE:
+                # append n time a None value (indicate newline)
+                items += t.text.count("\n") * [None]
+        return tuple(items)
+
+    def _hidden_gaps(self) -> List[Optional[Tuple[Optional[Comment], ...]]]:
+        """Hidden items of every run of hidden tokens, indexed by the first
+        token of the run (None elsewhere).
+
+        Comment nodes are built once per parse: backtracking over a comment
+        only truncates self.comments and queues the same nodes again.
+        """
+        tokens = self._stream.tokens
+        gaps = [None] * (len(tokens) + 1)
+        first = 0
+        for index, t in enumerate(tokens):
+            if t.channel == Token.DEFAULT_CHANNEL:
+                gaps[first] = self._hidden_items(first) if first < index else ()
+                first = index + 1
+        gaps[first] = ()
+        return gaps
+
+    def _queue_hidden(self, first: int) -> None:
+        items = self._gaps[first]
+        if items is None:
+            # run of hidden tokens entered halfway
+            items = self._gaps[first] = self._hidden_items(first)
+        if items:
+            self.comments.extend(items)
 
+    def handle_hidden_left(self) -> None:
+        if self._hidden_handled or not self._with_comments:
+            return
+        stream = self._stream
+        self._queue_hidden(stream.prev_default[stream.index] + 1)
         self._hidden_handled = True
 
     def handle_hidden_right(self) -> None:
-        if self._hidden_handled:
+        if self._hidden_handled or not self._with_comments:
             return
-        tokens = self._stream.getHiddenTokensToRight(self._right_index)
-        if tokens:
-            for t in tokens:
-                if t.type == LuaLexer.LINE_COMMENT:
-                    self.comments.append(
-                        Comment(
-                            t.text,
-                            first_token=t,
-                            last_token=t,
-                        )
-                    )
-                elif t.type == LuaLexer.COMMENT:
-                    self.comments.append(
-                        Comment(
-                            t.text,
-                            True,
-                            first_token=t,
-                            last_token=t,
-                        )
-                    )
-                elif t.type == LuaLexer.NEWLINE:
-                    # append n time a None value (indicate newline)
-                    self.comments += t.text.count("\n") * [None]
-
+        self._queue_hidden(self._right_index + 1)
         self._hidden_handled = True
 
     def get_comments(self) -> Comments:
@@ -486,43 +633,59 @@ class Builder:
         return Block(
             statements,
             first_token=t,
-            last_token=statements[-1].last_token if statements else None,
+            last_token=statements[-1].last_position if statements else None,
             comments=self.get_comments(),
         )
 
     def parse_stat(self) -> Statement or None:
         comments = self.get_comments()
+        first = self._stream.index
+
+        for step in self._STAT_DISPATCH.get(self._next_type(), self._STAT_NO_MATCH):
+            if step[0] is None:
+                # statements that cannot start with this token
+                _, reset, expected = step
+                if reset:
+                    self._expected = list(expected)
+                else:
+                    self._expected.extend(expected)
+                continue
+
+            parse, keep_comments = step
+            stat = parse(self)
+            if stat:
+                if keep_comments:
+                    stat.comments = comments
+                # statements built without their tokens still get their span
+                if stat._first_position is None:
+                    stat.first_token = self._stream.tokens[first]
+                if stat._last_position is None:
+                    stat.last_token = self._stream.tokens[self._stream.prev_default[self._stream.index]]
+                return stat
 
-        stat = (
-                self.parse_assignment()
-                or self.parse_var(is_statement=True)
-                or self.parse_while_stat()
-                or self.parse_repeat_stat()
-                or self.parse_local()
-                or self.parse_goto_stat()
-                or self.parse_if_stat()
-                or self.parse_for_stat()
-                or self.parse_function()
-                or self.parse_label()
-        )
+        return None
 
-        if stat:
-            stat.comments = comments
-            return stat
+    def parse_call_stat(self) -> Statement or bool:
+        return self.parse_var(is_statement=True)
 
+    def parse_do_stat(self) -> Do or bool:
         stat = self.parse_do_block()
         if stat:
             self.handle_hidden_right()
             return Do(stat)
+        return False
 
+    def parse_break_stat(self) -> Break or bool:
         if self.next_is(LuaLexer.BREAK) and self.next_is_rc(LuaLexer.BREAK):
             self.handle_hidden_right()
             return Break()
+        return False
+
+    def parse_semcol_stat(self) -> SemiColon or bool:
         if self.next_is(LuaLexer.SEMCOL) and self.next_is_rc(LuaLexer.SEMCOL):
             self.handle_hidden_right()
             return SemiColon()
-
-        return None
+        return False
 
     def parse_ret_stat(self) -> Return or bool:
         self.save()
@@ -583,11 +746,24 @@ class Builder:
     # When is_statement is true, root must be a Statement.
     def parse_var(self, is_statement=False) -> Node or bool:
         self.save()
+        root = self.parse_var_chain()
+        if root:
+            if is_statement and not isinstance(root, Statement):
+                return self.failure()
+            self.handle_hidden_right()
+            self.success()
+            return root
+
+        return self.failure()
+
+    @memoize
+    def parse_var_chain(self) -> Node or bool:
+        """Parse a callee followed by its tails (index, call, invoke...)."""
         root = self.parse_callee()
         if root:
             tail = self.parse_tail()
             while tail:
-                tail.first_token = root.first_token
+                tail.first_token = root.first_position
 
                 if isinstance(tail, Call):
                     tail.func = root
@@ -604,21 +780,15 @@ class Builder:
                     tail = Call(
                         root,
                         args,
-                        first_token=root.first_token,
-                        last_token=args[-1].last_token if args else None,
+                        first_token=root.first_position,
+                        last_token=args[-1].last_position if args else None,
                     )
                 root = tail
 
                 tail = self.parse_tail()
                 if tail:
                     self.handle_hidden_right()
-            if is_statement and not isinstance(root, Statement):
-                return self.failure()
-            self.handle_hidden_right()
-            self.success()
-            return root
-
-        return self.failure()
+        return root
 
     def parse_tail(self) -> Node or bool:
         # do not render last hidden
@@ -862,8 +1032,8 @@ class Builder:
                             Index(
                                 target,
                                 value,
-                                first_token=target.first_token,
-                                last_token=target.last_token,
+                                first_token=target.first_position,
+                                last_token=target.last_position,
                             )
                         )
                 else:
@@ -874,7 +1044,7 @@ class Builder:
                     targets,
                     values,
                     first_token=start_token,
-                    last_token=values[-1].last_token if values else None,
+                    last_token=values[-1].last_position if values else None,
                 )
 
             self.save()
@@ -892,7 +1062,7 @@ class Builder:
                     node = LocalFunction(name, body[0], body[1])
                     self.handle_hidden_right()
                     node.first_token = start_token
-                    node.last_token = body[1].last_token
+                    node.last_token = body[1].last_position
                     return node
             self.failure()
             self.abort()
@@ -1013,8 +1183,8 @@ class Builder:
                         replace_expr = Call(
                             Name("pairs"),
                             [first_expr],
-                            first_token=first_expr.first_token,
-                            last_token=first_expr.last_token,
+                            first_token=first_expr.first_position,
+                            last_token=first_expr.last_position,
                         )
                         body = self.parse_optional_do_block()
                         if body:
@@ -1050,7 +1220,7 @@ class Builder:
                             func_body[0],
                             func_body[1],
                             first_token=start_token,
-                            last_token=func_body[1].last_token,
+                            last_token=func_body[1].last_position,
                         )
                         self.handle_hidden_right()
                         return node
@@ -1065,7 +1235,7 @@ class Builder:
                         func_body[0],
                         func_body[1],
                         first_token=start_token,
-                        last_token=func_body[1].last_token,
+                        last_token=func_body[1].last_position,
                     )
                     self.handle_hidden_right()
                     return node
@@ -1216,277 +1386,124 @@ class Builder:
             )
         return self.failure()
 
+    @memoize
     def parse_expr(self) -> Expression or bool:
-        return self.parse_or_expr()
-
-    def parse_or_expr(self) -> Expression or Literal[False]:
-        self.save()
-        left = self.parse_and_expr()
-        if left:
-            while True:
-                self.save()
-                if self.next_is_rc(LuaLexer.OR):
-                    right = self.parse_and_expr()
-                    if right:
-                        self.success()
-                        left = OrLoOp(left, right)
-                    else:
-                        self.failure()
-                        return self.failure()
-                else:
-                    self.failure()
-                    break
-            self.success()
-            return left
-
-        return self.failure()
-
-    def parse_and_expr(self) -> Expression or bool:
-        self.save()
-        left = self.parse_rel_expr()
-        if left:
-            while True:
-                self.save()
-                if self.next_is_rc(LuaLexer.AND):
-                    right = self.parse_rel_expr()
-                    if right:
-                        self.success()
-                        left = AndLoOp(left, right)
-                    else:
-                        self.failure()
-                        return self.failure()
-                else:
-                    self.failure()
-                    break
-            self.success()
-            return left
-
-        return self.failure()
-
-    def parse_rel_expr(self) -> Expression or bool:
-        self.save()
-        left = self.parse_concat_expr()
-        if left:
-            self.save()
-            if self.next_in_rc(self.REL_OPERATORS):
-                op = self.type
-                right = self.parse_concat_expr()
-                if right:
-                    self.success()
-                    if op == LuaLexer.LT:
-                        left = LessThanOp(left, right)
-                    elif op == LuaLexer.GT:
-                        left = GreaterThanOp(left, right)
-                    elif op == LuaLexer.LTEQ:
-                        left = LessOrEqThanOp(left, right)
-                    elif op == LuaLexer.GTEQ:
-                        left = GreaterOrEqThanOp(left, right)
-                    elif op == LuaLexer.NEQ:
-                        left = NotEqToOp(left, right)
-                    elif op == LuaLexer.EQ:
-                        left = EqToOp(left, right)
-                else:
-                    self.failure()
-                    return self.failure()
-            else:
-                self.failure()
-            self.success()
-            return left
-        return self.failure()
-
-    def parse_concat_expr(self) -> Expression or bool:
-        self.save()
-        left = self.parse_add_expr()
-        if left:
-            while True:
-                self.save()
-                if self.next_is_rc(LuaLexer.CONCAT):
-                    self._expected = []
-                    right = self.parse_add_expr()
-                    if right:
-                        self.success()
-                        left = Concat(left, right)
-                    else:
-                        self.failure()
-                        self.failure()
-                        self.abort()
-                else:
-                    self.failure()
-                    break
-            self.success()
-            return left
-
-        return self.failure()
-
-    def parse_add_expr(self) -> Expression or bool:
         self.save()
-        left = self.parse_mult_expr()
-        if left:
-            while True:
-                self.save()
-                if self.next_in_rc([LuaLexer.ADD, LuaLexer.MINUS]):
-                    op = self.type
-                    right = self.parse_mult_expr()
-                    if right:
-                        self.success()
-                        if op == LuaLexer.ADD:
-                            left = AddOp(left, right)
-                        elif op == LuaLexer.MINUS:
-                            left = SubOp(left, right)
-                    else:
-                        self.failure()
-                        return self.failure()
-                else:
-                    self.failure()
-                    break
+        expr = self.parse_binary_expr(Expr.OR.value)
+        if expr:
             self.success()
-            return left
-
+            return expr
         return self.failure()
 
-    def parse_mult_expr(self) -> Expression or bool:
-        self.save()
-        left = self.parse_bitwise_expr()
-        if left:
-            while True:
-                self.save()
-                if self.next_in_rc([LuaLexer.MULT, LuaLexer.DIV, LuaLexer.MOD, LuaLexer.FLOOR]):
-                    op = self.type
-                    right = self.parse_bitwise_expr()
-                    if right:
-                        self.success()
-                        if op == LuaLexer.MULT:
-                            left = MultOp(left, right)
-                        elif op == LuaLexer.DIV:
-                            left = FloatDivOp(left, right)
-                        elif op == LuaLexer.MOD:
-                            left = ModOp(left, right)
-                        elif op == LuaLexer.FLOOR:
-                            left = FloorDivOp(left, right)
-                    else:
-                        self.failure()
-                        return self.failure()
-                else:
-                    self.failure()
-                    break
-            self.success()
-            return left
+    def parse_binary_expr(self, min_level: int) -> Expression or bool:
+        """Precedence climbing over BINARY_OPERATORS.
 
-        return self.failure()
+        Parse an unary expression followed by binary operators of level
+        min_level or higher. Relational operators do not chain: in
+        ``a < b < c`` the expression stops before the second ``<``.
 
-    def parse_bitwise_expr(self) -> Expression or bool:
-        self.save()
+        Expected tokens are the ones of a rule per level: after an operand,
+        the operators of every level tried before the next one matched.
+        """
+        start = self._stream.index
         left = self.parse_unary_expr()
-        if left:
-            while True:
-                self.save()
-                if self.next_in_rc(
-                        [
-                            LuaLexer.BITAND,
-                            LuaLexer.BITOR,
-                            LuaLexer.BITNOT,
-                            LuaLexer.BITRSHIFT,
-                            LuaLexer.BITRLEFT,
-                        ]
-                ):
-                    op = self.type
-                    right = self.parse_unary_expr()
-                    if right:
-                        self.success()
-                        if op == LuaLexer.BITAND:
-                            left = BAndOp(left, right)
-                        elif op == LuaLexer.BITOR:
-                            left = BOrOp(left, right)
-                        elif op == LuaLexer.BITNOT:
-                            left = BXorOp(left, right)
-                        elif op == LuaLexer.BITRSHIFT:
-                            left = BShiftROp(left, right)
-                        elif op == LuaLexer.BITRLEFT:
-                            left = BShiftLOp(left, right)
-                    else:
-                        self.failure()
-                        return self.failure()
-                else:
-                    self.failure()
-                    break
-            self.success()
-            return left
+        if not left:
+            return False
 
-        return self.failure()
+        left_level = Expr.ATOM.value
+        while True:
+            tok_type = self._next_type()
+            operator = self.BINARY_OPERATORS.get(tok_type)
+            if operator is None:
+                self._expect_operators(min_level, left_level == Expr.REL.value)
+                return left
+            level, node_class = operator
+            if level < min_level or (level == Expr.REL.value and left_level <= level):
+                self._expect_operators(min_level, level == Expr.REL.value)
+                return left
+
+            if level < Expr.BITWISE.value:
+                self._expect_operators(level + 1, left_level == Expr.REL.value)
+            self.next_is_rc(tok_type)
+            if level == Expr.CONCAT.value:
+                self._expected = []
+            right = self.parse_binary_expr(level + 1)
+            if not right:
+                if level == Expr.CONCAT.value:
+                    self._stream.seek(start)
+                    self.abort()
+                return False
+            left = node_class(left, right)
+            left_level = level
+
+    def _expect_operators(self, min_level: int, after_rel: bool):
+        """Add the operators of level min_level or higher to the expected
+        tokens. Right after a relational operation, relational operators
+        are not tried again."""
+        if after_rel:
+            self._expected.extend(
+                t for t in self.BINARY_OPERATORS_FROM[min_level]
+                if self.BINARY_OPERATORS[t][0] != Expr.REL.value
+            )
+        else:
+            self._expected.extend(self.BINARY_OPERATORS_FROM[min_level])
 
     def parse_unary_expr(self) -> Expression or bool:
-        self.save()
-        if self.next_is_rc(LuaLexer.MINUS):
-            t: Token = self._LT
-            expr = self.parse_unary_expr()
-            if expr:
-                self.success()
-                return UMinusOp(expr, first_token=t, last_token=t)
+        tok_type = self._next_type()
+        node_class = self.UNARY_OPERATORS.get(tok_type)
+        if node_class is None:
+            self._expected.extend(self.UNARY_OPERATORS)
+            return self.parse_pow_expr()
 
-        self.failure_save()
-        if self.next_is_rc(LuaLexer.LENGTH):
-            t: Token = self._LT
+        self.save()
+        self.next_is_rc(tok_type)
+        t: Token = self._LT
+        if tok_type == LuaLexer.LENGTH:
             expr = self.parse_expr()
-            if expr:
-                self.success()
-                return ULengthOP(expr, first_token=t, last_token=t)
-
-        self.failure_save()
-        if self.next_is_rc(LuaLexer.NOT):
-            t: Token = self._LT
-            expr = self.parse_unary_expr()
-            if expr:
-                self.success()
-                return ULNotOp(expr, first_token=t, last_token=t)
-
-        self.failure_save()
-        if self.next_is_rc(LuaLexer.BITNOT):
-            t: Token = self._LT
+        else:
             expr = self.parse_unary_expr()
-            if expr:
-                self.success()
-                return UBNotOp(expr, first_token=t, last_token=t)
-
-        self.failure_save()
-        expr = self.parse_pow_expr()
         if expr:
             self.success()
-            return expr
-
-        return self.failure()
+            return node_class(expr, first_token=t, last_token=t)
+        self.failure()
+        # no atom starts with an unary operator, only collect expected tokens
+        return self.parse_pow_expr()
 
     def parse_pow_expr(self) -> Expression or bool:
-        self.save()
         left = self.parse_atom()
         if left:
-            while True:
-                self.save()
-                if self.next_is_rc(LuaLexer.POW):
-                    right = self.parse_expr()
-                    if right:
-                        self.success()
-                        left = ExpoOp(left, right)
-                    else:
-                        self.failure()
-                        return self.failure()
-                else:
-                    self.failure()
-                    break
-            self.success()
+            while self.next_is(LuaLexer.POW):
+                self.next_is_rc(LuaLexer.POW)
+                # right operand is a whole expression
+                right = self.parse_expr()
+                if not right:
+                    return False
+                left = ExpoOp(left, right)
             return left
-
-        self.failure()
+        return False
 
     def parse_atom(self) -> Expression or bool:
-        atom = self.parse_var()
-        if atom:
-            return atom
-        atom = self.parse_function_literal()
-        if atom:
-            return atom
-        atom = self.parse_table_constructor()
-        if atom:
-            return atom
+        # only try the alternatives that can start with the next token,
+        # skipped ones just record what they would have expected
+        tok_type = self._next_type()
+        if tok_type in self.VAR_FIRST_TOKENS:
+            atom = self.parse_var()
+            if atom:
+                return atom
+        else:
+            self._expected.extend(self.VAR_FIRST_TOKENS)
+        if tok_type == LuaLexer.FUNCTION:
+            atom = self.parse_function_literal()
+            if atom:
+                return atom
+        else:
+            self._expected.append(LuaLexer.FUNCTION)
+        if tok_type == LuaLexer.OBRACE:
+            atom = self.parse_table_constructor()
+            if atom:
+                return atom
+        else:
+            self._expected.append(LuaLexer.OBRACE)
         if self.next_is(LuaLexer.VARARGS) and self.next_is_rc(LuaLexer.VARARGS):
             return Varargs()
 
@@ -1669,4 +1686,55 @@ class Builder:
             return self.success()
         return self.failure()
 
-#don't touch the pipes!
\ No newline at end of file
+
+# Statement parsers in the order parse_stat tries them:
+# (parser, first tokens, resets expected tokens, keeps statement comments)
+STATEMENTS = [
+    (Builder.parse_assignment, Builder.VAR_FIRST_TOKENS, False, True),
+    (Builder.parse_call_stat, Builder.VAR_FIRST_TOKENS, False, True),
+    (Builder.parse_while_stat, [LuaLexer.WHILE], False, True),
+    (Builder.parse_repeat_stat, [LuaLexer.REPEAT], False, True),
+    (Builder.parse_local, [LuaLexer.LOCAL], True, True),
+    (Builder.parse_goto_stat, [LuaLexer.GOTO], False, True),
+    (Builder.parse_if_stat, [LuaLexer.IF], False, True),
+    (Builder.parse_for_stat, [LuaLexer.FOR], False, True),
+    (Builder.parse_function, [LuaLexer.FUNCTION], True, True),
+    (Builder.parse_label, [LuaLexer.COLCOL], False, True),
+    (Builder.parse_do_stat, [LuaLexer.DO], False, False),
+    (Builder.parse_break_stat, [LuaLexer.BREAK], False, False),
+    (Builder.parse_semcol_stat, [LuaLexer.SEMCOL], False, False),
+]
+
+
+def _statement_steps(tok_type: Optional[int]) -> list:
+    """Steps of parse_stat for a first token.
+
+    A step is either (parser, keeps comments) for a statement that can start
+    with tok_type, or (None, reset, expected) standing for the statements
+    that cannot: they would only have failed and recorded expected tokens.
+    """
+    steps = []
+    reset, expected = False, []
+    for parse, first_tokens, resets_expected, keep_comments in STATEMENTS:
+        if tok_type in first_tokens:
+            if reset or expected:
+                steps.append((None, reset, expected))
+                reset, expected = False, []
+            steps.append((parse, keep_comments))
+        else:
+            if resets_expected:
+                reset, expected = True, []
+            expected = expected + first_tokens
+    if reset or expected:
+        steps.append((None, reset, expected))
+    return steps
+
+
+Builder._STAT_DISPATCH = {
+    tok_type: _statement_steps(tok_type)
+    for _, first_tokens, _, _ in STATEMENTS
+    for tok_type in first_tokens
+}
+Builder._STAT_NO_MATCH = _statement_steps(None)
+
+#don't touch the pipes!
@@ -0,0 +1,155 @@
+"""
+    ``cache`` module
+    ================
+
+    On-disk cache of parsed trees, see ``ast.parse(source, cache=...)``.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import List, Optional, Tuple
+
+import luaparser
+from luaparser import backends
+from luaparser.astnodes import Chunk
+
+ENTRY_SUFFIX = ".pickle"
+
+
+class ASTCache:
+    """Directory of pickled Chunks keyed by source and parse options.
+
+    The key of an entry is the sha256 of the source, plus a digest of the
+    luaparser version, luaparser.TREE_REVISION and the parse options: a
+    new version, tree revision or other options never reuse an old tree.
+    When the entries take more than max_size bytes, the least recently
+    used ones are deleted.
+
+    Entries are unpickled, so only use a directory you trust.
+
+    Attributes:
+        hits: Number of trees read from the cache.
+        misses: Number of trees that had to be parsed.
+    """
+
+    def __init__(self, directory: str, max_size: int = 256 * 1024 * 1024):
+        self.directory: str = directory
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        # total size of the entries, computed on first store
+        self._size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source: str, **options) -> str:
+        """Entry name of source parsed with options."""
+        source_hash = hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+        options_hash = hashlib.sha256(
+            repr((luaparser.__version__, luaparser.TREE_REVISION, sorted(options.items()))).encode()
+        ).hexdigest()
+        return source_hash + "-" + options_hash[:16]
+
+    def parse(self, source: str, backend: str = backends.DEFAULT_BACKEND, **options) -> Chunk:
+        """Return the tree of source, from the cache or parsed by the
+        backend with options."""
+        if backend == backends.DEFAULT_BACKEND:
+            key = self.key(source, **options)
+        else:
+            key = self.key(source, backend=backend, **options)
+        tree = self.get(key)
+        if tree is not None:
+            self.hits += 1
+            return tree
+        self.misses += 1
+        tree = backends.get(backend)(source, **options)
+        self.put(key, tree)
+        return tree
+
+    def get(self, key: str) -> Optional[Chunk]:
+        """Load an entry, None if missing or unreadable."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                tree = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # truncated or written by an incompatible version
+            self._remove(path)
+            return None
+        # most recently used entries are evicted last
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return tree
+
+    def put(self, key: str, tree: Chunk) -> None:
+        """Store an entry, then evict old ones if the cache is too big."""
+        try:
+            data = pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL)
+        except (RecursionError, pickle.PicklingError):
+            # too deep to be pickled, parse it again next time
+            return
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # an entry stored again replaces the old one
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += len(data) - replaced
+        if self._size > self.max_size:
+            self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in
+        max_size."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(size for _, size, _ in entries)
+        for path, entry_size, _ in entries:
+            if size <= self.max_size:
+                break
+            if self._remove(path):
+                size -= entry_size
+        self._size = size
+
+    def clear(self) -> None:
+        for path, _, _ in self._entries():
+            self._remove(path)
+        self._size = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def _entries(self) -> List[Tuple[str, int, int]]:
+        """(path, size, mtime) of every entry."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.unlink(path)
+        except OSError:
+            return False
+        return True
@@ -0,0 +1,388 @@
+"""
+    ``gen_converter`` module
+    ========================
+
+    Conversion of the parse trees of the antlr generated ``gen`` and
+    ``gen2`` parsers (grammar ``luaparser/parser/LuaParser.g4``) to
+    ``luaparser.astnodes``, see ``ast.parse(source, backend=...)``.
+
+    The grammar is Lua 5.4, plus ``name | exp`` in ``gen``, without the
+    dialect extensions of Builder. The nodes are the ones Builder gives
+    with comments=False, without token positions: the token types of
+    these lexers are not the ones of ``luaparser.parser.LuaLexer``.
+    Operators follow the precedence of the grammar, the one of Lua, which
+    Builder does not: the right operand of ``^`` and the operand of ``#``
+    run to the end of the expression there (``a ^ b - c`` is
+    ``a ^ (b - c)``, ``#a == 0`` is ``#(a == 0)``), and bitwise operators
+    bind tighter than arithmetic, concatenation and comparison ones
+    (``a + b & c`` is ``a + (b & c)``, ``a & b * c`` is ``(a & b) * c``).
+    Builder also reads ``b | c`` as the dialect call ``b(c)``.
+"""
+import ast
+import importlib
+from typing import Optional
+
+from antlr4 import CommonTokenStream, InputStream, ParseTreeVisitor
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorListener import ErrorListener
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+from antlr4.tree.Tree import TerminalNode
+
+from luaparser.astnodes import *
+from luaparser.builder import Builder, SyntaxException
+
+# top level packages of the generated parsers, they share token types
+PACKAGES = ("gen", "gen2")
+# whether parse() tries SLL prediction first, by package. Only gen2 does:
+# with the "name | exp" call of gen, SLL fails on any call in an
+# expression, so nearly every source would be parsed twice. Fixing it
+# needs that ambiguity removed from the grammar and gen generated again.
+SLL_FIRST = {"gen": False, "gen2": True}
+
+
+class PredictionCounters:
+    """Parses done by parse(), since the counters were created or reset.
+
+    Attributes:
+        parses: Number of sources parsed.
+        fallbacks: Number of sources the SLL stage could not parse, parsed
+            again in LL mode. Invalid sources are counted too.
+    """
+
+    def __init__(self):
+        self.parses: int = 0
+        self.fallbacks: int = 0
+
+    def reset(self) -> None:
+        self.parses = self.fallbacks = 0
+
+
+counters = PredictionCounters()
+
+
+def parse(source: str, package: str = "gen", sll: Optional[bool] = None) -> Chunk:
+    """Parse source with the parser generated in package.
+
+    With sll, the parse is first done in SLL prediction mode, which is
+    faster, bailing out at the first error. Only when it fails, the
+    source is parsed again in full LL mode, which is exact and reports
+    the error. Without, only the LL parse is done. sll defaults to
+    SLL_FIRST[package]: gen2 tries SLL first, gen does not. See
+    ``counters``.
+
+    Raises:
+        SyntaxException: source is not valid for the grammar.
+    """
+    lexer_class = importlib.import_module(package + ".LuaLexer").LuaLexer
+    parser_class = importlib.import_module(package + ".LuaParser").LuaParser
+    listener = _RaisingErrorListener()
+    lexer = lexer_class(InputStream(source))
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(listener)
+    stream = CommonTokenStream(lexer)
+    parser = parser_class(stream)
+    parser.removeErrorListeners()
+    counters.parses += 1
+
+    if sll is None:
+        sll = SLL_FIRST.get(package, True)
+    tree = None
+    if sll:
+        parser._interp.predictionMode = PredictionMode.SLL
+        parser._errHandler = BailErrorStrategy()
+        try:
+            tree = parser.start_()
+        except ParseCancellationException:
+            counters.fallbacks += 1
+            stream.seek(0)
+            parser.reset()
+    if tree is None:
+        parser._interp.predictionMode = PredictionMode.LL
+        parser._errHandler = DefaultErrorStrategy()
+        parser.addErrorListener(listener)
+        tree = parser.start_()
+    return GenAstConverter(parser_class).visit(tree)
+
+
+class _RaisingErrorListener(ErrorListener):
+    def syntaxError(self, recognizer, offending_symbol, line, column, msg, e):
+        raise SyntaxException("%d:%d: %s" % (line, column, msg))
+
+
+class GenAstConverter(ParseTreeVisitor):
+    """Visitor building the astnodes tree of a ``start_`` parse tree.
+
+    Each visitXxx method returns the node of its rule, or the list of
+    nodes for the list rules.
+    """
+
+    def __init__(self, parser_class):
+        p = self.p = parser_class
+        self._binary = {
+            p.PLUS: AddOp,
+            p.MINUS: SubOp,
+            p.STAR: MultOp,
+            p.SLASH: FloatDivOp,
+            p.SS: FloorDivOp,
+            p.PER: ModOp,
+            p.CARET: ExpoOp,
+            p.AMP: BAndOp,
+            p.PIPE: BOrOp,
+            p.SQUIG: BXorOp,
+            p.LL: BShiftLOp,
+            p.GG: BShiftROp,
+            p.LT: LessThanOp,
+            p.GT: GreaterThanOp,
+            p.LE: LessOrEqThanOp,
+            p.GE: GreaterOrEqThanOp,
+            p.EE: EqToOp,
+            p.SQEQ: NotEqToOp,
+            p.AND: AndLoOp,
+            p.OR: OrLoOp,
+            p.DD: Concat,
+        }
+        self._unary = {
+            p.MINUS: UMinusOp,
+            p.SQUIG: UBNotOp,
+            p.NOT: ULNotOp,
+            p.POUND: ULengthOP,
+        }
+        self._atoms = {
+            p.NIL: Nil,
+            p.TRUE: TrueExpr,
+            p.FALSE: FalseExpr,
+            p.DDD: Varargs,
+        }
+
+    def visitStart_(self, ctx) -> Chunk:
+        return ctx.chunk().accept(self)
+
+    def visitChunk(self, ctx) -> Chunk:
+        return Chunk(ctx.block().accept(self))
+
+    def visitBlock(self, ctx) -> Block:
+        body = [stat.accept(self) for stat in ctx.stat()]
+        retstat = ctx.retstat()
+        if retstat is not None:
+            body.append(retstat.accept(self))
+        return Block(body)
+
+    def visitStat(self, ctx) -> Statement:
+        p = self.p
+        first = ctx.getChild(0)
+        if not isinstance(first, TerminalNode):
+            if isinstance(first, p.VarlistContext):
+                return Assign(first.accept(self), ctx.explist().accept(self))
+            # functioncall or label
+            return first.accept(self)
+
+        kind = first.symbol.type
+        if kind == p.SEMI:
+            return SemiColon()
+        if kind == p.BREAK:
+            return Break()
+        if kind == p.GOTO:
+            return Goto(Name(ctx.NAME().getText()))
+        if kind == p.DO:
+            return Do(ctx.block(0).accept(self))
+        if kind == p.WHILE:
+            return While(ctx.exp(0).accept(self), ctx.block(0).accept(self))
+        if kind == p.REPEAT:
+            return Repeat(ctx.block(0).accept(self), ctx.exp(0).accept(self))
+        if kind == p.IF:
+            return self._if(ctx)
+        if kind == p.FOR:
+            if ctx.namelist() is not None:
+                return Forin(
+                    ctx.block(0).accept(self),
+                    ctx.explist().accept(self),
+                    ctx.namelist().accept(self),
+                )
+            exps = [e.accept(self) for e in ctx.exp()]
+            step = exps[2] if len(exps) > 2 else 1
+            return Fornum(Name(ctx.NAME().getText()), exps[0], exps[1], step, ctx.block(0).accept(self))
+        if kind == p.FUNCTION:
+            return self._function(ctx.funcname(), ctx.funcbody())
+        # local
+        if ctx.FUNCTION() is not None:
+            args, body = ctx.funcbody().accept(self)
+            return LocalFunction(Name(ctx.NAME().getText()), args, body)
+        explist = ctx.explist()
+        values = explist.accept(self) if explist is not None else []
+        return LocalAssign(ctx.attnamelist().accept(self), values)
+
+    def _if(self, ctx) -> If:
+        tests = [e.accept(self) for e in ctx.exp()]
+        blocks = [b.accept(self) for b in ctx.block()]
+        orelse = blocks.pop() if ctx.ELSE() is not None else None
+        # elseif branches, from the last one
+        while len(tests) > 1:
+            orelse = ElseIf(tests.pop(), blocks.pop(), orelse)
+        return If(tests[0], blocks[0], orelse)
+
+    def _function(self, funcname, funcbody) -> Function or Method:
+        p = self.p
+        args, body = funcbody.accept(self)
+        children = funcname.children
+        name = Name(children[0].getText())
+        for i in range(1, len(children) - 1, 2):
+            if children[i].symbol.type == p.COL:
+                return Method(name, Name(children[i + 1].getText()), args, body)
+            name = Index(Name(children[i + 1].getText()), name)
+        return Function(name, args, body)
+
+    def visitAttnamelist(self, ctx) -> List[Name]:
+        # attributes (<const>, <close>) have no place in the tree
+        return [Name(n.getText()) for n in ctx.NAME()]
+
+    def visitRetstat(self, ctx) -> Statement:
+        p = self.p
+        kind = ctx.getChild(0).symbol.type
+        if kind == p.BREAK:
+            return Break()
+        if kind == p.CONTINUE:
+            raise SyntaxException("continue is not supported")
+        explist = ctx.explist()
+        # like Builder, False when there is no value
+        return Return(explist.accept(self) if explist is not None else False)
+
+    def visitLabel(self, ctx) -> Label:
+        return Label(Name(ctx.NAME().getText()))
+
+    def visitVarlist(self, ctx) -> List[Expression]:
+        return [v.accept(self) for v in ctx.var()]
+
+    def visitNamelist(self, ctx) -> List[Name]:
+        return [Name(n.getText()) for n in ctx.NAME()]
+
+    def visitExplist(self, ctx) -> List[Expression]:
+        return [e.accept(self) for e in ctx.exp()]
+
+    def visitExp(self, ctx) -> Expression:
+        children = ctx.children
+        if len(children) == 3:
+            op = self._binary[children[1].symbol.type]
+            left, right = children[0].accept(self), children[2].accept(self)
+            return _concat(left, right) if op is Concat else op(left, right)
+        if len(children) == 2:
+            return self._unary[children[0].symbol.type](children[1].accept(self))
+        child = children[0]
+        if isinstance(child, TerminalNode):
+            return self._atoms[child.symbol.type]()
+        return child.accept(self)
+
+    def visitVar(self, ctx) -> Expression:
+        return self._suffixes(ctx.children)
+
+    def visitPrefixexp(self, ctx) -> Expression:
+        return self._suffixes(ctx.children)
+
+    def visitFunctioncall(self, ctx) -> Expression:
+        return self._suffixes(ctx.children)
+
+    def _suffixes(self, children) -> Expression:
+        """Node of a NAME, functioncall, prefixexp or ( exp ) followed by
+        indexes, calls and invokes."""
+        p = self.p
+        first = children[0]
+        if not isinstance(first, TerminalNode):
+            node, i = first.accept(self), 1
+        elif first.symbol.type == p.OP:
+            node, i = children[1].accept(self), 3
+            node.wrapped = True
+        else:
+            node, i = Name(first.getText()), 1
+
+        while i < len(children):
+            child = children[i]
+            if not isinstance(child, TerminalNode):
+                # args
+                node, i = Call(node, child.accept(self)), i + 1
+                continue
+            kind = child.symbol.type
+            if kind == p.OB:
+                node, i = Index(children[i + 1].accept(self), node, IndexNotation.SQUARE), i + 3
+            elif kind == p.DOT:
+                node, i = Index(Name(children[i + 1].getText()), node), i + 2
+            elif kind == p.COL:
+                func = Name(children[i + 1].getText())
+                node, i = Invoke(node, func, children[i + 2].accept(self)), i + 3
+            else:
+                # name | exp, the argument is not in a list, like Builder
+                node, i = Call(node, children[i + 1].accept(self)), i + 2
+        return node
+
+    def visitArgs(self, ctx) -> List[Expression]:
+        first = ctx.getChild(0)
+        if isinstance(first, TerminalNode):
+            explist = ctx.explist()
+            return explist.accept(self) if explist is not None else []
+        return [first.accept(self)]
+
+    def visitFunctiondef(self, ctx) -> AnonymousFunction:
+        args, body = ctx.funcbody().accept(self)
+        return AnonymousFunction(args, body)
+
+    def visitFuncbody(self, ctx):
+        """(args, body)"""
+        return ctx.parlist().accept(self), ctx.block().accept(self)
+
+    def visitParlist(self, ctx) -> List[Expression]:
+        namelist = ctx.namelist()
+        args = namelist.accept(self) if namelist is not None else []
+        if ctx.DDD() is not None:
+            args.append(Varargs())
+        return args
+
+    def visitTableconstructor(self, ctx) -> Table:
+        fieldlist = ctx.fieldlist()
+        return Table(fieldlist.accept(self) if fieldlist is not None else [])
+
+    def visitFieldlist(self, ctx) -> List[Field]:
+        fields = []
+        # key of the fields without one
+        index = 1
+        for field in ctx.field():
+            first = field.getChild(0)
+            if not isinstance(first, TerminalNode):
+                fields.append(Field(Number(index), first.accept(self), between_brackets=True))
+                index += 1
+            elif first.symbol.type == self.p.NAME:
+                fields.append(Field(Name(first.getText()), field.exp(0).accept(self)))
+            else:
+                fields.append(
+                    Field(field.exp(0).accept(self), field.exp(1).accept(self), between_brackets=True)
+                )
+        return fields
+
+    def visitNumber(self, ctx) -> Number:
+        text = ctx.getText()
+        if ctx.HEX_FLOAT() is not None:
+            return Number(float.fromhex(text))
+        try:
+            return Number(ast.literal_eval(text))
+        except (SyntaxError, ValueError):
+            # leading zeros: 002
+            return Number(float(text))
+
+    def visitString(self, ctx) -> String:
+        return Builder.parse_lua_str(ctx.getText())
+
+
+def _concat(left: Expression, right: Expression) -> Concat:
+    """left .. right, nested to the left like Builder does, where the
+    grammar nests a .. b .. c to the right."""
+    operands = [left]
+    stack = [right]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is Concat and not node.wrapped:
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            operands.append(node)
+    node = operands[0]
+    for operand in operands[1:]:
+        node = Concat(node, operand)
+    return node
@@ -0,0 +1,235 @@
+"""
+    ``incremental`` module
+    ======================
+
+    Parse again the part of a tree touched by a text edit, see
+    ``ast.reparse``.
+"""
+from typing import List, Optional, Tuple
+
+from luaparser.astnodes import *
+from luaparser.builder import Builder, SyntaxException
+from luaparser.parser.LuaLexer import LuaLexer
+
+# statements parsed again on their own wherever they are, the other ones
+# only at the top level of the chunk
+FUNCTION_STATEMENTS = (Function, LocalFunction, Method)
+
+
+def reparse(tree: Chunk, source: str, start: int, stop: int, text: str, **options) -> Chunk:
+    """Tree of source with source[start:stop] replaced by text.
+
+    tree must have been parsed from source by Builder(source, **options).
+    The smallest Function, LocalFunction, Method or top level statement
+    holding the edit, its first and last characters excluded, is parsed
+    again alone. When its new text is still one statement of the same
+    kind, it replaces the old one in tree, the positions of the nodes
+    after it are shifted and tree is returned: it is updated in place.
+    Otherwise, the whole new source is parsed and a new tree is returned.
+
+    Either way, the result equals the tree of the new source, positions
+    included.
+
+    Raises:
+        SyntaxException: The new source is not valid.
+    """
+    new_source = source[:start] + text + source[stop:]
+    found = _enclosing_statement(tree, start, stop)
+    if found is not None and _replace(found[0], found[1], tree, source, new_source, stop - start, text, options):
+        return tree
+    return Builder(new_source, **options).process()
+
+
+def _enclosing_statement(tree: Chunk, start: int, stop: int) -> Optional[Tuple[Block, int]]:
+    """(block, index) of the statement to parse again, or None."""
+    found = None
+    blocks = [tree.body]
+    top_level = True
+    while blocks:
+        block = blocks.pop()
+        for index, stat in enumerate(block.body):
+            first, last = stat._first_position, stat._last_position
+            if first is None or last is None or last.stop < start:
+                continue
+            if first.start < start and stop <= last.stop:
+                if top_level or isinstance(stat, FUNCTION_STATEMENTS):
+                    found = (block, index)
+                blocks = _inner_blocks(stat)
+                top_level = False
+            break
+    return found
+
+
+def _inner_blocks(node: Node) -> List[Block]:
+    """Blocks held by node, not the ones nested in them."""
+    blocks = []
+    stack = [getattr(node, f) for f in node._fields]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, Block):
+            blocks.append(value)
+        elif isinstance(value, Node):
+            stack.extend(getattr(value, f) for f in value._fields)
+        elif isinstance(value, list):
+            stack.extend(value)
+    return blocks
+
+
+def _replace(
+    block: Block, index: int, tree: Chunk, source: str, new_source: str, removed: int, text: str, options
+) -> bool:
+    """Parse block.body[index] again from new_source and put it in tree.
+
+    Returns:
+        False if the statement cannot be parsed alone, tree is unchanged.
+    """
+    stat = block.body[index]
+    first, last = stat._first_position, stat._last_position
+    # the token before the statement must not run into its new text
+    if first.start > 0 and not (source[first.start - 1].isspace() or source[first.start - 1] == ";"):
+        return False
+
+    region = new_source[first.start : last.stop + 1 + len(text) - removed]
+    try:
+        builder = Builder(region, **options)
+        chunk = builder.process()
+    except SyntaxException:
+        return False
+    new_stats = chunk.body.body
+    if len(new_stats) != 1 or type(new_stats[0]) is not type(stat):
+        return False
+    # the region starts and ends with the tokens of the statement, else
+    # the tokens around it would be different in the whole source
+    tokens = builder._stream.tokens
+    region_first, region_last = tokens[0], tokens[-2] if len(tokens) > 1 else None
+    if (
+        region_last is None
+        or region_first.type != first.type
+        or region_first.start != 0
+        or region_last.type != last.type
+        or region_last.stop != len(region) - 1
+    ):
+        return False
+
+    # where the builder puts a comment can depend on the tokens after it:
+    # the comments of the statement must stay in it, and the ones of the
+    # region in the new statement
+    after = last.token_index
+    nodes = _nodes(tree, first.token_index, stat)
+    if any(first.token_index <= i <= after for i in _comment_indexes(nodes)) or any(
+        i > after for i in _comment_indexes(_nodes(stat))
+    ):
+        return False
+    new_nodes = _nodes(new_stats[0])
+    comments = {i for i, t in enumerate(tokens) if t.type in (LuaLexer.COMMENT, LuaLexer.LINE_COMMENT)}
+    if options.get("comments", True) and set(_comment_indexes(new_nodes)) != comments:
+        return False
+
+    new = new_stats[0]
+    shift_positions(new, first.start, first.line - 1, first.column, first.token_index)
+    # comments before the statement are not in the region, and already
+    # at their position in the source
+    new.comments = stat.comments
+
+    # nodes after the statement, and the ones starting or ending with it
+    new_first, new_last = new._first_position, new._last_position
+    new_stop = new_last.stop
+    old_line_start = source.rfind("\n", 0, last.stop) + 1
+    new_line_start = new_source.rfind("\n", 0, new_stop) + 1
+    move = _mover(
+        chars=new_stop - last.stop,
+        lines=new_source.count("\n", 0, new_stop) - source.count("\n", 0, last.stop),
+        line=source.count("\n", 0, last.stop) + 1,
+        columns=(new_stop - new_line_start) - (last.stop - old_line_start),
+        tokens=new_last.token_index - after,
+    )
+
+    def position(p: Optional[TokenPosition]) -> Optional[TokenPosition]:
+        if p is None or p.token_index < first.token_index:
+            return p
+        if p.token_index == first.token_index:
+            return new_first
+        return new_last if p.token_index == after else move(p)
+
+    for node in nodes:
+        node._first_position = position(node._first_position)
+        node._last_position = position(node._last_position)
+
+    block.body[index] = new
+    return True
+
+
+def shift_positions(root: Node, chars: int, lines: int, columns: int, tokens: int) -> None:
+    """Move the positions of the nodes of root, parsed from a part of a
+    source, to their positions in the source.
+
+    Args:
+        root: Tree of the part
+        chars: Offset of the part in the source
+        lines: Number of lines before the part
+        columns: Column the part starts at, added on its first line
+        tokens: Number of tokens before the part
+    """
+    move = _mover(chars=chars, lines=lines, line=1, columns=columns, tokens=tokens)
+    for node in _nodes(root):
+        node._first_position = move(node._first_position)
+        node._last_position = move(node._last_position)
+
+
+def _comment_indexes(nodes: List[Node]) -> List[int]:
+    """Token index of the comments of nodes."""
+    return [n._first_position.token_index for n in nodes if n.__class__ is Comment and n._first_position]
+
+
+def _mover(chars: int, lines: int, line: int, columns: int, tokens: int):
+    """Function moving a position, columns are only added on line."""
+    # shifted position by id of the position, which stays alive in it
+    moved = {}
+
+    def move(p: Optional[TokenPosition]) -> Optional[TokenPosition]:
+        if p is None:
+            return None
+        entry = moved.get(id(p))
+        if entry is None:
+            entry = moved[id(p)] = (
+                p,
+                TokenPosition(
+                    p.start + chars,
+                    p.stop + chars,
+                    p.line + lines,
+                    p.column + columns if p.line == line else p.column,
+                    p.token_index + tokens,
+                    p.type,
+                    p.text,
+                ),
+            )
+        return entry[1]
+
+    return move
+
+
+def _nodes(root: Node, token_index: int = 0, skip: Optional[Node] = None) -> List[Node]:
+    """Nodes of root ending at token_index or after, each once, without
+    skip and its nodes."""
+    nodes = []
+    seen = {id(skip)}
+    stack = [root]
+    pop, push, extend = stack.pop, stack.append, stack.extend
+    while stack:
+        node = pop()
+        key = id(node)
+        if key in seen:
+            continue
+        seen.add(key)
+        last = node._last_position
+        if last is not None and last.token_index < token_index:
+            continue
+        nodes.append(node)
+        for f in node._fields:
+            value = getattr(node, f)
+            # lists of fields only hold nodes
+            if value.__class__ is list:
+                extend(value)
+            elif isinstance(value, Node):
+                push(value)
+    return nodes
@@ -0,0 +1,236 @@
+"""
+    ``lexer`` module
+    ================
+
+    Hand-written Lua lexer, a drop-in for the antlr generated
+    ``luaparser.parser.LuaLexer``.
+
+    The whole source is scanned once with a single compiled regular
+    expression. Tokens get the same type, channel, start, stop, line,
+    column and text as the antlr ones, including recovery from invalid
+    characters, so the lexer can feed a CommonTokenStream unchanged.
+"""
+import re
+from typing import Iterator, List, Optional, Tuple
+
+from antlr4 import InputStream
+from antlr4.Lexer import TokenSource
+from antlr4.Recognizer import Recognizer
+from antlr4.Token import CommonToken, Token
+
+from luaparser.parser.LuaLexer import LuaLexer
+
+# keywords and operators: text -> token type
+_LITERALS = {
+    name[1:-1]: ttype
+    for ttype, name in enumerate(LuaLexer.literalNames)
+    if name.startswith("'")
+}
+
+_HEX = "[0-9a-fA-F]"
+_ESCAPE = r"\\(?:[abfnrtv\\\"'z]|\r\n|\r|\n|u\{" + _HEX + r"+\}|[0-9]{1,3}|x" + _HEX + "{2})"
+
+# Alternatives are tried in order, so when two rules could match at the
+# same position the one antlr picks (longest match, then first rule) comes
+# first: comments before '-', long brackets before '[', numbers before '.'
+# and longer operators before their prefixes.
+_TOKEN = re.compile(
+    "|".join(
+        [
+            r"(?P<SPACE>[ \t]+)",
+            r"(?P<NEWLINE>(?:\r\n|\r|\n|\f)+)",
+            r"(?P<NAME>[a-zA-Z_][a-zA-Z_0-9]*)",
+            r"(?P<NUMBER>0[xX]" + _HEX + r"+(?:\." + _HEX + r"*)?(?:[pP][-+]?[0-9]+)?"
+            r"|[0-9]+(?:\.[0-9]*)?(?:[eE][-+]?[0-9]+)?"
+            r"|\.[0-9]+(?:[eE][-+]?[0-9]+)?)",
+            r"(?P<STRING>\"(?:" + _ESCAPE + r"|[^\\\"\r\n])*\""
+            r"|'(?:" + _ESCAPE + r"|[^\\'\r\n])*'"
+            r"|\[(?P<level>=*)\[.*?\](?P=level)\])",
+            r"(?P<COMMENT>--\[(?P<comment_level>=*)\[.*?\](?P=comment_level)\])",
+            r"(?P<LINE_COMMENT>--(?:\[=*(?:[^=\[\r\n][^\r\n]*)?|[^\[\r\n][^\r\n]*)?)",
+            r"(?P<SHEBANG>#![^\r\n]*)",
+            "(?P<OPERATOR>"
+            + "|".join(re.escape(op) for op in sorted(_LITERALS, key=len, reverse=True) if not op.isalpha())
+            + ")",
+        ]
+    ),
+    re.DOTALL,
+)
+
+# Longest prefix antlr consumes before giving up on an unterminated
+# string or an invalid escape sequence.
+_BROKEN_STRING = {
+    quote: re.compile(
+        quote
+        + "(?:"
+        + _ESCAPE
+        + r"|[^\\"
+        + quote
+        + r"\r\n])*(?:\\(?:u(?:\{"
+        + _HEX
+        + "*)?|x"
+        + _HEX
+        + "?)?)?"
+    )
+    for quote in "\"'"
+}
+
+# token type of the groups that do not hold keywords or operators
+_GROUP_TYPES = {
+    "SPACE": LuaLexer.SPACE,
+    "NEWLINE": LuaLexer.NEWLINE,
+    "NUMBER": LuaLexer.NUMBER,
+    "STRING": LuaLexer.STRING,
+    "COMMENT": LuaLexer.COMMENT,
+    "LINE_COMMENT": LuaLexer.LINE_COMMENT,
+    "SHEBANG": LuaLexer.SHEBANG,
+}
+
+_HIDDEN_GROUPS = {"SPACE", "NEWLINE", "COMMENT", "LINE_COMMENT", "SHEBANG"}
+
+
+def _error_display(text: str) -> str:
+    return text.replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r")
+
+
+def default_tokens(source: str, pos: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """(type, text) of the default channel tokens of source[pos:end].
+
+    The range must start and stop between two tokens. Unlike FastLuaLexer,
+    invalid characters are skipped without being reported and no token
+    object is built.
+    """
+    literals = _LITERALS
+    hidden_groups = _HIDDEN_GROUPS
+    for m in _TOKEN.finditer(source, pos, len(source) if end is None else end):
+        group = m.lastgroup
+        if group in hidden_groups:
+            continue
+        text = m.group()
+        yield _GROUP_TYPES.get(group) or literals.get(text, LuaLexer.NAME), text
+
+
+def scan(source: str, pos: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, int]]:
+    """(type, start, stop) of every token of source[pos:end], hidden ones
+    included, stop excluded.
+
+    Invalid characters are skipped without being reported, a token
+    starting after the stop of the previous one tells where they are.
+    """
+    literals = _LITERALS
+    for m in _TOKEN.finditer(source, pos, len(source) if end is None else end):
+        group = m.lastgroup
+        yield _GROUP_TYPES.get(group) or literals.get(m.group(), LuaLexer.NAME), m.start(), m.end()
+
+
+class FastLuaLexer(Recognizer, TokenSource):
+    """Token source producing the same tokens as LuaLexer.
+
+    Accepts either a str or an antlr InputStream. Invalid characters are
+    reported to the error listeners with the antlr message and skipped,
+    exactly like the generated lexer does.
+    """
+
+    symbolicNames = LuaLexer.symbolicNames
+    literalNames = LuaLexer.literalNames
+
+    def __init__(self, source):
+        super().__init__()
+        if isinstance(source, InputStream):
+            self.name = source.name
+            source = source.strdata
+        else:
+            self.name = "<empty>"
+        self._source: str = source
+        self._tokens: Optional[List[CommonToken]] = None
+        self._next: int = 0
+        self.line: int = 1
+        self.column: int = 0
+
+    def getSourceName(self) -> str:
+        return self.name
+
+    def nextToken(self) -> CommonToken:
+        if self._tokens is None:
+            self._tokens = self._tokenize()
+        token = self._tokens[self._next]
+        if token.type != Token.EOF:
+            self._next += 1
+        return token
+
+    def getAllTokens(self) -> List[CommonToken]:
+        """Remaining tokens, EOF excluded."""
+        tokens = []
+        token = self.nextToken()
+        while token.type != Token.EOF:
+            tokens.append(token)
+            token = self.nextToken()
+        return tokens
+
+    def _tokenize(self) -> List[CommonToken]:
+        source = self._source
+        end = len(source)
+        match = _TOKEN.match
+        literals = _LITERALS
+        group_types = _GROUP_TYPES
+        hidden_groups = _HIDDEN_GROUPS
+        name_type = LuaLexer.NAME
+        new_token = CommonToken.__new__
+        token_source = (self, None)
+        tokens = []
+        append = tokens.append
+        pos = 0
+        line = 1
+        line_start = 0
+
+        while pos < end:
+            m = match(source, pos)
+            if m is None:
+                pos, line, line_start = self._recover(pos, line, line_start)
+                continue
+            text = m.group()
+            group = m.lastgroup
+            token = new_token(CommonToken)
+            token.source = token_source
+            token.type = group_types.get(group) or literals.get(text, name_type)
+            token.channel = Token.HIDDEN_CHANNEL if group in hidden_groups else Token.DEFAULT_CHANNEL
+            token.start = pos
+            token.stop = m.end() - 1
+            token.tokenIndex = -1
+            token.line = line
+            token.column = pos - line_start
+            token._text = text
+            append(token)
+            if "\n" in text:
+                line += text.count("\n")
+                line_start = pos + text.rindex("\n") + 1
+            pos = m.end()
+
+        eof = CommonToken(token_source, Token.EOF, Token.DEFAULT_CHANNEL, end, end - 1)
+        eof.line = self.line = line
+        eof.column = self.column = end - line_start
+        eof.text = "<EOF>"
+        append(eof)
+        return tokens
+
+    def _recover(self, pos: int, line: int, line_start: int):
+        """Report the invalid input at pos and skip it like antlr does.
+
+        antlr gives up on the first character no rule can continue with,
+        reports everything from pos up to it and skips it too.
+
+        Returns:
+            The new (pos, line, line_start).
+        """
+        source = self._source
+        broken_string = _BROKEN_STRING.get(source[pos])
+        fail = broken_string.match(source, pos).end() if broken_string else pos
+        msg = "token recognition error at: '" + _error_display(source[pos : fail + 1]) + "'"
+        self.getErrorListenerDispatch().syntaxError(self, None, line, pos - line_start, msg, None)
+
+        skipped_end = min(fail + 1, len(source))
+        newlines = source.count("\n", pos, skipped_end)
+        if newlines:
+            line += newlines
+            line_start = source.rindex("\n", pos, skipped_end) + 1
+        return skipped_end, line, line_start
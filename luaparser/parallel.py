@@ -0,0 +1,218 @@
+"""
+    ``parallel`` module
+    ===================
+
+    Parse of a large source split in runs of top level statements, in a
+    pool of processes. It has shown no speedup over a plain parse yet, see
+    benchmarks/bench_parallel.py, so ``ast.parse`` does not use it.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+
+from luaparser import binary
+from luaparser.astnodes import *
+from luaparser.builder import Builder, SyntaxException
+from luaparser.lexer import scan
+from luaparser.parser.LuaLexer import LuaLexer
+
+# lines of source parsed by one task, at least
+CHUNK_LINES = 2000
+
+# tokens a statement can end with
+_STAT_ENDS = {
+    LuaLexer.NAME,
+    LuaLexer.NUMBER,
+    LuaLexer.STRING,
+    LuaLexer.NIL,
+    LuaLexer.TRUE,
+    LuaLexer.FALSE,
+    LuaLexer.VARARGS,
+    LuaLexer.CPAR,
+    LuaLexer.CBRACK,
+    LuaLexer.CBRACE,
+    LuaLexer.END,
+    LuaLexer.BREAK,
+    LuaLexer.REQFIELD,
+    LuaLexer.OPTIONALFIELD,
+}
+# tokens that start a statement and cannot continue one
+_STAT_STARTS = {
+    LuaLexer.NAME,
+    LuaLexer.LOCAL,
+    LuaLexer.FUNCTION,
+    LuaLexer.IF,
+    LuaLexer.FOR,
+    LuaLexer.WHILE,
+    LuaLexer.DO,
+    LuaLexer.REPEAT,
+    LuaLexer.GOTO,
+    LuaLexer.COLCOL,
+}
+_HIDDEN = {
+    LuaLexer.COMMENT,
+    LuaLexer.LINE_COMMENT,
+    LuaLexer.SPACE,
+    LuaLexer.NEWLINE,
+    LuaLexer.SHEBANG,
+}
+_OPENING_BRACKETS = {LuaLexer.OPAR, LuaLexer.OBRACK, LuaLexer.OBRACE}
+_CLOSING_BRACKETS = {LuaLexer.CPAR, LuaLexer.CBRACK, LuaLexer.CBRACE}
+# blocks opened by a keyword, "while" and "for" until their "do"
+_LOOP_HEADER, _BLOCK, _REPEAT = range(3)
+
+
+class Part(NamedTuple):
+    """Start of a part of a source, in the source."""
+
+    start: int
+    line: int
+    column: int
+    token_index: int
+
+
+def split(source: str, chunk_lines: int = CHUNK_LINES) -> List[Part]:
+    """Cut source in parts of about chunk_lines lines, between two top
+    level statements.
+
+    Statements are only told apart from the tokens: a cut is made where
+    every block, bracket and label is closed, after a token a statement
+    can end with and before one that can only start the next statement. Where
+    the builder puts a comment can depend on the statements before it, so
+    there is no cut before a statement with comments above it. The first
+    part starts at 0. The whole source is one part when it has invalid
+    characters or its blocks do not add up.
+    """
+    whole = [Part(0, 1, 0, 0)]
+    parts = [Part(0, 1, 0, 0)]
+    blocks = []
+    brackets = 0
+    previous = None
+    # end of the previous default channel token, index of the token after
+    previous_stop = previous_next = 0
+    # whether there is a comment since the previous default channel token
+    comment = False
+    # between the "::" of a label
+    label = False
+    # end of the previous token, to find invalid characters
+    stop = 0
+    line, line_start = 1, 0
+    next_line = chunk_lines
+
+    for index, (tok_type, tok_start, tok_stop) in enumerate(scan(source)):
+        if tok_start != stop:
+            return whole
+        stop = tok_stop
+        if tok_type in _HIDDEN:
+            if tok_type == LuaLexer.COMMENT or tok_type == LuaLexer.LINE_COMMENT:
+                comment = True
+            continue
+
+        if (
+            not blocks
+            and not brackets
+            and not comment
+            and not label
+            and previous in _STAT_ENDS
+            and tok_type in _STAT_STARTS
+        ):
+            line += source.count("\n", line_start, previous_stop)
+            line_start = previous_stop
+            if line >= next_line:
+                column = previous_stop - source.rfind("\n", 0, previous_stop) - 1
+                parts.append(Part(previous_stop, line, column, previous_next))
+                next_line = line + chunk_lines
+
+        if tok_type in _OPENING_BRACKETS:
+            brackets += 1
+        elif tok_type in _CLOSING_BRACKETS:
+            brackets -= 1
+            if brackets < 0:
+                return whole
+        elif tok_type == LuaLexer.FUNCTION or tok_type == LuaLexer.IF:
+            blocks.append(_BLOCK)
+        elif tok_type == LuaLexer.WHILE or tok_type == LuaLexer.FOR:
+            blocks.append(_LOOP_HEADER)
+        elif tok_type == LuaLexer.DO:
+            # the "do" of a loop, or a do block
+            if blocks and blocks[-1] == _LOOP_HEADER:
+                blocks[-1] = _BLOCK
+            else:
+                blocks.append(_BLOCK)
+        elif tok_type == LuaLexer.COLCOL:
+            label = not label
+        elif tok_type == LuaLexer.REPEAT:
+            blocks.append(_REPEAT)
+        elif tok_type == LuaLexer.END:
+            # a loop without "do" is closed by "end" too
+            if not blocks or blocks.pop() == _REPEAT:
+                return whole
+        elif tok_type == LuaLexer.UNTIL:
+            if not blocks or blocks.pop() != _REPEAT:
+                return whole
+        previous = tok_type
+        previous_stop, previous_next = tok_stop, index + 1
+        comment = False
+
+    if stop != len(source) or blocks or brackets:
+        return whole
+    return parts
+
+
+def parse(source: str, jobs: Optional[int] = None, chunk_lines: int = CHUNK_LINES, **options) -> Chunk:
+    """Parse source, split by split(), in a pool of jobs processes.
+
+    The trees of the parts are joined in one Chunk, equal to the tree
+    Builder(source, **options) gives, positions included. With jobs=1,
+    the parts are parsed in this process. When a part cannot be parsed,
+    the whole source is parsed again in this process, to raise the same
+    error as Builder.
+    """
+    parts = split(source, chunk_lines)
+    if len(parts) < 2:
+        return Builder(source, **options).process()
+    stops = [p.start for p in parts[1:]] + [len(source)]
+    texts = [source[p.start : stop] for p, stop in zip(parts, stops)]
+
+    try:
+        if jobs == 1:
+            trees = [_parse_part(text, part, options) for text, part in zip(texts, parts)]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                trees = [
+                    binary.load(data)
+                    for data in executor.map(
+                        _dump_part, texts, parts, [options] * len(parts)
+                    )
+                ]
+    except SyntaxException:
+        return Builder(source, **options).process()
+
+    body = []
+    for tree in trees[:-1]:
+        if tree.body.comments:
+            # comments left at the end of a part go to the next statement
+            return Builder(source, **options).process()
+        body.extend(tree.body.body)
+    body.extend(trees[-1].body.body)
+    first, last = trees[0], trees[-1]
+    return Chunk(
+        Block(
+            body,
+            comments=last.body.comments,
+            first_token=first.body.first_position,
+            last_token=last.body.last_position,
+        ),
+        comments=first.comments,
+        first_token=first.first_position,
+        last_token=last.last_position,
+    )
+
+
+def _parse_part(text: str, part: Part, options: dict) -> Chunk:
+    return Builder(text, offset=part, **options).process()
+
+
+def _dump_part(text: str, part: Part, options: dict) -> bytes:
+    """_parse_part in a pool worker: binary trees are smaller and faster
+    to load than pickled ones."""
+    return binary.dump(_parse_part(text, part, options))
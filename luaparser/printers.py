@@ -7,11 +7,13 @@
 
 from luaparser.astnodes import *
 from luaparser.utils.visitor import *
+from luaparser.lexer import default_tokens, scan
+from luaparser.parser.LuaLexer import LuaLexer
 from enum import Enum
+from json.encoder import encode_basestring_ascii as encode_string
 import xml.etree.cElementTree as ElementTree
-from xml.dom import minidom
-from textwrap import indent
-from multimethod import multimethod
+import re
+from typing import Dict, List, Optional, Tuple
 
 
 class Style(Enum):
@@ -65,9 +67,7 @@ class PythonStyleVisitor:
         elif isinstance(node, Node):
             if is_list:
                 return "{} 1 key"
-            key_count = len(
-                [attr for attr in node.__dict__.keys() if not attr.startswith("_")]
-            )
+            key_count = len(node._fields)
             res += "{} " + str(key_count) + " "
             if key_count > 1:
                 res += "keys"
@@ -108,8 +108,9 @@ class PythonStyleVisitor:
                 k += 1
             self.dedent()
 
-        for attr, attrValue in node.__dict__.items():
-            if not attr.startswith(("_", "comments")):
+        for attr in node._fields:
+            attrValue = getattr(node, attr)
+            if attr != "comments":
                 if isinstance(attrValue, Node) or isinstance(attrValue, list):
                     res += (
                             self.indent_str() + attr + ": " + self.pretty_count(attrValue)
@@ -164,13 +165,7 @@ class HTMLStyleVisitor:
         pass
 
     def get_xml_string(self, tree):
-        xml = self.visit(tree)
-
-        ast = ElementTree.Element("ast")
-        doc = ElementTree.SubElement(ast, "doc")
-        doc.append(xml)
-
-        return minidom.parseString(ElementTree.tostring(doc)).toprettyxml(indent="   ")
+        return XMLWriter().write(tree)
 
     @visitor(str)
     def visit(self, node):
@@ -202,8 +197,9 @@ class HTMLStyleVisitor:
         xml_node = ElementTree.Element(node.display_name)
 
         # attributes
-        for attr, attrValue in node.__dict__.items():
-            if not attr.startswith("_") and attrValue is not None:
+        for attr in node._fields:
+            attrValue = getattr(node, attr)
+            if attrValue is not None:
                 xml_attr = ElementTree.SubElement(xml_node, attr)
                 child_node = self.visit(attrValue)
                 if type(child_node) is str:
@@ -216,378 +212,1149 @@ class HTMLStyleVisitor:
         return xml_node
 
 
+class XMLWriter:
+    """Write a tree as indented XML, in one pass.
+
+    The text is the one HTMLStyleVisitor used to get by pretty printing
+    the ElementTree of its visit methods with minidom: a ``doc`` element
+    holding the root node, an element per node field that is not None,
+    holding either the field text or the field nodes.
+
+    Nodes are walked with an explicit stack, and text goes to the ``out``
+    file in chunks of BUFFER_SIZE fragments.
+    """
+
+    BUFFER_SIZE = 8192
+
+    def __init__(self, out=None, indent: str = "   "):
+        """
+
+        Args:
+            out: Optional text file the document is streamed to
+            indent: Indentation added at each level
+        """
+        self._out = out
+        self._indent = indent
+        self._parts: List[str] = []
+
+    def write(self, root: Node) -> Optional[str]:
+        """Write root.
+
+        Returns:
+            The document, or None if it was written to ``out``.
+        """
+        parts = self._parts
+        write = parts.append
+        unit = self._indent
+        indents = [""]
+
+        def indent(level: int) -> str:
+            while level >= len(indents):
+                indents.append(unit * len(indents))
+            return indents[level]
+
+        # open elements: [children, level, holds fields, closing tag]
+        stack = []
+
+        def node(n: Node, level: int):
+            tag = n.display_name
+            fields = [(f, getattr(n, f)) for f in n._fields]
+            fields = [field for field in fields if field[1] is not None]
+            if fields:
+                write(indent(level) + "<" + tag + ">\n")
+                stack.append([iter(fields), level + 1, True, indent(level) + "</" + tag + ">\n"])
+            else:
+                write(indent(level) + "<" + tag + "/>\n")
+
+        write('<?xml version="1.0" ?>\n<doc>\n')
+        node(root, 1)
+        while stack:
+            children, level, fields, close = stack[-1]
+            child = next(children, _END)
+            if child is _END:
+                stack.pop()
+                write(close)
+            elif not fields:
+                if not isinstance(child, Node):
+                    raise TypeError("cannot write %r as an xml element" % (child,))
+                node(child, level)
+            else:
+                name, value = child
+                if isinstance(value, Node):
+                    value = [value]
+                if isinstance(value, list):
+                    if value:
+                        write(indent(level) + "<" + name + ">\n")
+                        stack.append([iter(value), level + 1, False, indent(level) + "</" + name + ">\n"])
+                    else:
+                        write(indent(level) + "<" + name + "/>\n")
+                else:
+                    text = _xml_text(value)
+                    if text:
+                        write(indent(level) + "<" + name + ">" + text + "</" + name + ">\n")
+                    else:
+                        write(indent(level) + "<" + name + "/>\n")
+            if len(parts) > self.BUFFER_SIZE and self._out is not None:
+                self._out.write("".join(parts))
+                parts.clear()
+        write("</doc>\n")
+
+        text = "".join(parts)
+        parts.clear()
+        if self._out is None:
+            return text
+        self._out.write(text)
+        return None
+
+
+def _xml_text(value) -> str:
+    """Escaped text of a field value, as HTMLStyleVisitor renders it."""
+    if isinstance(value, str):
+        if value.startswith('"') and value.endswith('"'):
+            value = value[1:-1]
+    elif isinstance(value, (int, float, Enum)):
+        value = str(value)
+    else:
+        raise VisitorException("No visitor found for class " + str(type(value)))
+    # an xml parser reads line ends as "\n"
+    if "\r" in value:
+        value = value.replace("\r\n", "\n").replace("\r", "\n")
+    return (
+        value.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace('"', "&quot;")
+        .replace(">", "&gt;")
+    )
+
+
+class JSONWriter:
+    """Write a tree as the JSON document of ``Node.to_json``, without
+    building it.
+
+    Nodes are walked with an explicit stack, and text goes to the ``out``
+    file in chunks of BUFFER_SIZE fragments, so memory stays proportional
+    to the depth of the tree. The text is the one of
+    ``json.dumps(root, default=default, indent=indent)``, or of
+    ``json.dumps(root, default=default, separators=(",", ":"))`` when
+    indent is None.
+    """
+
+    BUFFER_SIZE = 8192
+
+    def __init__(self, out=None, indent: Optional[int] = 4, default=None):
+        """
+
+        Args:
+            out: Optional text file the document is streamed to
+            indent: Number of spaces of each indentation level, None for
+                compact output on a single line
+            default: Called like the json ``default`` hook with values
+                that are neither nodes nor JSON types
+        """
+        self._out = out
+        self._indent = indent
+        self._default = default
+        self._parts: List[str] = []
+
+    def write(self, root) -> Optional[str]:
+        """Write root.
+
+        Returns:
+            The document, or None if it was written to ``out``.
+        """
+        parts = self._parts
+        write = parts.append
+        indent = self._indent
+        key_separator = ":" if indent is None else ": "
+        newlines = [""] if indent is None else ["\n"]
+
+        def newline(level: int) -> str:
+            """Line break and indentation of level, nothing if compact."""
+            if indent is None:
+                return ""
+            while level >= len(newlines):
+                newlines.append("\n" + " " * (indent * len(newlines)))
+            return newlines[level]
+
+        # open non empty containers: [items, level, is_dict, first item, close]
+        stack = []
+
+        def value(v, level: int):
+            if isinstance(v, str):
+                write(encode_string(v))
+            elif isinstance(v, Node) and type(v).to_json is Node.to_json:
+                items = [(k, getattr(v, k)) for k in v._fields]
+                items = [item for item in items if item[1]]
+                items += [
+                    ("start_char", v.start_char),
+                    ("stop_char", v.stop_char),
+                    ("line", v.line),
+                ]
+                write("{" + newline(level + 1) + encode_string(v._name) + key_separator + "{")
+                stack.append(
+                    [iter(items), level + 2, True, True, newline(level + 1) + "}" + newline(level) + "}"]
+                )
+            elif isinstance(v, (list, tuple)):
+                if v:
+                    write("[")
+                    stack.append([iter(v), level + 1, False, True, newline(level) + "]"])
+                else:
+                    write("[]")
+            elif isinstance(v, dict):
+                if v:
+                    write("{")
+                    stack.append([iter(v.items()), level + 1, True, True, newline(level) + "}"])
+                else:
+                    write("{}")
+            elif v is None:
+                write("null")
+            elif v is True:
+                write("true")
+            elif v is False:
+                write("false")
+            elif isinstance(v, int):
+                write(int.__repr__(v))
+            elif isinstance(v, float):
+                write(encode_float(v))
+            elif self._default is not None:
+                value(self._default(v), level)
+            else:
+                raise TypeError("Object of type %s is not JSON serializable" % type(v).__name__)
+
+        value(root, 0)
+        while stack:
+            frame = stack[-1]
+            items, level, is_dict, first, close = frame
+            item = next(items, _END)
+            if item is _END:
+                stack.pop()
+                write(close)
+                continue
+            if first:
+                frame[3] = False
+                write(newline(level))
+            else:
+                write("," + newline(level))
+            if is_dict:
+                write(encode_string(item[0]) + key_separator)
+                item = item[1]
+            value(item, level)
+            if len(parts) > self.BUFFER_SIZE and self._out is not None:
+                self._out.write("".join(parts))
+                parts.clear()
+
+        text = "".join(parts)
+        parts.clear()
+        if self._out is None:
+            return text
+        self._out.write(text)
+        return None
+
+
+_END = object()
+
+
+def encode_float(f: float) -> str:
+    if f != f:
+        return "NaN"
+    if f == float("inf"):
+        return "Infinity"
+    if f == -float("inf"):
+        return "-Infinity"
+    return float.__repr__(f)
+
+
+# Line boundaries of str.splitlines, which textwrap.indent relies on
+_LINE_BREAK = re.compile("[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+class LuaWriter:
+    """Text sink of LuaOutputVisitor.
+
+    Text goes to a list, or to the ``out`` file line by line. Lines are
+    prefixed with the current indentation like ``textwrap.indent`` does:
+    lines holding only whitespace are left as is.
+
+    ``write`` only appends to a list of pending fragments. They are cut in
+    lines when the indentation changes, so all of them share the same
+    indentation, or when ``flush`` is called.
+    """
+
+    def __init__(self, out=None):
+        self._out = out
+        self._parts: List[str] = []
+        self._pending: List[str] = []
+        self.write = self._pending.append
+        # start of the current line, and its indentation once it has text
+        self._line = ""
+        self._line_indent = 0
+        self._indents: List[int] = [0]
+        self._flushes = 0
+
+    def indent(self, size: int):
+        self.flush()
+        self._indents.append(self._indents[-1] + size)
+
+    def dedent(self):
+        self.flush()
+        self._indents.pop()
+
+    def flush(self):
+        """Write out the complete lines of the pending fragments."""
+        if not self._pending:
+            return
+        self._flushes += 1
+        text = self._line + "".join(self._pending)
+        self._pending.clear()
+        if not text:
+            return
+        indent = self._line_indent if self._line else self._indents[-1]
+        lines = text.splitlines(True)
+        last = lines[-1]
+        # a "\r" may be followed by a "\n" in the next fragment
+        if last[-1] == "\r" or not _LINE_BREAK.match(last[-1]):
+            lines.pop()
+        else:
+            last = ""
+        for line in lines:
+            self._emit_line(line, indent)
+            indent = self._indents[-1]
+        self._line = last
+        self._line_indent = indent
+
+    def _emit_line(self, line: str, indent: int):
+        if indent and line.strip():
+            line = " " * indent + line
+        if self._out is None:
+            self._parts.append(line)
+        else:
+            self._out.write(line)
+
+    def mark(self):
+        """Current output position, for text_since and rewind."""
+        return self._flushes, len(self._pending)
+
+    def text_since(self, mark) -> Optional[str]:
+        """Text written since mark, or None if it was flushed in between."""
+        flushes, count = mark
+        if flushes != self._flushes:
+            return None
+        return "".join(self._pending[count:])
+
+    def rewind(self, mark):
+        """Drop the text written since mark, text_since must not be None."""
+        del self._pending[mark[1]:]
+
+    def close(self) -> Optional[str]:
+        """Write out everything left.
+
+        Returns:
+            The whole text, or None if it was written to ``out``.
+        """
+        self.flush()
+        if self._line:
+            self._emit_line(self._line, self._line_indent)
+            self._line = ""
+        if self._out is None:
+            return "".join(self._parts)
+        return None
+
+
 class LuaOutputVisitor:
-    def __init__(self, indent_size: int):
+    def __init__(self, indent_size: int, out=None):
+        """
+
+        Args:
+            indent_size: Number of spaces of each indentation level
+            out: Optional text file the source is streamed to
+        """
         self._indent_size = indent_size
         self._level = 0
+        self._out = out
+        self._writer = None
+        self._write = None
+
+    def visit(self, node: Node) -> Optional[str]:
+        """Render node as Lua source.
+
+        Returns:
+            The source, or None if it was written to the ``out`` file.
+        """
+        self._writer = LuaWriter(self._out)
+        self._write = self._writer.write
+        self.do_emit(node)
+        return self._writer.close()
+
+    def do_emit(self, node):
+        try:
+            handler, is_expression = _LUA_HANDLERS[type(node)]
+        except KeyError:
+            handler, is_expression = _add_lua_handler(type(node))
+        if is_expression and node.wrapped:
+            self._write("(")
+            handler(self, node)
+            self._write(")")
+        else:
+            handler(self, node)
 
-    def do_visit(self, node: Node) -> str:
-        if isinstance(node, Expression) and node.wrapped:
-            return "(" + self.visit(node) + ")"
-        return self.visit(node)
+    def _emit_binary(self, node: BinaryOp, operator: str):
+        self.do_emit(node.left)
+        self._write(operator)
+        self.do_emit(node.right)
 
-    @multimethod
-    def visit(self, node: Chunk) -> str:
-        return self.do_visit(node.body)
+    def _emit_function(self, header: str, node):
+        self._write(header)
+        self.do_emit(node.args)
+        self._write(")\n")
+        self.do_emit(node.body)
+        self._write("\nend")
 
-    @visit.register
-    def visit(self, node: Block) -> str:
+    def emit_Chunk(self, node: Chunk):
+        self.do_emit(node.body)
+
+    def emit_Block(self, node: Block):
         self._level += 1
-        output = indent(
-            "\n".join([self.do_visit(n) for n in node.body]), " " * (self._indent_size if self._level > 1 else 0)
-        )
+        self._writer.indent(self._indent_size if self._level > 1 else 0)
+        for i, n in enumerate(node.body):
+            if i:
+                self._write("\n")
+                # keep the streamed output flowing on long blocks
+                if i % 64 == 0:
+                    self._writer.flush()
+            self.do_emit(n)
+        self._writer.dedent()
         self._level -= 1
-        return output
 
-    @visit.register
-    def visit(self, node: str) -> str:
-        return node
+    def emit_str(self, node: str):
+        self._write(node)
 
-    @visit.register
-    def visit(self, node: float) -> str:
-        return str(node)
+    def emit_float(self, node: float):
+        self._write(str(node))
 
-    @visit.register
-    def visit(self, node: int) -> str:
-        return str(node)
+    def emit_int(self, node: int):
+        self._write(str(node))
 
-    @visit.register
-    def visit(self, node: list) -> str:
-        return ", ".join([self.do_visit(n) for n in node])
-
-    @visit.register
-    def visit(self, node: None) -> str:
-        return ""
-
-    @visit.register
-    def visit(self, node: Assign) -> str:
-        return self.do_visit(node.targets) + " = " + self.do_visit(node.values)
-
-    @visit.register
-    def visit(self, node: LocalAssign) -> str:
-        res = self.do_visit(node.values)
-        if res == '':
-            return "local " + self.do_visit(node.targets)
-        return "local " + self.do_visit(node.targets) + " = " + res
-
-    @visit.register
-    def visit(self, node: While) -> str:
-        return (
-                "while " + self.do_visit(node.test) + " do\n" + self.do_visit(node.body) + "\nend"
-        )
-
-    @visit.register
-    def visit(self, node: Do) -> str:
-        return "do\n" + self.do_visit(node.body) + "\nend"
-
-    @visit.register
-    def visit(self, node: If) -> str:
-        output = (
-                "if " + self.do_visit(node.test) + " then\n" + self.do_visit(node.body)
-        )
-        if isinstance(node.orelse, ElseIf):
-            output += "\n" + self.do_visit(node.orelse)
-        elif node.orelse:
-            output += "\nelse\n" + self.do_visit(node.orelse)
-        output += "\nend"
-        return output
-
-    @visit.register
-    def visit(self, node: ElseIf) -> str:
-        output = (
-                "elseif " + self.do_visit(node.test) + " then\n" + self.do_visit(node.body)
-        )
+    def emit_list(self, node: list):
+        for i, n in enumerate(node):
+            if i:
+                self._write(", ")
+            self.do_emit(n)
+
+    def emit_NoneType(self, node: None):
+        pass
+
+    def emit_Assign(self, node: Assign):
+        self.do_emit(node.targets)
+        self._write(" = ")
+        self.do_emit(node.values)
+
+    def emit_LocalAssign(self, node: LocalAssign):
+        self._write("local ")
+        self.do_emit(node.targets)
+        before = self._writer.mark()
+        self._write(" = ")
+        mark = self._writer.mark()
+        self.do_emit(node.values)
+        if self._writer.text_since(mark) == "":
+            self._writer.rewind(before)
+
+    def emit_While(self, node: While):
+        self._write("while ")
+        self.do_emit(node.test)
+        self._write(" do\n")
+        self.do_emit(node.body)
+        self._write("\nend")
+
+    def emit_Do(self, node: Do):
+        self._write("do\n")
+        self.do_emit(node.body)
+        self._write("\nend")
+
+    def emit_If(self, node: If):
+        self._write("if ")
+        self.do_emit(node.test)
+        self._write(" then\n")
+        self.do_emit(node.body)
+        self._emit_orelse(node)
+        self._write("\nend")
+
+    def emit_ElseIf(self, node: ElseIf):
+        self._write("elseif ")
+        self.do_emit(node.test)
+        self._write(" then\n")
+        self.do_emit(node.body)
+        self._emit_orelse(node)
+
+    def _emit_orelse(self, node):
         if isinstance(node.orelse, ElseIf):
-            output += "\n" + self.do_visit(node.orelse)
+            self._write("\n")
+            self.do_emit(node.orelse)
         elif node.orelse:
-            output += "\nelse\n" + self.do_visit(node.orelse)
-        return output
-
-    @visit.register
-    def visit(self, node: Label) -> str:
-        return "::" + self.do_visit(node.id) + "::"
-
-    @visit.register
-    def visit(self, node: Goto) -> str:
-        return "goto " + self.do_visit(node.label)
-
-    @visit.register
-    def visit(self, node: Break) -> str:
-        return "break"
-
-    @visit.register
-    def visit(self, node: Return) -> str:
-        res = self.do_visit(node.values)
-        if res == "False":
-            return "return"
-        return "return " + res
-
-    @visit.register
-    def visit(self, node: Fornum) -> str:
-        output = " ".join(
-            [
-                "for",
-                self.do_visit(node.target),
-                "=",
-                ", ".join([self.do_visit(node.start), self.do_visit(node.stop)]),
-            ]
-        )
+            self._write("\nelse\n")
+            self.do_emit(node.orelse)
+
+    def emit_Label(self, node: Label):
+        self._write("::")
+        self.do_emit(node.id)
+        self._write("::")
+
+    def emit_Goto(self, node: Goto):
+        self._write("goto ")
+        self.do_emit(node.label)
+
+    def emit_Break(self, node: Break):
+        self._write("break")
+
+    def emit_Return(self, node: Return):
+        self._write("return")
+        before = self._writer.mark()
+        self._write(" ")
+        mark = self._writer.mark()
+        self.do_emit(node.values)
+        if self._writer.text_since(mark) == "False":
+            self._writer.rewind(before)
+
+    def emit_Fornum(self, node: Fornum):
+        self._write("for ")
+        self.do_emit(node.target)
+        self._write(" = ")
+        self.do_emit(node.start)
+        self._write(", ")
+        self.do_emit(node.stop)
         if node.step != 1:
-            output += ", " + self.do_visit(node.step)
-        output += " do\n" + self.do_visit(node.body) + "\nend"
-        return output
-
-    @visit.register
-    def visit(self, node: Forin) -> str:
-        return (
-                " ".join(
-                    ["for", self.do_visit(node.targets), "in", self.do_visit(node.iter), "do"]
-                )
-                + "\n"
-                + self.do_visit(node.body)
-                + "\nend"
-        )
-
-    @visit.register
-    def visit(self, node: Call) -> str:
-        return self.do_visit(node.func) + "(" + self.do_visit(node.args) + ")"
-
-    @visit.register
-    def visit(self, node: Invoke) -> str:
-        return (
-                self.do_visit(node.source)
-                + ":"
-                + self.do_visit(node.func)
-                + "("
-                + self.do_visit(node.args)
-                + ")"
-        )
-
-    @visit.register
-    def visit(self, node: Function) -> str:
-        return (
-                "\nfunction "
-                + self.do_visit(node.name)
-                + "("
-                + self.do_visit(node.args)
-                + ")\n"
-                + self.do_visit(node.body)
-                + "\nend"
-        )
-
-    @visit.register
-    def visit(self, node: StringifiedName) -> str:
-        return ("'"+node.id+"', "+node.id)
-
-    @visit.register
-    def visit(self, node: LocalFunction) -> str:
-        return (
-                "\nlocal function "
-                + self.do_visit(node.name)
-                + "("
-                + self.do_visit(node.args)
-                + ")\n"
-                + self.do_visit(node.body)
-                + "\nend"
-        )
-
-    @visit.register
-    def visit(self, node: Method) -> str:
-        return (
-                "function "
-                + self.do_visit(node.source)
-                + ":"
-                + self.do_visit(node.name)
-                + "("
-                + self.do_visit(node.args)
-                + ")\n"
-                + self.do_visit(node.body)
-                + "\nend"
-        )
-
-    @visit.register
-    def visit(self, node: Nil) -> str:
-        return "nil"
-
-    @visit.register
-    def visit(self, node: TrueExpr) -> str:
-        return "true"
-
-    @visit.register
-    def visit(self, node: FalseExpr) -> str:
-        return "false"
-
-    @visit.register
-    def visit(self, node: Number) -> str:
-        return self.do_visit(node.n)
-
-    @visit.register
-    def visit(self, node: String) -> str:
+            self._write(", ")
+            self.do_emit(node.step)
+        self._write(" do\n")
+        self.do_emit(node.body)
+        self._write("\nend")
+
+    def emit_Forin(self, node: Forin):
+        self._write("for ")
+        self.do_emit(node.targets)
+        self._write(" in ")
+        self.do_emit(node.iter)
+        self._write(" do\n")
+        self.do_emit(node.body)
+        self._write("\nend")
+
+    def emit_Call(self, node: Call):
+        self.do_emit(node.func)
+        self._write("(")
+        self.do_emit(node.args)
+        self._write(")")
+
+    def emit_Invoke(self, node: Invoke):
+        self.do_emit(node.source)
+        self._write(":")
+        self.do_emit(node.func)
+        self._write("(")
+        self.do_emit(node.args)
+        self._write(")")
+
+    def emit_Function(self, node: Function):
+        self._write("\nfunction ")
+        self.do_emit(node.name)
+        self._emit_function("(", node)
+
+    def emit_StringifiedName(self, node: StringifiedName):
+        self._write("'" + node.id + "', " + node.id)
+
+    def emit_LocalFunction(self, node: LocalFunction):
+        self._write("\nlocal function ")
+        self.do_emit(node.name)
+        self._emit_function("(", node)
+
+    def emit_Method(self, node: Method):
+        self._write("function ")
+        self.do_emit(node.source)
+        self._write(":")
+        self.do_emit(node.name)
+        self._emit_function("(", node)
+
+    def emit_Nil(self, node: Nil):
+        self._write("nil")
+
+    def emit_TrueExpr(self, node: TrueExpr):
+        self._write("true")
+
+    def emit_FalseExpr(self, node: FalseExpr):
+        self._write("false")
+
+    def emit_Number(self, node: Number):
+        self.do_emit(node.n)
+
+    def emit_String(self, node: String):
         if node.delimiter == StringDelimiter.SINGLE_QUOTE:
-            return "'" + self.do_visit(node.s) + "'"
+            opening, closing = "'", "'"
         elif node.delimiter == StringDelimiter.DOUBLE_QUOTE:
-            return '"' + self.do_visit(node.s) + '"'
+            opening, closing = '"', '"'
         else:
-            return "[[" + self.do_visit(node.s) + "]]"
+            opening, closing = "[[", "]]"
+        self._write(opening)
+        self.do_emit(node.s)
+        self._write(closing)
 
-    @visit.register
-    def visit(self, node: Table):
-        output = "{\n"
+    def emit_Table(self, node: Table):
+        self._write("{\n")
         for field in node.fields:
-            output += indent(self.do_visit(field) + ",\n", " " * self._indent_size)
-        output += "}"
-        return output
-
-    @visit.register
-    def visit(self, node: Field):
-        output = "[" if node.between_brackets else ""
-        output += self.do_visit(node.key)
-        output += "]" if node.between_brackets else ""
-        output += " = "
-        output += self.do_visit(node.value)
-        return output
-
-    @visit.register
-    def visit(self, node: Dots) -> str:
-        return "..."
-
-    @visit.register
-    def visit(self, node: AnonymousFunction) -> str:
-        return (
-                "function("
-                + self.do_visit(node.args)
-                + ")\n"
-                + self.do_visit(node.body)
-                + "\nend"
-        )
-
-    @visit.register
-    def visit(self, node: AddOp) -> str:
-        return self.do_visit(node.left) + " + " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: SubOp) -> str:
-        return self.do_visit(node.left) + " - " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: MultOp) -> str:
-        return self.do_visit(node.left) + " * " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: FloatDivOp) -> str:
-        return self.do_visit(node.left) + " / " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: FloorDivOp) -> str:
-        return self.do_visit(node.left) + " // " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: ModOp) -> str:
-        return self.do_visit(node.left) + " % " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: ExpoOp) -> str:
-        return self.do_visit(node.left) + " ^ " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: BAndOp) -> str:
-        return self.do_visit(node.left) + " & " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: BOrOp) -> str:
-        return self.do_visit(node.left) + " | " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: BXorOp) -> str:
-        return self.do_visit(node.left) + " ~ " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: BShiftROp) -> str:
-        return self.do_visit(node.left) + " >> " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: BShiftLOp) -> str:
-        return self.do_visit(node.left) + " << " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: LessThanOp) -> str:
-        return self.do_visit(node.left) + " < " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: GreaterThanOp) -> str:
-        return self.do_visit(node.left) + " > " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: LessOrEqThanOp) -> str:
-        return self.do_visit(node.left) + " <= " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: GreaterOrEqThanOp) -> str:
-        return self.do_visit(node.left) + " >= " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: EqToOp) -> str:
-        return self.do_visit(node.left) + " == " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: NotEqToOp) -> str:
-        return self.do_visit(node.left) + " ~= " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: AndLoOp) -> str:
-        return self.do_visit(node.left) + " and " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: OrLoOp) -> str:
-        return self.do_visit(node.left) + " or " + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: Concat) -> str:
-        return self.do_visit(node.left) + ".." + self.do_visit(node.right)
-
-    @visit.register
-    def visit(self, node: UMinusOp) -> str:
-        return "-" + self.do_visit(node.operand)
-
-    @visit.register
-    def visit(self, node: UBNotOp) -> str:
-        return "~" + self.do_visit(node.operand)
-
-    @visit.register
-    def visit(self, node: ULNotOp) -> str:
-        return "not " + self.do_visit(node.operand)
+            self._writer.indent(self._indent_size)
+            self.do_emit(field)
+            self._write(",\n")
+            self._writer.dedent()
+        self._write("}")
+
+    def emit_Field(self, node: Field):
+        if node.between_brackets:
+            self._write("[")
+            self.do_emit(node.key)
+            self._write("]")
+        else:
+            self.do_emit(node.key)
+        self._write(" = ")
+        self.do_emit(node.value)
 
-    @visit.register
-    def visit(self, node: ULengthOP) -> str:
-        return "#" + self.do_visit(node.operand)
+    def emit_Dots(self, node: Dots):
+        self._write("...")
 
-    @visit.register
-    def visit(self, node: Name) -> str:
-        return self.do_visit(node.id)
+    def emit_AnonymousFunction(self, node: AnonymousFunction):
+        self._emit_function("function(", node)
 
-    @visit.register
-    def visit(self, node: Index) -> str:
-        if node.notation == IndexNotation.DOT:
-            return self.do_visit(node.value) + "." + self.do_visit(node.idx)
-        else:
-            return self.do_visit(node.value) + "[" + self.do_visit(node.idx) + "]"
+    def emit_AddOp(self, node: AddOp):
+        self._emit_binary(node, " + ")
 
-    @visit.register
-    def visit(self, node: Varargs) -> str:
-        return "..."
+    def emit_SubOp(self, node: SubOp):
+        self._emit_binary(node, " - ")
 
-    @visit.register
-    def visit(self, node: Repeat) -> str:
-        return "repeat\n" + self.do_visit(node.body) + "\nuntil " + self.do_visit(node.test)
+    def emit_MultOp(self, node: MultOp):
+        self._emit_binary(node, " * ")
 
-    @visit.register
-    def visit(self, node: SemiColon) -> str:
-        return ";"
+    def emit_FloatDivOp(self, node: FloatDivOp):
+        self._emit_binary(node, " / ")
 
-    @visit.register
-    def visit(self, node: RequiredField) -> str:
-        return self.do_visit(node.value) + "!"
+    def emit_FloorDivOp(self, node: FloorDivOp):
+        self._emit_binary(node, " // ")
 
-    @visit.register
-    def visit(self, node: OptionalField) -> str:
-        return self.do_visit(node.value) + "?"
+    def emit_ModOp(self, node: ModOp):
+        self._emit_binary(node, " % ")
+
+    def emit_ExpoOp(self, node: ExpoOp):
+        self._emit_binary(node, " ^ ")
+
+    def emit_BAndOp(self, node: BAndOp):
+        self._emit_binary(node, " & ")
+
+    def emit_BOrOp(self, node: BOrOp):
+        self._emit_binary(node, " | ")
+
+    def emit_BXorOp(self, node: BXorOp):
+        self._emit_binary(node, " ~ ")
+
+    def emit_BShiftROp(self, node: BShiftROp):
+        self._emit_binary(node, " >> ")
+
+    def emit_BShiftLOp(self, node: BShiftLOp):
+        self._emit_binary(node, " << ")
+
+    def emit_LessThanOp(self, node: LessThanOp):
+        self._emit_binary(node, " < ")
+
+    def emit_GreaterThanOp(self, node: GreaterThanOp):
+        self._emit_binary(node, " > ")
+
+    def emit_LessOrEqThanOp(self, node: LessOrEqThanOp):
+        self._emit_binary(node, " <= ")
+
+    def emit_GreaterOrEqThanOp(self, node: GreaterOrEqThanOp):
+        self._emit_binary(node, " >= ")
+
+    def emit_EqToOp(self, node: EqToOp):
+        self._emit_binary(node, " == ")
+
+    def emit_NotEqToOp(self, node: NotEqToOp):
+        self._emit_binary(node, " ~= ")
+
+    def emit_AndLoOp(self, node: AndLoOp):
+        self._emit_binary(node, " and ")
+
+    def emit_OrLoOp(self, node: OrLoOp):
+        self._emit_binary(node, " or ")
+
+    def emit_Concat(self, node: Concat):
+        self._emit_binary(node, "..")
+
+    def emit_UMinusOp(self, node: UMinusOp):
+        self._write("-")
+        self.do_emit(node.operand)
+
+    def emit_UBNotOp(self, node: UBNotOp):
+        self._write("~")
+        self.do_emit(node.operand)
+
+    def emit_ULNotOp(self, node: ULNotOp):
+        self._write("not ")
+        self.do_emit(node.operand)
+
+    def emit_ULengthOP(self, node: ULengthOP):
+        self._write("#")
+        self.do_emit(node.operand)
+
+    def emit_Name(self, node: Name):
+        self.do_emit(node.id)
+
+    def emit_Index(self, node: Index):
+        self.do_emit(node.value)
+        if node.notation == IndexNotation.DOT:
+            self._write(".")
+            self.do_emit(node.idx)
+        else:
+            self._write("[")
+            self.do_emit(node.idx)
+            self._write("]")
+
+    def emit_Varargs(self, node: Varargs):
+        self._write("...")
+
+    def emit_Repeat(self, node: Repeat):
+        self._write("repeat\n")
+        self.do_emit(node.body)
+        self._write("\nuntil ")
+        self.do_emit(node.test)
+
+    def emit_SemiColon(self, node: SemiColon):
+        self._write(";")
+
+    def emit_RequiredField(self, node: RequiredField):
+        self.do_emit(node.value)
+        self._write("!")
+
+    def emit_OptionalField(self, node: OptionalField):
+        self.do_emit(node.value)
+        self._write("?")
+
+
+def _lua_handler(node_type):
+    """Find the LuaOutputVisitor emit_ method of node_type or of its nearest base.
+
+    Returns:
+        A (handler, is_expression) tuple, or None.
+    """
+    for base in node_type.__mro__:
+        handler = getattr(LuaOutputVisitor, "emit_" + base.__name__, None)
+        if handler is not None:
+            return handler, issubclass(node_type, Expression)
+    return None
+
+
+def _add_lua_handler(node_type):
+    entry = _lua_handler(node_type)
+    if entry is None:
+        raise VisitorException("No visitor found for class " + str(node_type))
+    _LUA_HANDLERS[node_type] = entry
+    return entry
+
+
+def _node_classes(cls=Node):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _node_classes(subclass)
+
+
+# Handlers of LuaOutputVisitor by node class, resolved once at import.
+# Classes defined later are added on first use.
+_LUA_HANDLERS = {}
+for _node_type in [str, int, float, bool, list, type(None), *_node_classes()]:
+    _entry = _lua_handler(_node_type)
+    if _entry is not None:
+        _LUA_HANDLERS[_node_type] = _entry
+
+
+class LuaRewriter:
+    """Render a tree as Lua, keeping the text of the source it was parsed
+    from wherever it needs no change.
+
+    A statement whose tokens are all standard Lua is copied from the
+    source, and so are the comments and blank lines around it. Other
+    statements are printed by LuaOutputVisitor: the ones using the dialect
+    (pipes, ``..name``, ``for k,v ; t``, missing ``then``, ``do`` or
+    ``)``) and the ones without a position, like statements added to the
+    tree after parsing. A compound statement whose own tokens are standard
+    Lua, a function header for instance, is kept and the blocks it holds
+    are rewritten the same way. So only the changed statements are
+    printed.
+
+    Changes made to the tree after parsing are found by comparing it with
+    the original tree, parsed from the same source: a statement that is no
+    longer equal to the original one at its position, comments aside, is
+    printed, and so is the statement holding a block whose statements were
+    added, removed or moved. Positions of changed nodes do not have to be
+    cleared.
+    """
+
+    def __init__(self, source: str, original: Chunk, indent_size: int = 4, out=None):
+        """
+
+        Args:
+            source: Lua source the tree was parsed from
+            original: Tree parsed from source and left unchanged, comments
+                are not needed. Rendering original itself skips the
+                comparison.
+            indent_size: Number of spaces of each indentation level of the
+                printed statements
+            out: Optional text file the source is streamed to
+        """
+        self._source = source
+        self._indent_size = indent_size
+        self._out = out
+        # (start, stop, text) of each printed statement, stop excluded
+        self._edits: List[Tuple[int, int, str]] = []
+        self._original = original
+        # original statement of each span, and spans of the statements of
+        # the block holding it, None when the original tree is rendered
+        self._statements: Optional[Dict[Tuple[int, int], Statement]] = None
+        self._blocks: Dict[Tuple[int, int], Tuple[Tuple[int, int], ...]] = {}
+
+    def _index(self) -> Tuple[Tuple[int, int], ...]:
+        """Fill the span indexes from the original tree.
+
+        Returns:
+            The spans of the statements of the chunk.
+        """
+        original = self._original
+        self._statements = {}
+        self._blocks = {}
+        chunk_spans = ()
+        stack = [original]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, Block):
+                spans = tuple(_span(stat) for stat in value.body)
+                if value is original.body:
+                    chunk_spans = spans
+                for span, stat in zip(spans, value.body):
+                    self._statements[span] = stat
+                    self._blocks[span] = spans
+            if isinstance(value, Node):
+                stack.extend(getattr(value, f) for f in value._fields if f != "comments")
+            elif isinstance(value, list):
+                stack.extend(value)
+        return chunk_spans
+
+    def visit(self, root: Chunk) -> Optional[str]:
+        """Render root, parsed from the source.
+
+        Returns:
+            The source, or None if it was written to the ``out`` file.
+        """
+        self._edits = []
+        if root is self._original:
+            # nothing to compare
+            self._statements = None
+            chunk_spans = None
+        else:
+            chunk_spans = self._index()
+        if not isinstance(root, Chunk) or not self._rewrite_block(root.body, chunk_spans):
+            return LuaOutputVisitor(self._indent_size, self._out).visit(root)
+
+        parts = []
+        position = 0
+        for start, stop, text in self._edits:
+            parts.append(self._source[position:start])
+            parts.append(text)
+            position = stop
+        parts.append(self._source[position:])
+        self._edits = []
+        if self._out is None:
+            return "".join(parts)
+        for part in parts:
+            self._out.write(part)
+        return None
+
+    def _rewrite_block(self, block: Block, spans: Optional[Tuple[Tuple[int, int], ...]] = None) -> bool:
+        """Add the edits of the statements of block.
+
+        Args:
+            spans: Spans of the statements of the original block, by
+                default the ones of the block holding the first statement.
+                Not used when the original tree is rendered.
+
+        Returns:
+            False if a statement has no position or the statements are not
+            the ones of the original block, so that block cannot be edited
+            in place.
+        """
+        if not all(s._first_position and s._last_position for s in block.body):
+            return False
+        if self._statements is not None:
+            own_spans = tuple(_span(stat) for stat in block.body)
+            if spans is None:
+                spans = self._blocks.get(own_spans[0]) if own_spans else None
+            if own_spans != spans:
+                return False
+        for stat in block.body:
+            edits = len(self._edits)
+            if not self._rewrite_statement(stat):
+                del self._edits[edits:]
+                self._print(stat)
+        return True
+
+    def _rewrite_statement(self, stat: Statement) -> bool:
+        """Add the edits of the blocks of stat.
+
+        Returns:
+            False if stat itself must be printed.
+        """
+        blocks = self._inner_blocks(stat, False)
+        own = self._own_ranges(stat, blocks)
+        # function expressions hold blocks too, look for them only when
+        # needed: the walk goes through every expression of stat
+        if own and any(self._source.find("function", start, stop) >= 0 for start, stop in own):
+            blocks = self._inner_blocks(stat, True)
+            own = self._own_ranges(stat, blocks)
+        if own is None or not self._is_unchanged(stat, blocks):
+            return False
+        if not self._is_standard(own) and not self._rewrite_headers(stat, blocks, own):
+            return False
+        return all(self._rewrite_block(b) for b in blocks)
+
+    def _rewrite_headers(
+            self, stat: Statement, blocks: List[Block], own: List[Tuple[int, int]]
+    ) -> bool:
+        """Add the edits printing the headers of the blocks of stat, from
+        their keyword through their ``then`` or ``do``, when stat is an if
+        or a loop whose blocks are all the ones of its headers.
+
+        Returns:
+            False if stat is not one of them, then it must be printed.
+        """
+        headers = _headers(stat)
+        if headers is None or [id(b) for b in blocks] != [id(b) for _, b in headers]:
+            return False
+        edits = []
+        for (keywords, block), (start, stop) in zip(headers, own):
+            tokens = [t for t in scan(self._source, start, stop) if t[0] not in _HIDDEN]
+            if not tokens or tokens[0][0] not in keywords:
+                return False
+            edits.append((tokens[0][1], tokens[-1][2], block))
+        if [t[0] for t in scan(self._source, *own[-1]) if t[0] not in _HIDDEN] != [LuaLexer.END]:
+            return False
+
+        for (start, stop, block), header in zip(edits, self._header_texts(stat)):
+            if self._source[start:stop] != header:
+                self._replace(start, stop, header)
+        return True
+
+    def _header_texts(self, stat: Statement) -> List[str]:
+        """Printed headers of stat, see _headers."""
+
+        def text(node) -> str:
+            return LuaOutputVisitor(self._indent_size).visit(node)
+
+        if isinstance(stat, While):
+            return ["while " + text(stat.test) + " do"]
+        if isinstance(stat, Fornum):
+            step = "" if stat.step == 1 else ", " + text(stat.step)
+            return [
+                "for " + text(stat.target) + " = " + text(stat.start) + ", " + text(stat.stop)
+                + step + " do"
+            ]
+        if isinstance(stat, Forin):
+            return ["for " + text(stat.targets) + " in " + text(stat.iter) + " do"]
+        texts = []
+        node, keyword = stat, "if "
+        while isinstance(node, (If, ElseIf)):
+            texts.append(keyword + text(node.test) + " then")
+            node, keyword = node.orelse, "elseif "
+        if node is not None:
+            texts.append("else")
+        return texts
+
+    def _is_unchanged(self, stat: Statement, blocks: List[Block]) -> bool:
+        """Whether stat equals the original statement at its position,
+        comments and its blocks aside: they are checked on their own."""
+        if self._statements is None:
+            return True
+        original = self._statements.get(_span(stat))
+        skipped = {id(b) for b in blocks}
+        stack = [(stat, original)]
+        while stack:
+            value, other = stack.pop()
+            if value is other:
+                continue
+            if isinstance(value, Node):
+                if id(value) in skipped and isinstance(other, Block):
+                    continue
+                if type(value) is not type(other) or value._name != other._name:
+                    return False
+                stack.extend(
+                    (getattr(value, f), getattr(other, f)) for f in value._fields if f != "comments"
+                )
+            elif isinstance(value, list):
+                if not isinstance(other, list) or len(value) != len(other):
+                    return False
+                stack.extend(zip(value, other))
+            elif value != other:
+                return False
+        return True
+
+    @staticmethod
+    def _own_ranges(stat: Statement, blocks: List[Block]) -> Optional[List[Tuple[int, int]]]:
+        """Source ranges of stat that are not in its blocks, None if a
+        block has no position. The span of a block is the one of its
+        statements."""
+        start = stat._first_position.start
+        ranges = []
+        for inner in blocks:
+            first, last = inner.body[0]._first_position, inner.body[-1]._last_position
+            if first is None or last is None:
+                return None
+            ranges.append((start, first.start))
+            start = last.stop + 1
+        ranges.append((start, stat._last_position.stop + 1))
+        return ranges
+
+    @staticmethod
+    def _inner_blocks(stat: Statement, functions: bool) -> List[Block]:
+        """Non empty blocks held by stat, but not their nested blocks, in
+        source order. With functions, the blocks of the function
+        expressions of stat are included."""
+        blocks = []
+        stack = [getattr(stat, f) for f in reversed(stat._fields)]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, Block):
+                if value.body:
+                    blocks.append(value)
+            elif isinstance(value, ElseIf):
+                stack.extend(getattr(value, f) for f in reversed(value._fields))
+            elif functions and isinstance(value, Node):
+                stack.extend(getattr(value, f) for f in reversed(value._fields))
+            elif functions and isinstance(value, list):
+                stack.extend(reversed(value))
+        return blocks
+
+    def _is_standard(self, ranges: List[Tuple[int, int]]) -> bool:
+        """Whether the source ranges are standard Lua, as far as the
+        dialect is concerned."""
+        source = self._source
+        if not any(_DIALECT_HINTS.search(source, start, stop) for start, stop in ranges) and sum(
+            source.count("(", start, stop) - source.count(")", start, stop) for start, stop in ranges
+        ) == 0:
+            # without strings or comments, a missing ")" is the only
+            # possible change and parentheses can be counted as text
+            return True
+
+        brackets = []
+        conditions = thens = openers = ends = 0
+        previous = None
+        # in the names after "for"
+        for_names = False
+        for start, stop in ranges:
+            for tok_type, _ in default_tokens(self._source, start, stop):
+                if for_names:
+                    if tok_type == LuaLexer.SEMCOL:
+                        return False
+                    for_names = tok_type in (LuaLexer.NAME, LuaLexer.COMMA)
+
+                if tok_type in _CLOSING_OF:
+                    brackets.append(_CLOSING_OF[tok_type])
+                elif tok_type in _CLOSING_BRACKETS:
+                    if not brackets or brackets.pop() != tok_type:
+                        return False
+                elif tok_type == LuaLexer.BITOR:
+                    # a pipe, or a bitwise or printed the same way
+                    return False
+                elif tok_type == LuaLexer.CONCAT and previous not in _OPERAND_ENDS:
+                    return False
+                elif tok_type == LuaLexer.IF:
+                    conditions += 1
+                    openers += 1
+                elif tok_type == LuaLexer.ELSEIF:
+                    conditions += 1
+                elif tok_type == LuaLexer.THEN:
+                    thens += 1
+                elif tok_type == LuaLexer.FUNCTION or tok_type == LuaLexer.DO:
+                    openers += 1
+                elif tok_type == LuaLexer.END:
+                    ends += 1
+                elif tok_type == LuaLexer.FOR:
+                    for_names = True
+                previous = tok_type
+        # every if and elseif has a then, every loop a do
+        return not brackets and conditions == thens and openers == ends
+
+    def _print(self, stat: Statement):
+        start = stat._first_position.start
+        stop = stat._last_position.stop + 1
+        self._replace(start, stop, LuaOutputVisitor(self._indent_size).visit(Block([stat])).lstrip("\n"))
+
+    def _replace(self, start: int, stop: int, text: str):
+        """Add the edit replacing source[start:stop] by printed text."""
+        # continuation lines follow the indentation of the statement line,
+        # unless a string spans several lines
+        line_start = self._source.rfind("\n", 0, start) + 1
+        indent = self._source[line_start:start]
+        if indent and not indent.strip() and not any(
+            tok_type == LuaLexer.STRING and "\n" in tok_text
+            for tok_type, tok_text in default_tokens(self._source, start, stop)
+        ):
+            text = "\n".join(
+                indent + line if i and line else line
+                for i, line in enumerate(text.split("\n"))
+            )
+        self._edits.append((start, stop, text))
+
+
+def _span(stat: Statement) -> Tuple[int, int]:
+    return stat._first_position.start, stat._last_position.stop
+
+
+def _headers(stat: Statement) -> Optional[List[Tuple[Tuple[int, ...], Block]]]:
+    """(keywords a header can start with, block) of each header of an if
+    or a loop, in source order. None for other statements."""
+    if isinstance(stat, While):
+        return [((LuaLexer.WHILE,), stat.body)]
+    if isinstance(stat, (Fornum, Forin)):
+        return [((LuaLexer.FOR,), stat.body)]
+    if not isinstance(stat, If):
+        return None
+    headers = []
+    node, keyword = stat, LuaLexer.IF
+    while isinstance(node, (If, ElseIf)):
+        headers.append(((keyword,), node.body))
+        node, keyword = node.orelse, LuaLexer.ELSEIF
+    if node is not None:
+        headers.append(((LuaLexer.ELSE,), node))
+    return headers
+
+
+_CLOSING_OF = {
+    LuaLexer.OPAR: LuaLexer.CPAR,
+    LuaLexer.OBRACK: LuaLexer.CBRACK,
+    LuaLexer.OBRACE: LuaLexer.CBRACE,
+}
+_CLOSING_BRACKETS = set(_CLOSING_OF.values())
+_HIDDEN = {
+    LuaLexer.COMMENT,
+    LuaLexer.LINE_COMMENT,
+    LuaLexer.SPACE,
+    LuaLexer.NEWLINE,
+    LuaLexer.SHEBANG,
+}
+# text without which the tokens of a statement cannot use the dialect,
+# or hide a parenthesis in a string or a comment
+_DIALECT_HINTS = re.compile(r"""["'|]|\[=*\[|--|\.\.|\b(?:if|elseif|for|while)\b""")
+# tokens that can end an operand, a ".." after them is a concatenation
+_OPERAND_ENDS = {
+    LuaLexer.NAME,
+    LuaLexer.NUMBER,
+    LuaLexer.STRING,
+    LuaLexer.NIL,
+    LuaLexer.TRUE,
+    LuaLexer.FALSE,
+    LuaLexer.VARARGS,
+    LuaLexer.CPAR,
+    LuaLexer.CBRACK,
+    LuaLexer.CBRACE,
+    LuaLexer.REQFIELD,
+    LuaLexer.OPTIONALFIELD,
+}
@@ -0,0 +1,135 @@
+"""
+    ``stream`` module
+    =================
+
+    Pre-tokenized token stream used by the Builder.
+"""
+from typing import List, Optional, Tuple
+
+from antlr4.Token import Token
+from antlr4.error.Errors import IllegalStateException
+
+
+class ArrayTokenStream:
+    """Token stream fully materialized from a token source.
+
+    All tokens are fetched up front. Parallel lists hold the type, text,
+    start, stop, line and column of every token, and for each index the
+    next default channel token at or after it and the previous one before
+    it. Lookahead, seek and hidden token lookup are plain list reads.
+
+    Implements the part of the CommonTokenStream API the Builder uses,
+    with the same results: index, LT, LA, consume, seek,
+    getHiddenTokensToLeft and getHiddenTokensToRight. index always points
+    to a default channel token.
+    """
+
+    def __init__(self, token_source, offset: Optional[Tuple[int, int, int, int]] = None):
+        """
+
+        Args:
+            token_source: Lexer of the source
+            offset: Optional (char, line, column, token index) of the start
+                of the source in a larger one. Tokens are moved to their
+                position in the larger source, their index in the stream
+                lists does not change.
+        """
+        tokens = []
+        token = token_source.nextToken()
+        if offset is None:
+            while True:
+                token.tokenIndex = len(tokens)
+                tokens.append(token)
+                if token.type == Token.EOF:
+                    break
+                token = token_source.nextToken()
+        else:
+            chars, line, column, first_index = offset
+            lines = line - 1
+            while True:
+                token.tokenIndex = first_index + len(tokens)
+                # antlr tokens read their text at their position
+                token.text = token.text
+                token.start += chars
+                token.stop += chars
+                if token.line == 1:
+                    token.column += column
+                token.line += lines
+                tokens.append(token)
+                if token.type == Token.EOF:
+                    break
+                token = token_source.nextToken()
+
+        self.tokenSource = token_source
+        self.tokens: List[Token] = tokens
+        self.types: List[int] = [t.type for t in tokens]
+        self.texts: List[str] = [t.text for t in tokens]
+        self.starts: List[int] = [t.start for t in tokens]
+        self.stops: List[int] = [t.stop for t in tokens]
+        self.lines: List[int] = [t.line for t in tokens]
+        self.columns: List[int] = [t.column for t in tokens]
+
+        n = len(tokens)
+        # next_default[i]: first default channel token at i or after,
+        # next_default[n] stays on EOF
+        self.next_default: List[int] = [0] * (n + 1)
+        # prev_default[i]: last default channel token before i, or -1
+        self.prev_default: List[int] = [-1] * n
+
+        following = n - 1
+        for i in range(n - 1, -1, -1):
+            if tokens[i].channel == Token.DEFAULT_CHANNEL:
+                following = i
+            self.next_default[i] = following
+        self.next_default[n] = n - 1
+
+        previous = -1
+        for i, t in enumerate(tokens):
+            self.prev_default[i] = previous
+            if t.channel == Token.DEFAULT_CHANNEL:
+                previous = i
+
+        self.index: int = self.next_default[0]
+
+    def LT(self, k: int) -> Optional[Token]:
+        if k == 0:
+            return None
+        i = self.index
+        if k < 0:
+            if i + k < 0:
+                return None
+            for _ in range(-k):
+                i = self.prev_default[i]
+                if i < 0:
+                    return None
+            return self.tokens[i]
+        for _ in range(k - 1):
+            i = self.next_default[i + 1]
+        return self.tokens[i]
+
+    def LA(self, k: int) -> int:
+        return self.LT(k).type
+
+    def consume(self) -> None:
+        if self.types[self.index] == Token.EOF:
+            raise IllegalStateException("cannot consume EOF")
+        self.index = self.next_default[self.index + 1]
+
+    def seek(self, index: int) -> None:
+        self.index = self.next_default[min(index, len(self.tokens))]
+
+    def getHiddenTokensToLeft(self, token_index: int) -> Optional[List[Token]]:
+        """Off channel tokens between token_index and the previous default
+        channel token, or None."""
+        first = self.prev_default[token_index] + 1
+        if first == token_index:
+            return None
+        return self.tokens[first:token_index]
+
+    def getHiddenTokensToRight(self, token_index: int) -> Optional[List[Token]]:
+        """Off channel tokens between token_index and the next default
+        channel token, or None."""
+        stop = self.next_default[token_index + 1]
+        if stop <= token_index + 1:
+            return None
+        return self.tokens[token_index + 1 : stop]
@@ -2,6 +2,12 @@ from luaparser.utils import tests
 from luaparser import ast
 from luaparser.astnodes import *
 import textwrap
+import pickle
+import json
+import io
+from xml.dom import minidom
+import xml.etree.ElementTree as ElementTree
+from luaparser import printers
 
 
 class AstTestCase(tests.TestCase):
@@ -99,3 +105,114 @@ class AstTestCase(tests.TestCase):
         ]
         for node, exp in zip(nodes, expected_cls):
             self.assertIsInstance(node, exp)
+
+    def test_token_positions(self):
+        src = textwrap.dedent(
+            """
+            local a = f(1, x.y) -- comment
+            """
+        )
+        tree = ast.parse(src)
+        call = tree.body.body[0].values[0]
+        self.assertEqual(call.first_position[:5], (11, 11, 2, 10, 7))
+        self.assertEqual((call.start_char, call.stop_char, call.line), (11, 19, 2))
+        token = call.first_token
+        self.assertEqual((token.start, token.stop, token.line, token.column), (11, 11, 2, 10))
+        self.assertEqual(token.tokenIndex, 7)
+        self.assertEqual(token.text, "f")
+        self.assertEqual(tree.body.body[0].last_token.text, ")")
+        self.assertEqual(ast.parse("x = foo").body.body[0].last_token.text, "foo")
+
+    def test_pickle(self):
+        src = textwrap.dedent(
+            """
+            local function f(a) return a .. "!" end
+            """
+        )
+        tree = ast.parse(src)
+        clone = pickle.loads(pickle.dumps(tree))
+        self.assertEqual(tree, clone)
+        func = clone.body.body[0]
+        self.assertEqual((func.start_char, func.stop_char), (1, 39))
+
+    def test_fields(self):
+        tree = ast.parse("a.b = c?")
+        index = tree.body.body[0].targets[0]
+        self.assertEqual(index._fields, ("comments", "wrapped", "idx", "value", "notation"))
+        self.assertFalse(hasattr(index, "__dict__"))
+        field = tree.body.body[0].values[0]
+        self.assertEqual(field.value, Name("c"))
+
+    def test_walk_fields(self):
+        tree = ast.parse("a.b = c? .. d!")
+        classes = [type(node) for node in ast.walk(tree)]
+        self.assertIn(OptionalField, classes)
+        self.assertIn(RequiredField, classes)
+        self.assertEqual(classes.count(Name), 4)
+
+    def test_json(self):
+        src = textwrap.dedent(
+            """
+            -- comment
+            local t = {1, 2.5, "é", a.b, c[d]} -- inline
+            t[1] = nil
+            """
+        )
+        tree = ast.parse(src)
+        expected = json.dumps(tree, cls=ast.JSONEncoder, indent=4)
+        self.assertEqual(expected, ast.to_pretty_json(tree))
+
+        out = io.StringIO()
+        self.assertIsNone(ast.to_pretty_json(tree, out=out))
+        self.assertEqual(expected, out.getvalue())
+
+        compact = ast.to_pretty_json(tree, indent=None)
+        self.assertNotIn("\n", compact)
+        self.assertEqual(json.loads(expected), json.loads(compact))
+
+    def test_json_statement_positions(self):
+        # statements built without tokens of their own have a span too
+        src = "while a do break end\n::l:: goto l\n"
+        document = json.loads(ast.to_pretty_json(ast.parse(src), indent=None))
+        spans = [
+            (name, value["start_char"], value["stop_char"], value["line"])
+            for stat in document["Chunk"]["body"]["Block"]["body"]
+            for name, value in stat.items()
+        ]
+        self.assertEqual(
+            [("While", 0, 19, 1), ("Label", 21, 25, 2), ("Goto", 27, 32, 2)], spans
+        )
+        body = document["Chunk"]["body"]["Block"]["body"][0]["While"]["body"]["Block"]["body"]
+        self.assertEqual({"Break": {"start_char": 11, "stop_char": 15, "line": 1}}, body[0])
+
+    def test_json_deep(self):
+        # deeper than json.dumps can go
+        tree = Table([])
+        for _ in range(3000):
+            tree = Table([Field(Number(1), tree)])
+        self.assertEqual(3001, ast.to_pretty_json(tree, indent=None).count("Table"))
+
+    def test_xml(self):
+        src = textwrap.dedent(
+            """
+            -- comment <&>
+            local t = {1, 2.5, "é", '"q"', "", a.b, c[d]}
+            """
+        )
+        tree = ast.parse(src)
+        # what HTMLStyleVisitor.get_xml_string used to return
+        doc = ElementTree.Element("doc")
+        doc.append(printers.HTMLStyleVisitor().visit(tree))
+        expected = minidom.parseString(ElementTree.tostring(doc)).toprettyxml(indent="   ")
+        self.assertEqual(expected, ast.to_xml_str(tree))
+
+        out = io.StringIO()
+        self.assertIsNone(ast.to_xml_str(tree, out=out))
+        self.assertEqual(expected, out.getvalue())
+
+    def test_token_stream(self):
+        src = "local a = 'x' -- c\n"
+        streams = [ast.get_token_stream(src), ast.get_token_stream(src, fast_lexer=True)]
+        for stream in streams:
+            stream.fill()
+        self.assertEqual(*[[str(t) for t in stream.tokens] for stream in streams])
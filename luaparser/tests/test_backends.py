@@ -0,0 +1,113 @@
+from luaparser.utils import tests
+from luaparser import ast, backends, gen_converter
+from luaparser.astnodes import *
+from luaparser.builder import SyntaxException
+import textwrap
+
+# standard Lua, parsed to the same tree by every backend
+SOURCE = textwrap.dedent(
+    """\
+    -- comment
+    local a, b = 1, 0x1F
+    local x
+    function m.f:g(x, ...) return x end
+    function m.f(x) end
+    local function f() end
+    for i = 1, 10 do break end
+    for i = 1, 10, 2 do end
+    for k, v in pairs(t), 2 do end
+    t = { 1, a = 2, [3] = 4; "s", f = function(...) end, }
+    x = a or not c and d == 3
+    x = a .. "b" .. [[long]] .. (c .. 'd')
+    x = -a + ~b * #c ^ 2, a // b, a % b / c
+    ::l:: goto l
+    repeat ; until a >= b
+    if a then elseif b then x() else end
+    if a then x() elseif b then y() elseif c then z() end
+    while a < b do end
+    do end
+    obj:m{1} obj:m"s"
+    a.b[c].d = 1.5, 1e3
+    f(a)(b).c:d(e)
+    x = (a + b) * c, (f()), (a).b
+    x = nil, true, false, ...
+    return
+    """
+)
+
+
+class BackendsTestCase(tests.TestCase):
+    def test_same_tree(self):
+        expected = ast.parse(SOURCE, comments=False)
+        for backend in ["gen", "gen2"]:
+            self.assertEqual(expected, ast.parse(SOURCE, backend=backend))
+
+    def test_tree(self):
+        tree = ast.parse("push | a\nx = a | b\n", backend="gen")
+        exp = Chunk(
+            Block(
+                [
+                    Call(Name("push"), Name("a")),
+                    Assign([Name("x")], [BOrOp(Name("a"), Name("b"))]),
+                ]
+            )
+        )
+        self.assertEqual(exp, tree)
+        self.assertIsNone(tree.body.body[0].first_position)
+
+    def test_precedence(self):
+        # operators where the grammar and Builder differ
+        cases = [
+            ("#a == 0", EqToOp(ULengthOP(Name("a")), Number(0)), ULengthOP(EqToOp(Name("a"), Number(0)))),
+            (
+                "a & b * c",
+                BAndOp(Name("a"), MultOp(Name("b"), Name("c"))),
+                MultOp(BAndOp(Name("a"), Name("b")), Name("c")),
+            ),
+            (
+                "a ^ b - c",
+                SubOp(ExpoOp(Name("a"), Name("b")), Name("c")),
+                ExpoOp(Name("a"), SubOp(Name("b"), Name("c"))),
+            ),
+            (
+                "a + b & c",
+                BAndOp(AddOp(Name("a"), Name("b")), Name("c")),
+                AddOp(Name("a"), BAndOp(Name("b"), Name("c"))),
+            ),
+            (
+                "a + b | c",
+                BOrOp(AddOp(Name("a"), Name("b")), Name("c")),
+                AddOp(Name("a"), Call(Name("b"), Name("c"))),
+            ),
+        ]
+        for source, generated, built in cases:
+            for package in gen_converter.PACKAGES:
+                tree = ast.parse("x = " + source, backend=package)
+                self.assertEqual(Chunk(Block([Assign([Name("x")], [generated])])), tree, package)
+            tree = ast.parse("x = " + source, comments=False)
+            self.assertEqual(Chunk(Block([Assign([Name("x")], [built])])), tree)
+
+    def test_syntax_error(self):
+        for source in ["x = = 1", "x = a?", "push | a", "while true do continue end"]:
+            self.assertRaises(SyntaxException, ast.parse, source, backend="gen2")
+
+    def test_sll_fallback(self):
+        counters = gen_converter.counters
+        counters.reset()
+        tree = gen_converter.parse(SOURCE, "gen2")
+        self.assertEqual((1, 0), (counters.parses, counters.fallbacks))
+        # SLL prediction fails on calls in expressions with gen
+        self.assertEqual(tree, gen_converter.parse(SOURCE, "gen", sll=True))
+        self.assertEqual((2, 1), (counters.parses, counters.fallbacks))
+        self.assertRaises(SyntaxException, gen_converter.parse, "x = = 1", "gen2")
+        self.assertEqual((3, 2), (counters.parses, counters.fallbacks))
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, ast.parse, SOURCE, backend="none")
+
+    def test_register(self):
+        backends.register("empty", lambda source, **options: Chunk(Block([])))
+        try:
+            self.assertEqual(Chunk(Block([])), ast.parse(SOURCE, backend="empty"))
+        finally:
+            del backends.BACKENDS["empty"]
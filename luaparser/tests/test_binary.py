@@ -0,0 +1,74 @@
+from luaparser.utils import tests
+from luaparser import ast, binary
+from luaparser.astnodes import *
+from luaparser.tests.test_lexer import suite_sources
+import textwrap
+
+SOURCE = textwrap.dedent(
+    """
+    -- comment
+    local function f(a, ...)
+      --[[ block
+      comment ]]
+      return a.b.c["d"] .. [[long]] .. 'é', #t, -1.5e300, 0x7fffffffffffffff
+    end
+    """
+)
+
+
+class BinaryTestCase(tests.TestCase):
+    def assert_same_positions(self, expected, tree):
+        for a, b in zip(ast.walk(expected), ast.walk(tree)):
+            self.assertEqual(a.first_position, b.first_position)
+            self.assertEqual(a.last_position, b.last_position)
+
+    def test_round_trip(self):
+        tree = ast.parse(SOURCE)
+        data = ast.dump_binary(tree)
+        self.assertTrue(data.startswith(binary.MAGIC))
+        loaded = ast.load_binary(data)
+        self.assertEqual(tree, loaded)
+        self.assertEqual(ast.to_lua_source(tree), ast.to_lua_source(loaded))
+        self.assert_same_positions(tree, loaded)
+
+        string = loaded.body.body[0].body.body[0].values[0].left.left.idx
+        self.assertEqual(StringDelimiter.DOUBLE_QUOTE, string.delimiter)
+
+    def test_suite_sources(self):
+        for source in suite_sources():
+            try:
+                tree = ast.parse(source)
+            except Exception:
+                continue
+            loaded = ast.load_binary(ast.dump_binary(tree))
+            self.assertEqual(tree, loaded)
+            self.assert_same_positions(tree, loaded)
+
+    def test_values(self):
+        values = [None, True, False, 0, -1, 2 ** 70, -(2 ** 70), 0.5, float("inf"), "", "a\ud800", IndexNotation.SQUARE]
+        self.assertEqual(values, ast.load_binary(ast.dump_binary(values)))
+
+    def test_node_without_position(self):
+        tree = Chunk(Block([Assign([Name("a")], [Number(1)])]))
+        loaded = ast.load_binary(ast.dump_binary(tree))
+        self.assertEqual(tree, loaded)
+        self.assertIsNone(loaded.body.body[0].first_position)
+
+    def test_strings_interned(self):
+        data = ast.dump_binary(ast.parse("x = 1\n" * 100))
+        self.assertEqual(1, data.count(b"Assign"))
+        self.assertEqual(1, data.count(b"Name"))
+
+    def test_invalid_data(self):
+        data = ast.dump_binary(ast.parse(SOURCE))
+        self.assertRaises(ValueError, ast.load_binary, b"")
+        self.assertRaises(ValueError, ast.load_binary, b"JSON" + data[4:])
+        self.assertRaises(ValueError, ast.load_binary, binary.MAGIC + bytes([binary.VERSION + 1]) + data[5:])
+        self.assertRaises(ValueError, ast.load_binary, data[:-3])
+        self.assertRaises(ValueError, ast.load_binary, data + b"\0")
+
+    def test_truncated_data(self):
+        data = ast.dump_binary(ast.parse(SOURCE))
+        for size in range(len(data)):
+            with self.subTest(size=size):
+                self.assertRaises(ValueError, ast.load_binary, data[:size])
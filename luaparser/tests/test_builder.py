@@ -0,0 +1,32 @@
+import textwrap
+
+from luaparser.builder import Builder
+from luaparser.utils import tests
+
+
+class BuilderTestCase(tests.TestCase):
+    def test_packrat_same_tree(self):
+        src = textwrap.dedent(
+            """
+            -- comment
+            describe("", function()
+              it(function() -- inline
+                do
+                  local a = f(x)(y).z:w{1, 2}
+                end
+              end)
+            end)
+            """
+        )
+        self.assertEqual(
+            Builder(src, packrat=False).process(),
+            Builder(src, packrat=True).process(),
+        )
+
+    def test_packrat_nested_calls(self):
+        depth = 12
+        src = "f(function()\n" * depth + "g()\n" + "end)\n" * depth
+        builder = Builder(src)
+        builder.process()
+        # each var chain is parsed once, not 2^depth times
+        self.assertLess(len(builder._memo), 20 * depth)
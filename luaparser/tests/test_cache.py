@@ -0,0 +1,99 @@
+from luaparser.utils import tests
+import luaparser
+from luaparser import ast
+from luaparser.cache import ASTCache
+import os
+import tempfile
+import textwrap
+
+SOURCE = textwrap.dedent(
+    """
+    -- comment
+    local function f(a, ...)
+      return a.b!.c .. [[long]], #t, d?
+    end
+    """
+)
+
+
+class ASTCacheTestCase(tests.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ASTCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def entries(self):
+        return sorted(os.listdir(self.tmp.name))
+
+    def test_hit_miss(self):
+        tree = ast.parse(SOURCE, cache=self.cache)
+        self.assertEqual((0, 1), (self.cache.hits, self.cache.misses))
+        cached = ast.parse(SOURCE, cache=self.cache)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+        self.assertEqual(tree, cached)
+        self.assertEqual(ast.to_lua_source(tree), ast.to_lua_source(cached))
+        self.assertEqual(tree.body.first_position, cached.body.first_position)
+
+        # other options or other source
+        ast.parse(SOURCE, comments=False, cache=self.cache)
+        ast.parse(SOURCE + "x = 1", cache=self.cache)
+        self.assertEqual((1, 3), (self.cache.hits, self.cache.misses))
+        self.assertEqual(3, len(self.entries()))
+
+    def test_tree_revision(self):
+        ast.parse(SOURCE, cache=self.cache)
+        revision = luaparser.TREE_REVISION
+        luaparser.TREE_REVISION = revision + 1
+        try:
+            ast.parse(SOURCE, cache=self.cache)
+        finally:
+            luaparser.TREE_REVISION = revision
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+        ast.parse(SOURCE, cache=self.cache)
+        self.assertEqual((1, 2), (self.cache.hits, self.cache.misses))
+
+    def test_shared_directory(self):
+        ast.parse(SOURCE, cache=self.cache)
+        other = ASTCache(self.tmp.name)
+        self.assertEqual(ast.parse(SOURCE), ast.parse(SOURCE, cache=other))
+        self.assertEqual((1, 0), (other.hits, other.misses))
+
+    def test_corrupted_entry(self):
+        ast.parse(SOURCE, cache=self.cache)
+        path = os.path.join(self.tmp.name, self.entries()[0])
+        with open(path, "wb") as f:
+            f.write(b"not a pickle")
+        self.assertEqual(ast.parse(SOURCE), ast.parse(SOURCE, cache=self.cache))
+        self.assertEqual((0, 2), (self.cache.hits, self.cache.misses))
+
+    def test_eviction(self):
+        sources = ["x%d = %d" % (i, i) for i in range(4)]
+        ast.parse(sources[0], cache=self.cache)
+        entry_size = os.path.getsize(os.path.join(self.tmp.name, self.entries()[0]))
+        self.cache.clear()
+
+        cache = ASTCache(self.tmp.name, max_size=entry_size * 2 + entry_size // 2)
+        for i, source in enumerate(sources[:3]):
+            ast.parse(source, cache=cache)
+            path = os.path.join(self.tmp.name, cache.key(source, fast_lexer=False, comments=True))
+            os.utime(path + ".pickle", ns=(i * 10**9, i * 10**9))
+        self.assertEqual(2, len(self.entries()))
+        # the least recently used one is gone
+        ast.parse(sources[0], cache=cache)
+        self.assertEqual((0, 4), (cache.hits, cache.misses))
+        # a hit makes an entry recent again
+        ast.parse(sources[2], cache=cache)
+        self.assertEqual(1, cache.hits)
+        ast.parse(sources[3], cache=cache)
+        ast.parse(sources[2], cache=cache)
+        self.assertEqual(2, cache.hits)
+
+    def test_size_on_overwrite(self):
+        tree = ast.parse(SOURCE)
+        key = self.cache.key(SOURCE)
+        self.cache.put(key, tree)
+        self.cache.put(key, tree)
+        self.cache.put(key, tree)
+        self.assertEqual(os.path.getsize(os.path.join(self.tmp.name, self.entries()[0])), self.cache._size)
@@ -258,3 +258,27 @@ class CommentsTestCase(tests.TestCase):
         )
         exp = Chunk(Block([], comments=[Comment("-- just a comment")]))
         self.assertEqual(exp, tree)
+
+    def test_parse_without_comments(self):
+        source = textwrap.dedent(
+            """
+            -- rate limit
+            local rate_limit = 192 -- inline
+            local t = {
+              -- field comment
+              a = 1, -- inline field
+              --[[ long ]] b = 2,
+            }
+            function f(a) -- after header
+              -- in body
+              return a
+            end
+            """
+        )
+        tree = ast.parse(source, comments=False)
+        self.assertFalse([n for n in ast.walk(tree) if isinstance(n, Comment)])
+
+        expected = ast.parse(source)
+        for node in ast.walk(expected):
+            node.comments = []
+        self.assertEqual(expected, tree)
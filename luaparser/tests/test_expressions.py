@@ -1,6 +1,7 @@
 from luaparser.utils import tests
 from luaparser import ast
 from luaparser.astnodes import *
+from luaparser.builder import SyntaxException
 import textwrap
 
 
@@ -734,3 +735,31 @@ class ExpressionsTestCase(tests.TestCase):
             )
         )
         self.assertEqual(exp, tree)
+
+    """
+    Syntax errors
+    """
+
+    def test_error_expected_operators(self):
+        # after an operand, every tighter level tried its operators
+        with self.assertRaises(SyntaxException) as context:
+            ast.parse("x = 1 + ")
+        self.assertEqual(
+            "Error: Expecting one of 'false', 'function', 'nil', 'not', 'true', '-', "
+            "'*', '/', '//', '%', '^', '#', '&', '|', '~', '>>', '<<', '(', '{', '[', "
+            "':', ',', '...', '..', '.', NAME, NUMBER, STRING, COMMENT, LINE_COMMENT "
+            "at line 1, column 6",
+            str(context.exception),
+        )
+
+    def test_error_expected_after_relation(self):
+        # relational operators do not chain
+        with self.assertRaises(SyntaxException) as context:
+            ast.parse("x = a == 1 and")
+        self.assertEqual(
+            "Error: Expecting one of 'false', 'function', 'nil', 'not', 'true', '+', "
+            "'-', '*', '/', '//', '%', '^', '#', '&', '|', '~', '>>', '<<', '(', '{', "
+            "'[', ':', ',', '...', '..', '.', NAME, NUMBER, STRING, COMMENT, "
+            "LINE_COMMENT at line 1, column 6",
+            str(context.exception),
+        )
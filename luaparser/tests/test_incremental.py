@@ -0,0 +1,73 @@
+from luaparser.utils import tests
+from luaparser import ast
+from luaparser.astnodes import *
+from luaparser.builder import SyntaxException
+import textwrap
+
+SOURCE = textwrap.dedent(
+    """\
+    -- header
+    local x = 1
+
+    -- f comment
+    function f(a, b)
+      local function g()
+        return a + 1 -- inline
+      end
+      return g() * b
+    end
+
+    t = { f = function() return 2 end }
+    print(x, f(1, 2)) -- last
+    """
+)
+
+
+class IncrementalTestCase(tests.TestCase):
+    def assert_reparse(self, source, old, new, incremental=True, **options):
+        start = source.index(old)
+        stop = start + len(old)
+        tree = ast.parse(source, **options)
+        result = ast.reparse(tree, source, start, stop, new, **options)
+        expected = ast.parse(source[:start] + new + source[stop:], **options)
+        self.assertEqual(incremental, result is tree)
+        self.assertEqual(expected, result)
+        for a, b in zip(ast.walk(expected), ast.walk(result)):
+            self.assertEqual(a.first_position, b.first_position)
+            self.assertEqual(a.last_position, b.last_position)
+            # walk does not yield comments
+            for c, d in zip(a.comments, b.comments):
+                self.assertEqual(c.first_position, d.first_position)
+                self.assertEqual(c.last_position, d.last_position)
+        return result
+
+    def test_nested_function(self):
+        tree = self.assert_reparse(SOURCE, "a + 1", "a +\n  100")
+        self.assertIsInstance(tree.body.body[1].body.body[0], LocalFunction)
+        self.assert_reparse(SOURCE, "a + 1", "a", comments=False)
+        self.assert_reparse(SOURCE, "a + 1", "a + 1 --[[ new ]]")
+
+    def test_top_level_statement(self):
+        self.assert_reparse(SOURCE, "function() return 2", "function(y)\n return y")
+        self.assert_reparse(SOURCE, "x = ", "x = 2 + ")
+        # dialect
+        self.assert_reparse(SOURCE, "return g() * b", "for k, v ; b\n  print(k | tostring)\n end")
+
+    def test_full_parse(self):
+        # between statements
+        self.assert_reparse(SOURCE, "\n\n", "\ny = 2\n", incremental=False)
+        # first character of a statement
+        self.assert_reparse(SOURCE, "local x", "x", incremental=False)
+        # last character of a statement
+        self.assert_reparse(SOURCE, "x = 1", "x = 12", incremental=False)
+        # no longer one statement of the same kind
+        self.assert_reparse(SOURCE, "x = ", "x = 1; y = ", incremental=False)
+        # a comment moving to the next statement
+        self.assert_reparse(SOURCE, "t = { f", "t = -- c\n{ f", incremental=False)
+
+    def test_syntax_error(self):
+        tree = ast.parse(SOURCE)
+        start = SOURCE.index("return g()")
+        self.assertRaises(
+            SyntaxException, ast.reparse, tree, SOURCE, start, start, "end\n"
+        )
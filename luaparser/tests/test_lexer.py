@@ -0,0 +1,115 @@
+from luaparser.utils import tests
+from luaparser import ast
+from luaparser.lexer import FastLuaLexer
+from luaparser.parser.LuaLexer import LuaLexer
+from antlr4 import InputStream, CommonTokenStream
+from antlr4.error.ErrorListener import ErrorListener
+import ast as python_ast
+import glob
+import os
+import textwrap
+
+
+class RecordingErrorListener(ErrorListener):
+    def __init__(self):
+        self.errors = []
+
+    def syntaxError(self, recognizer, offending_symbol, line, column, msg, e):
+        self.errors.append((line, column, msg))
+
+
+def lex(lexer):
+    """Return the token tuples and errors produced by lexer."""
+    listener = RecordingErrorListener()
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(listener)
+    stream = CommonTokenStream(lexer)
+    stream.fill()
+    tokens = [
+        (t.type, t.channel, t.start, t.stop, t.line, t.column, t.text, t.tokenIndex)
+        for t in stream.tokens
+    ]
+    return tokens, listener.errors
+
+
+def suite_sources():
+    """All string literals of the test modules, dedented when they are."""
+    sources = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "test_*.py"))):
+        with open(path) as f:
+            tree = python_ast.parse(f.read())
+        for node in python_ast.walk(tree):
+            if isinstance(node, python_ast.Constant) and isinstance(node.value, str):
+                sources.append(node.value)
+                sources.append(textwrap.dedent(node.value))
+    return sources
+
+
+class LexerTestCase(tests.TestCase):
+    def assert_same_tokens(self, source):
+        self.assertEqual(
+            lex(LuaLexer(InputStream(source))), lex(FastLuaLexer(source)), repr(source)
+        )
+
+    def test_test_suite_sources(self):
+        sources = suite_sources()
+        self.assertGreater(len(sources), 100)
+        for source in sources:
+            self.assert_same_tokens(source)
+
+    def test_dialect_tokens(self):
+        source = "#!/usr/bin/lua\nprint(..x, a.b!.c, d?)\nlocal s = [==[ a ]] ]==] --[[ c ]]\n"
+        self.assert_same_tokens(source)
+        types = [t[0] for t in lex(FastLuaLexer(source))[0]]
+        for ttype in [
+            LuaLexer.SHEBANG,
+            LuaLexer.CONCAT,
+            LuaLexer.REQFIELD,
+            LuaLexer.OPTIONALFIELD,
+            LuaLexer.STRING,
+            LuaLexer.COMMENT,
+        ]:
+            self.assertIn(ttype, types)
+
+    def test_edge_cases(self):
+        for source in [
+            "",
+            "a..b...c.5 1..2 3.e4 0x1p4 0x.5 1e 0x",
+            "--[==[ unterminated\nx = 1",
+            "--[=x\n--\r\n--[\n[[ a ]] [=[ b ]=]",
+            "a = 'unterminated\nb = \"bad \\q escape\" c = '\\u{12' \"\\x1\"",
+            "a @ b $ c \\ d \v e é",
+            "a\r\rb\f\n c \t",
+            "x = '",
+        ]:
+            self.assert_same_tokens(source)
+
+    def test_errors(self):
+        listener = RecordingErrorListener()
+        lexer = FastLuaLexer("a = $b\nc = 'd")
+        lexer.removeErrorListeners()
+        lexer.addErrorListener(listener)
+        lexer.getAllTokens()
+        self.assertEqual(
+            [
+                (1, 4, "token recognition error at: '$'"),
+                (2, 4, "token recognition error at: ''d'"),
+            ],
+            listener.errors,
+        )
+
+    def test_parse_fast_lexer(self):
+        source = textwrap.dedent(
+            """
+            -- comment
+            local function f(a, ...)
+              return a.b!.c .. [[long]], #t, d?
+            end
+            print(..x, f | y)
+            """
+        )
+        self.assertEqual(ast.parse(source), ast.parse(source, fast_lexer=True))
+        self.assertEqual(
+            ast.to_lua_source(ast.parse(source)),
+            ast.to_lua_source(ast.parse(source, fast_lexer=True)),
+        )
@@ -1,6 +1,8 @@
 import textwrap
+import io
 
 from luaparser import ast
+from luaparser.astnodes import Call, Name, Number, Return
 from luaparser.utils import tests
 
 
@@ -140,3 +142,167 @@ class LuaOutputTestCase(tests.TestCase):
     def test_parenthesis(self):
         source = "a = (1 * 2) + 3"
         self.assertEqual(source, ast.to_lua_source(ast.parse(source)))
+
+    def test_stream(self):
+        source = textwrap.dedent(
+            """\
+            local t = {
+                a = function()
+                    return [[
+            x
+              ]]
+                end,
+            }"""
+        )
+        tree = ast.parse(source)
+        out = io.StringIO()
+        self.assertIsNone(ast.to_lua_source(tree, out=out))
+        self.assertEqual(ast.to_lua_source(tree), out.getvalue())
+
+    def test_node_subclass(self):
+        class Macro(Name):
+            pass
+
+        tree = Call(Macro("f"), [Name("a")])
+        self.assertEqual("f(a)", ast.to_lua_source(tree))
+
+    def test_minimal_diff(self):
+        source = textwrap.dedent(
+            """\
+            -- header
+            local x = 1 -- kept
+
+            function f(a, b)
+              -- inside
+              if a > b
+                print(a)
+              end
+              for k, v ; t do
+                print(k)
+              end
+              return a | tostring
+            end
+
+            local t = { ..x, y = 2 }
+            """
+        )
+        tree = ast.parse(source)
+        rewritten = ast.to_lua_source(tree, source=source)
+        self.assertEqual(
+            textwrap.dedent(
+                """\
+                -- header
+                local x = 1 -- kept
+
+                function f(a, b)
+                  -- inside
+                  if a > b then
+                    print(a)
+                  end
+                  for k, v in pairs(t) do
+                    print(k)
+                  end
+                  return a(tostring)
+                end
+
+                local t = {
+                    x = x,
+                    y = 2,
+                }
+                """
+            ),
+            rewritten,
+        )
+        self.assertEqual(
+            ast.to_lua_source(tree), ast.to_lua_source(ast.parse(rewritten))
+        )
+
+        out = io.StringIO()
+        self.assertIsNone(ast.to_lua_source(tree, out=out, source=source))
+        self.assertEqual(rewritten, out.getvalue())
+
+    def test_minimal_diff_dialect_header(self):
+        # only the header is printed, the body keeps its text and comments
+        for source, expected in [
+            (
+                "for k, v ; t\n  print(k, v) -- inline comment\n    y = 1\nend\n",
+                "for k, v in pairs(t) do\n  print(k, v) -- inline comment\n    y = 1\nend\n",
+            ),
+            (
+                "if a\n  -- note\n  b()   -- trailing\nend\n",
+                "if a then\n  -- note\n  b()   -- trailing\nend\n",
+            ),
+            (
+                "if a -- a\n  b() -- b\nelseif c then\n  d()\nelse -- else\n  e() -- e\nend\n",
+                "if a then -- a\n  b() -- b\nelseif c then\n  d()\nelse -- else\n  e() -- e\nend\n",
+            ),
+            (
+                "  for i = 1, #t -- each\n    for k ; t[i] do\n      f(k) --f\n    end\n  end\n",
+                "  for i = 1, #t do -- each\n    for k in pairs(t[i]) do\n      f(k) --f\n    end\n  end\n",
+            ),
+        ]:
+            self.assertEqual(expected, ast.to_lua_source(ast.parse(source), source=source))
+
+    def test_minimal_diff_unchanged(self):
+        source = textwrap.dedent(
+            """\
+            local t = {
+                a = function()
+                    return [[
+            x
+              ]] --[[ comment ]]
+                end,
+            }
+            """
+        )
+        tree = ast.parse(source)
+        self.assertEqual(source, ast.to_lua_source(tree, source=source))
+        self.assertEqual(source, ast.to_lua_source(tree, source=source, original=tree))
+
+    def test_minimal_diff_new_statement(self):
+        source = "local a = 1\nfunction f()\n  g()\nend\n"
+        tree = ast.parse(source)
+        tree.body.body[1].body.body.append(Return([Number(2)]))
+        self.assertEqual(
+            "local a = 1\nfunction f()\n    g()\n    return 2\nend\n",
+            ast.to_lua_source(tree, source=source),
+        )
+        tree.body.body.append(Return([Name("a")]))
+        self.assertEqual(ast.to_lua_source(tree), ast.to_lua_source(tree, source=source))
+
+    def test_minimal_diff_changed_in_place(self):
+        # nodes changed after parsing keep their positions
+        source = "local a = 1 -- one\nfunction f()\n  g(a)\n  h()\nend\n"
+        tree = ast.parse(source)
+        tree.body.body[0].values[0].n = 2
+        tree.body.body[1].body.body[0].args[0] = Name("b")
+        self.assertEqual(
+            "local a = 2 -- one\nfunction f()\n  g(b)\n  h()\nend\n",
+            ast.to_lua_source(tree, source=source),
+        )
+
+        tree = ast.parse(source)
+        tree.body.body[1].name.id = "k"
+        self.assertEqual(
+            "local a = 1 -- one\nfunction k()\n    g(a)\n    h()\nend\n",
+            ast.to_lua_source(tree, source=source),
+        )
+
+    def test_minimal_diff_removed_statement(self):
+        source = "local a = 1\nfunction f()\n  g()\n  h()\nend\n"
+        tree = ast.parse(source)
+        del tree.body.body[1].body.body[0]
+        self.assertEqual(
+            "local a = 1\nfunction f()\n    h()\nend\n", ast.to_lua_source(tree, source=source)
+        )
+
+        tree = ast.parse(source)
+        tree.body.body[1].body.body.reverse()
+        self.assertEqual(
+            "local a = 1\nfunction f()\n    h()\n    g()\nend\n",
+            ast.to_lua_source(tree, source=source),
+        )
+
+        tree = ast.parse(source)
+        del tree.body.body[0]
+        self.assertEqual(ast.to_lua_source(tree), ast.to_lua_source(tree, source=source))
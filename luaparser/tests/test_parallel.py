@@ -0,0 +1,73 @@
+from luaparser.utils import tests
+from luaparser import ast, parallel
+from luaparser.astnodes import *
+from luaparser.builder import SyntaxException
+import textwrap
+
+SOURCE = textwrap.dedent(
+    """\
+    -- header
+    local x = 1
+    function f(a)
+      for k, v ; a
+        print(k | tostring)
+      end
+      return a
+    end
+    t = { f = function() return 2 end }
+
+    -- not cut before a comment
+    g = x
+    while x < 3 do x = x + 1 end
+    repeat x = x - 1 until x <= 0
+    print(x, f(1)) -- last
+    """
+)
+
+
+class ParallelTestCase(tests.TestCase):
+    def assert_same_tree(self, source, **options):
+        expected = ast.parse(source)
+        result = parallel.parse(source, **options)
+        self.assertEqual(expected, result)
+        self.assertEqual(len(list(ast.walk(expected))), len(list(ast.walk(result))))
+        for a, b in zip(ast.walk(expected), ast.walk(result)):
+            self.assertEqual(a.first_position, b.first_position)
+            self.assertEqual(a.last_position, b.last_position)
+
+    def test_split(self):
+        starts = [p.start for p in parallel.split(SOURCE, chunk_lines=1)]
+        self.assertEqual(
+            [
+                0,
+                SOURCE.index("\nfunction f"),
+                SOURCE.index("\nt = {"),
+                SOURCE.index("\nwhile"),
+                SOURCE.index("\nrepeat"),
+                SOURCE.index("\nprint(x"),
+            ],
+            starts,
+        )
+        part = parallel.split(SOURCE, chunk_lines=1)[2]
+        self.assertEqual((8, 3, 48), (part.line, part.column, part.token_index))
+        self.assertEqual(1, len(parallel.split(SOURCE)))
+
+    def test_split_labels(self):
+        source = "x = 1\n::a::\ny = 2\n::b:: goto a\n"
+        starts = [p.start for p in parallel.split(source, chunk_lines=1)]
+        self.assertEqual([0, source.index("\n::a::"), source.index("\n::b::")], starts)
+        self.assert_same_tree(source, jobs=1, chunk_lines=1)
+
+    def test_split_whole(self):
+        # blocks not closed, invalid characters
+        for source in ["a = 1\nb = 2\nif a then\n", "a = 1\nb = 2\nend", "a = 1\nb = 2 $\n"]:
+            self.assertEqual([parallel.Part(0, 1, 0, 0)], parallel.split(source, chunk_lines=1))
+
+    def test_parse(self):
+        self.assert_same_tree(SOURCE, jobs=1, chunk_lines=1)
+        self.assert_same_tree(SOURCE, jobs=2, chunk_lines=4)
+
+    def test_syntax_error(self):
+        self.assertRaises(
+            SyntaxException, parallel.parse, SOURCE + "x = = 1\n", jobs=1, chunk_lines=1
+        )
@@ -0,0 +1,76 @@
+from luaparser.utils import tests
+from luaparser.lexer import FastLuaLexer
+from luaparser.parser.LuaLexer import LuaLexer
+from luaparser.stream import ArrayTokenStream
+from luaparser.tests.test_lexer import suite_sources
+from antlr4 import CommonTokenStream, InputStream
+from antlr4.error.Errors import IllegalStateException
+import textwrap
+
+
+def token_ids(tokens):
+    if tokens is None:
+        return None
+    return [t.tokenIndex for t in tokens]
+
+
+def token_id(token):
+    return None if token is None else token.tokenIndex
+
+
+class ArrayTokenStreamTestCase(tests.TestCase):
+    def assert_same_stream(self, source):
+        expected = CommonTokenStream(FastLuaLexer(source))
+        expected.fill()
+        stream = ArrayTokenStream(FastLuaLexer(source))
+        self.assertEqual([str(t) for t in expected.tokens], [str(t) for t in stream.tokens])
+
+        for i in range(len(stream.tokens)):
+            expected.seek(i)
+            stream.seek(i)
+            self.assertEqual(expected.index, stream.index)
+            for k in (-2, -1, 1, 2, 3):
+                self.assertEqual(token_id(expected.LT(k)), token_id(stream.LT(k)))
+            index = stream.index
+            self.assertEqual(
+                token_ids(expected.getHiddenTokensToLeft(index)),
+                token_ids(stream.getHiddenTokensToLeft(index)),
+            )
+            self.assertEqual(
+                token_ids(expected.getHiddenTokensToRight(index)),
+                token_ids(stream.getHiddenTokensToRight(index)),
+            )
+
+    def test_same_as_common_token_stream(self):
+        for source in suite_sources():
+            self.assert_same_stream(source)
+
+    def test_consume(self):
+        source = textwrap.dedent(
+            """
+            -- comment
+            local a = 1 -- inline
+            """
+        )
+        stream = ArrayTokenStream(FastLuaLexer(source))
+        texts = []
+        while stream.LA(1) != -1:
+            texts.append(stream.LT(1).text)
+            self.assertEqual(stream.texts[stream.index], stream.LT(1).text)
+            stream.consume()
+        self.assertEqual(["local", "a", "=", "1"], texts)
+        self.assertEqual("-- inline", stream.getHiddenTokensToRight(stream.prev_default[stream.index])[1].text)
+        self.assertRaises(IllegalStateException, stream.consume)
+
+    def test_offset(self):
+        source = "x = 1\nlocal a = 'b'\n"
+        part = source.index("= 1")
+        for lexer in (FastLuaLexer, lambda text: LuaLexer(InputStream(text))):
+            whole = ArrayTokenStream(lexer(source))
+            stream = ArrayTokenStream(lexer(source[part:]), (part, 1, part, 2))
+            self.assertEqual(whole.texts[2:], stream.texts)
+            self.assertEqual(whole.starts[2:], stream.starts)
+            self.assertEqual(whole.stops[2:], stream.stops)
+            self.assertEqual(whole.lines[2:], stream.lines)
+            self.assertEqual(whole.columns[2:], stream.columns)
+            self.assertEqual(token_ids(whole.tokens[2:]), token_ids(stream.tokens))
@@ -20,24 +20,36 @@ def _declaring_class(obj):
 # Stores the actual visitor methods
 _methods = {}
 
+# Resolved visitor methods, by (visitor class, argument class)
+_dispatch = {}
+
+
+def _resolve(visitor_class, arg_class):
+    """Find the visitor method of visitor_class for arg_class, or None."""
+    name = _qualname(visitor_class)
+    if (name, arg_class) in _methods:
+        return _methods[(name, arg_class)]
+    # if no visitor method found for this arg type,
+    # search in parent arg type:
+    arg_parent_type = arg_class.__bases__[0]
+    while arg_parent_type != object:
+        if (name, arg_parent_type) in _methods:
+            return _methods[(name, arg_parent_type)]
+        arg_parent_type = arg_parent_type.__bases__[0]
+    return None
+
 
 # Delegating visitor implementation
 def _visitor_impl(self, arg):
     """Actual visitor method implementation."""
-    if (_qualname(type(self)), type(arg)) in _methods:
-        method = _methods[(_qualname(type(self)), type(arg))]
-        return method(self, arg)
-    else:
-        # if no visitor method found for this arg type,
-        # search in parent arg type:
-        arg_parent_type = arg.__class__.__bases__[0]
-        while arg_parent_type != object:
-            if (_qualname(type(self)), arg_parent_type) in _methods:
-                method = _methods[(_qualname(type(self)), arg_parent_type)]
-                return method(self, arg)
-            else:
-                arg_parent_type = arg_parent_type.__bases__[0]
-    raise VisitorException("No visitor found for class " + str(type(arg)))
+    try:
+        method = _dispatch[type(self), type(arg)]
+    except KeyError:
+        method = _resolve(type(self), type(arg))
+        if method is None:
+            raise VisitorException("No visitor found for class " + str(type(arg)))
+        _dispatch[type(self), type(arg)] = method
+    return method(self, arg)
 
 
 # The actual @visitor decorator
@@ -47,6 +59,8 @@ def visitor(arg_type):
     def decorator(fn):
         declaring_class = _declaring_class(fn)
         _methods[(declaring_class, arg_type)] = fn
+        # a resolved method may now be shadowed
+        _dispatch.clear()
 
         # Replace all decorated methods with _visitor_impl
         return _visitor_impl
@@ -1,10 +1,12 @@
 import logging
 import os
-import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from optparse import OptionParser
+from typing import Iterator, Optional, Tuple
 
+import luaparser
 from luaparser import ast
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+from rebuild import Manifest, clean_directory
 
 # Specify your source and target directories here
 source_directory = "/home/fred/tmp/Stars in Shadow/Lua state"
@@ -13,57 +15,176 @@ target_directory = "/home/fred/tmp/LuaState/"
 # source_directory = "/home/fred/tmp/Mods/Source"
 # target_directory = "/home/fred/tmp/Mods/Target"
 
-# Create the target directory if it does not exist
-os.makedirs(target_directory, exist_ok=True)
+# Bump whenever the printed Lua changes. Outputs built by another converter
+# version, or from another revision of the trees, are rebuilt from scratch
+CONVERTER_REVISION = 1
+CONVERTER_VERSION = f"lua-source-{CONVERTER_REVISION}.{luaparser.TREE_REVISION}"
+MINIMAL_CONVERTER_VERSION = f"lua-minimal-{CONVERTER_REVISION}.{luaparser.TREE_REVISION}"
+
+
+def iter_lua_files(source_directory: str, target_directory: str) -> Iterator[Tuple[str, str]]:
+    """Yield (source, target) path pairs for every .lua file of the source tree."""
+    for dirpath, dirnames, filenames in os.walk(source_directory):
+        for filename in filenames:
+            if filename.endswith('.lua'):
+                source_filepath = os.path.join(dirpath, filename)
+
+                # Create the equivalent path in the target directory
+                target_dirpath = dirpath.replace(source_directory, target_directory)
+                os.makedirs(target_dirpath, exist_ok=True)
+                target_filepath = os.path.join(target_dirpath, filename)
+                yield source_filepath, target_filepath
+
+
+def convert_file(source_filepath: str, target_filepath: str, minimal: bool = False) -> bool:
+    """Parse one .lua file and write it back as plain Lua.
 
+    With minimal, only the statements using the dialect are printed, the
+    rest of the source is copied as is. Returns False, without writing
+    the target, when the file cannot be parsed or printed.
 
-def clean_directory(target_directory):
-    for filename in os.listdir(target_directory):
-        file_path = os.path.join(target_directory, filename)
-        try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
-                os.unlink(file_path)
-            elif os.path.isdir(file_path):
-                shutil.rmtree(file_path)
-        except Exception as e:
-            print(f'Failed to delete {file_path}. Reason: {e}')
+    Runs either in-process or in a pool worker, so it must stay a
+    module level function.
+    """
+    # Open each .lua file and read its content
+    logging.info('Processing %s', source_filepath)
+    logging.info('Writing to %s', target_filepath)
+    with open(source_filepath, 'r', encoding='ISO-8859-1') as f:
+        lines = f.read()
 
+    # written next to the target and renamed once complete, so a failure
+    # never leaves a truncated target
+    temp_filepath = target_filepath + '.tmp'
+    try:
+        tree = ast.parse(lines)
+        with open(temp_filepath, 'w') as f:
+            ast.to_lua_source(tree, out=f, source=lines if minimal else None, original=tree)
+        os.replace(temp_filepath, target_filepath)
+    except Exception:
+        if os.path.exists(temp_filepath):
+            os.unlink(temp_filepath)
+        return False
+    return True
 
-clean_directory(target_directory)
 
-total_files = 0
-total_errors = 0
-total_fixed = 0
+def convert_directory(
+        source_directory: str,
+        target_directory: str,
+        jobs: int = 1,
+        manifest: Optional[Manifest] = None,
+        minimal: bool = False,
+) -> Tuple[int, int, int]:
+    """Convert every .lua file of source_directory into target_directory.
 
-for dirpath, dirnames, filenames in os.walk(source_directory):
-    for filename in filenames:
-        if filename.endswith('.lua'):
+    With jobs > 1 files are fanned out to a process pool and results are
+    collected as soon as each file is done. When a manifest is given, files
+    it reports as up to date are skipped and outputs of vanished sources
+    are deleted. minimal is passed to convert_file.
+
+    Returns:
+        A (total_files, total_errors, total_fixed) tuple.
+    """
+    total_files = 0
+    total_errors = 0
+    total_fixed = 0
+
+    pending = []
+    for source, target in iter_lua_files(source_directory, target_directory):
+        if manifest is not None and manifest.is_up_to_date(source, target):
             total_files += 1
-            source_filepath = os.path.join(dirpath, filename)
-
-            # Create the equivalent path in the target directory
-            target_dirpath = dirpath.replace(source_directory, target_directory)
-            os.makedirs(target_dirpath, exist_ok=True)
-            target_filepath = os.path.join(target_dirpath, filename)
-
-            # Open each .lua file and read its content
-            logging.info('Processing %s', source_filepath)
-            logging.info('Writing to %s', target_filepath)
-            with open(source_filepath, 'r', encoding='ISO-8859-1') as f:
-                lines = f.read()
-
-            try:
-                tree = ast.parse(lines)
-                fixed_lines = ast.to_lua_source(tree)
-                with open(target_filepath, 'w') as f:
-                    f.write(fixed_lines)
+            if manifest.is_ok(source):
                 total_fixed += 1
-            except:
+            else:
                 total_errors += 1
-                logging.info('Error parsing file', source_filepath)
-                continue
+        else:
+            pending.append((source, target))
+
+    if jobs <= 1:
+        results = ((source, target, convert_file(source, target, minimal)) for source, target in pending)
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        futures = {executor.submit(convert_file, source, target, minimal): (source, target) for source, target in pending}
+        results = (futures[future] + (future.result(),) for future in as_completed(futures))
+
+    try:
+        for source, target, fixed in results:
+            total_files += 1
+            if fixed:
+                total_fixed += 1
+            else:
+                # reported here, pool workers log in their own process
+                logging.info('Error parsing file %s', source)
+                total_errors += 1
+            if manifest is not None:
+                # a clean rebuild would not have this output either
+                if not fixed and os.path.isfile(target):
+                    os.unlink(target)
+                manifest.record(source, target, fixed)
+    finally:
+        if jobs > 1:
+            executor.shutdown()
+
+    if manifest is not None:
+        for target in manifest.remove_stale():
+            logging.info('Removed %s', target)
+        manifest.save()
+
+    return total_files, total_errors, total_fixed
+
+
+def main():
+    parser = OptionParser(usage="usage: %prog [options] [source_directory target_directory]")
+    parser.add_option(
+        "-j",
+        "--jobs",
+        metavar="N",
+        type="int",
+        dest="jobs",
+        help="number of worker processes (default: %default)",
+        default=1,
+    )
+    parser.add_option(
+        "--full",
+        action="store_true",
+        dest="full",
+        help="ignore the build manifest and rebuild every file",
+        default=False,
+    )
+    parser.add_option(
+        "--minimal-diff",
+        action="store_true",
+        dest="minimal",
+        help="only rewrite the statements using the dialect, keep the rest of the source",
+        default=False,
+    )
+    (options, args) = parser.parse_args()
+
+    source, target = source_directory, target_directory
+    if args:
+        if len(args) != 2:
+            parser.error("expected a source and a target directory")
+        source, target = args
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    # Create the target directory if it does not exist
+    os.makedirs(target, exist_ok=True)
+    version = MINIMAL_CONVERTER_VERSION if options.minimal else CONVERTER_VERSION
+    manifest = Manifest.load(target, version)
+    if options.full or not manifest.entries:
+        clean_directory(target)
+        manifest = Manifest(target, version)
+
+    total_files, total_errors, total_fixed = convert_directory(
+        source, target, options.jobs, manifest, options.minimal
+    )
+
+    logging.info('Total files: %d', total_files)
+    logging.info('Total errors: %d', total_errors)
+    logging.info('Total fixed: %d', total_fixed)
+    if total_files:
+        logging.info('Percent fixed: %d', total_fixed / total_files * 100)
+
 
-logging.info('Total files: %d', total_files)
-logging.info('Total errors: %d', total_errors)
-logging.info('Total fixed: %d', total_fixed)
-logging.info('Percent fixed: %d', total_fixed / total_files * 100)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
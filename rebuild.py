@@ -0,0 +1,130 @@
+"""
+    ``rebuild`` module
+    ==================
+
+    Incremental rebuild support shared by main.py and lua_patcher.py.
+
+    A manifest stored next to the output records, for every source file,
+    its size, mtime, content hash and the converter version that produced
+    the target file, so a re-run only has to convert new or changed files.
+"""
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, List
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def clean_directory(target_directory):
+    for filename in os.listdir(target_directory):
+        file_path = os.path.join(target_directory, filename)
+        try:
+            if os.path.isfile(file_path) or os.path.islink(file_path):
+                os.unlink(file_path)
+            elif os.path.isdir(file_path):
+                shutil.rmtree(file_path)
+        except Exception as e:
+            print(f'Failed to delete {file_path}. Reason: {e}')
+
+
+def file_hash(path: str) -> str:
+    """Return the sha256 hex digest of a file content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Build manifest of a target directory.
+
+    Entries are keyed by source path and hold the target path, size,
+    mtime (ns), sha256 and whether the conversion succeeded.
+    """
+
+    def __init__(self, target_directory: str, converter_version: str):
+        self.path: str = os.path.join(target_directory, MANIFEST_NAME)
+        self.converter_version: str = converter_version
+        self.entries: Dict[str, dict] = {}
+        self._seen = set()
+
+    @classmethod
+    def load(cls, target_directory: str, converter_version: str) -> "Manifest":
+        """Load the manifest of target_directory.
+
+        A missing, unreadable or outdated (other converter version)
+        manifest gives an empty one, which means a full rebuild.
+        """
+        manifest = cls(target_directory, converter_version)
+        try:
+            with open(manifest.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('converter_version') == converter_version:
+            manifest.entries = data.get('files', {})
+        return manifest
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(
+                {'converter_version': self.converter_version, 'files': self.entries},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+
+    def is_up_to_date(self, source_filepath: str, target_filepath: str) -> bool:
+        """Check if target_filepath is still valid for source_filepath.
+
+        The content hash is only computed when size or mtime changed.
+        """
+        self._seen.add(source_filepath)
+        entry = self.entries.get(source_filepath)
+        if entry is None or entry['target'] != target_filepath:
+            return False
+        if entry['ok'] and not os.path.exists(target_filepath):
+            return False
+
+        stat = os.stat(source_filepath)
+        if entry['size'] != stat.st_size:
+            return False
+        if entry['mtime'] == stat.st_mtime_ns:
+            return True
+        # touched but maybe not modified
+        if entry['sha256'] != file_hash(source_filepath):
+            return False
+        entry['mtime'] = stat.st_mtime_ns
+        return True
+
+    def is_ok(self, source_filepath: str) -> bool:
+        """True if the last conversion of source_filepath succeeded."""
+        return self.entries[source_filepath]['ok']
+
+    def record(self, source_filepath: str, target_filepath: str, ok: bool):
+        self._seen.add(source_filepath)
+        stat = os.stat(source_filepath)
+        self.entries[source_filepath] = {
+            'target': target_filepath,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'sha256': file_hash(source_filepath),
+            'ok': ok,
+        }
+
+    def remove_stale(self) -> List[str]:
+        """Forget sources not seen during this run and delete their output.
+
+        Returns:
+            The list of deleted target paths.
+        """
+        removed = []
+        for source_filepath in set(self.entries) - self._seen:
+            target_filepath = self.entries.pop(source_filepath)['target']
+            if os.path.isfile(target_filepath):
+                os.unlink(target_filepath)
+                removed.append(target_filepath)
+        return removed
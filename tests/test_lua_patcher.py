@@ -0,0 +1,246 @@
+from luaparser.utils import tests
+from lua_patcher import LinePatcher, Patcher, TokenPatcher, rules
+import itertools
+import re
+import textwrap
+
+
+class TokenPatcherTestCase(tests.TestCase):
+    def assert_patched(self, expected, source, **hits):
+        patcher = TokenPatcher()
+        self.assertEqual(textwrap.dedent(expected), patcher.patch(textwrap.dedent(source)))
+        self.assertEqual(hits, {name: count for name, count in patcher.hits.items() if count})
+
+    def test_abstract(self):
+        self.assertRaises(TypeError, Patcher)
+
+    def test_if_then(self):
+        self.assert_patched(
+            """
+            if a == 1 then
+              b()
+            end
+            """,
+            """
+            if a == 1
+              b()
+            end
+            """,
+            **{"if-then": 1}
+        )
+
+    def test_if_then_multiline(self):
+        self.assert_patched(
+            """
+            if a and
+               f(b,
+                 c) then
+              d()
+            end
+            """,
+            """
+            if a and
+               f(b,
+                 c)
+              d()
+            end
+            """,
+            **{"if-then": 1}
+        )
+
+    def test_if_then_kept(self):
+        self.assert_patched("if a then b() end\n", "if a then b() end\n")
+
+    def test_elseif_then(self):
+        self.assert_patched(
+            """
+            if a then
+              b()
+            elseif c.d then
+              e()
+            end
+            """,
+            """
+            if a then
+              b()
+            elseif c.d
+              e()
+            end
+            """,
+            **{"elseif-then": 1}
+        )
+
+    def test_for_semicolon(self):
+        self.assert_patched(
+            """
+            for k, v in pairs(t.items) do
+              f(k, v)
+            end
+            """,
+            """
+            for k, v ; t.items
+              f(k, v)
+            end
+            """,
+            **{"for-semicolon-pairs": 1, "for-do": 1}
+        )
+
+    def test_for_semicolon_do(self):
+        self.assert_patched(
+            "for k in pairs(t) do f(k) end\n",
+            "for k ; t do f(k) end\n",
+            **{"for-semicolon-pairs": 1}
+        )
+
+    def test_for_do(self):
+        self.assert_patched(
+            """
+            for i = 1, #t do
+              f(i)
+            end
+            for _, v in ipairs(t) do
+              f(v)
+            end
+            for i = 1, 10 do f(i) end
+            """,
+            """
+            for i = 1, #t
+              f(i)
+            end
+            for _, v in ipairs(t)
+              f(v)
+            end
+            for i = 1, 10 do f(i) end
+            """,
+            **{"for-do": 2}
+        )
+
+    def test_plus_assign(self):
+        self.assert_patched(
+            """
+            a = a + b
+            t[k].n = t[k].n + b * 2
+            """,
+            """
+            a += b
+            t[k].n += b * 2
+            """,
+            **{"plus-assign": 2}
+        )
+
+    def test_plus_assign_precedence(self):
+        self.assert_patched(
+            """
+            a = a + (b or c)
+            a = a + (b - c)
+            a = a + (f(b) .. c)
+            """,
+            """
+            a += b or c
+            a += b - c
+            a += f(b) .. c
+            """,
+            **{"plus-assign": 3}
+        )
+
+    def test_strings_and_comments(self):
+        source = """
+            s = 'if a' .. "for k ; t" -- for i = 1, 2
+            x = [[a += b]]
+            --[[ if b
+              c()
+            ]]
+            """
+        self.assert_patched(source, source)
+
+    def test_function_in_condition(self):
+        # the "do" of the nested block does not belong to the for
+        self.assert_patched(
+            """
+            if x == function()
+              for _, v in pairs(t) do
+                local a = v
+                do g(a) end
+              end
+            end then
+              y()
+            end
+            """,
+            """
+            if x == function()
+              for _, v in pairs(t)
+                local a = v
+                do g(a) end
+              end
+            end
+              y()
+            end
+            """,
+            **{"if-then": 1, "for-do": 1}
+        )
+
+
+def fix_line_by_rule(line):
+    """The original loop: every rule is searched in the line, the last
+    matching one gives the patched line."""
+    fixed, name = line, None
+    for rule in rules:
+        match = re.search(rule.pattern, line)
+        if match:
+            fixed, name = rule.fix(line, match), rule.name
+    return fixed, name
+
+
+class LinePatcherTestCase(tests.TestCase):
+    LINES = [
+        "local a = 1\n",
+        "if a == 1\n",
+        "if a then\n",
+        "elseif b\n",
+        "elseif b then\n",
+        "for k, v in pairs(t)\n",
+        "for k, v in pairs(t) do\n",
+        "for k, v ; t\n",
+        "a += 1\n",
+        "t[k] += b[1]\n",
+        # several rules match
+        "if a += 1\n",
+        "for k ; t in a\n",
+        "for i in x if y\n",
+        "elseif a += b\n",
+        "for k ; t a += 1\n",
+        # keywords without a match
+        "print('if then', 'for do')\n",
+        "a +=\n",
+        "modifier = f(x)\n",
+        "for\n",
+        "",
+        "if a",
+    ]
+
+    def test_same_as_each_rule(self):
+        fragments = ["if a", "elseif b", "for k in t", "for k ; t", "x += 1", "then", "do", "y"]
+        lines = list(self.LINES)
+        for n in (2, 3):
+            for combination in itertools.permutations(fragments, n):
+                lines.append(" ".join(combination) + "\n")
+
+        patcher = LinePatcher(rules)
+        expected_hits = {rule.name: 0 for rule in rules}
+        for line in lines:
+            fixed, name = fix_line_by_rule(line)
+            self.assertEqual(fixed, patcher.fix_line(line), line)
+            if name is not None:
+                expected_hits[name] += 1
+        self.assertEqual(expected_hits, dict(patcher.hits))
+
+    def test_patch(self):
+        source = "".join(self.LINES[:-1])
+        expected = "".join(fix_line_by_rule(line)[0] for line in self.LINES[:-1])
+        self.assertEqual(expected, LinePatcher(rules).patch(source))
+
+    def test_without_keywords(self):
+        # no prefilter when a rule has no keywords
+        patcher = LinePatcher([rule._replace(keywords=()) for rule in rules])
+        for line in self.LINES:
+            self.assertEqual(fix_line_by_rule(line)[0], patcher.fix_line(line), line)
@@ -0,0 +1,117 @@
+from luaparser.utils import tests
+from rebuild import MANIFEST_NAME, Manifest
+from unittest import mock
+import main
+import os
+import tempfile
+
+VALID = "local a = 1\n"
+
+
+class MainTestCase(tests.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.source = os.path.join(self._directory.name, "source")
+        self.target = os.path.join(self._directory.name, "target")
+        os.makedirs(self.source)
+        self.write(os.path.join(self.source, "a.lua"), VALID)
+
+    @staticmethod
+    def write(path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    @staticmethod
+    def read(path):
+        with open(path) as f:
+            return f.read()
+
+    def run_main(self, *options):
+        with mock.patch("sys.argv", ["main.py", *options, self.source, self.target]):
+            main.main()
+
+    def test_incremental(self):
+        self.run_main()
+        output = os.path.join(self.target, "a.lua")
+        self.write(output, "-- edited\n")
+        self.run_main()
+        # up to date, not converted again
+        self.assertEqual("-- edited\n", self.read(output))
+
+    def test_full(self):
+        self.run_main()
+        output = os.path.join(self.target, "a.lua")
+        converted = self.read(output)
+        self.write(output, "-- edited\n")
+        self.write(os.path.join(self.target, "other.txt"), "")
+        self.run_main("--full")
+        self.assertEqual(converted, self.read(output))
+        self.assertEqual([MANIFEST_NAME, "a.lua"], sorted(os.listdir(self.target)))
+
+    def convert(self, target, jobs, manifest=None):
+        with self.assertLogs(level="INFO") as logs:
+            totals = main.convert_directory(self.source, target, jobs, manifest)
+        errors = sorted(line for line in logs.output if "Error parsing file" in line)
+        return totals, errors
+
+    def tree(self, directory):
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, directory)] = f.read()
+        return files
+
+    def test_convert_directory_jobs(self):
+        os.makedirs(os.path.join(self.source, "sub"))
+        self.write(os.path.join(self.source, "sub", "b.lua"), "push | a\nfor k, v ; t\n  f(k)\nend\n")
+        self.write(os.path.join(self.source, "bad.lua"), "x = = 1\n")
+        self.write(os.path.join(self.source, "sub", "bad.lua"), "if a then\n")
+        self.write(os.path.join(self.source, "notes.txt"), "")
+
+        serial = os.path.join(self._directory.name, "serial")
+        pooled = os.path.join(self._directory.name, "pooled")
+        totals, errors = self.convert(serial, 1)
+        self.assertEqual((4, 2, 2), totals)
+        self.assertEqual(2, len(errors))
+        self.assertEqual((totals, errors), self.convert(pooled, 2))
+        self.assertEqual(["a.lua", os.path.join("sub", "b.lua")], sorted(self.tree(serial)))
+        self.assertEqual(self.tree(serial), self.tree(pooled))
+
+        # with a manifest, failures are recorded
+        manifest = Manifest(pooled, main.CONVERTER_VERSION)
+        self.assertEqual(totals, self.convert(pooled, 2, manifest)[0])
+        self.assertFalse(manifest.is_ok(os.path.join(self.source, "bad.lua")))
+        self.assertEqual(self.tree(serial), {
+            name: data for name, data in self.tree(pooled).items() if name != MANIFEST_NAME
+        })
+
+    def test_convert_file_failure(self):
+        source = os.path.join(self.source, "a.lua")
+        target = os.path.join(self._directory.name, "a.lua")
+        self.write(target, "-- previous\n")
+
+        def fail(tree, out, **options):
+            out.write("local")
+            raise RuntimeError("printer")
+
+        with mock.patch.object(main.ast, "to_lua_source", fail):
+            self.assertFalse(main.convert_file(source, target))
+        self.assertEqual("-- previous\n", self.read(target))
+        self.assertFalse(os.path.exists(target + ".tmp"))
+
+        self.assertTrue(main.convert_file(source, target))
+        self.assertEqual(main.ast.to_lua_source(main.ast.parse(VALID)), self.read(target))
+        self.assertFalse(os.path.exists(target + ".tmp"))
+
+    def test_converter_version(self):
+        self.run_main()
+        self.assertTrue(Manifest.load(self.target, main.CONVERTER_VERSION).entries)
+        output = os.path.join(self.target, "a.lua")
+        converted = self.read(output)
+        self.write(output, "-- edited\n")
+        with mock.patch.object(main, "CONVERTER_VERSION", main.CONVERTER_VERSION + "-next"):
+            self.run_main()
+        self.assertEqual(converted, self.read(output))
@@ -0,0 +1,93 @@
+from luaparser.utils import tests
+from rebuild import MANIFEST_NAME, Manifest
+import os
+import tempfile
+
+
+class ManifestTestCase(tests.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.source = os.path.join(self._directory.name, "a.lua")
+        self.target = os.path.join(self._directory.name, "a.out.lua")
+        self.write(self.source, "local a = 1\n")
+        self.write(self.target, "local a = 1\n")
+
+    @staticmethod
+    def write(path, content):
+        with open(path, "w") as f:
+            f.write(content)
+
+    def recorded(self, ok=True, version="v1"):
+        manifest = Manifest(self._directory.name, version)
+        manifest.record(self.source, self.target, ok)
+        manifest.save()
+        return Manifest.load(self._directory.name, version)
+
+    def test_missing(self):
+        manifest = Manifest.load(self._directory.name, "v1")
+        self.assertEqual({}, manifest.entries)
+        self.assertFalse(manifest.is_up_to_date(self.source, self.target))
+
+    def test_record(self):
+        manifest = self.recorded(ok=False)
+        entry = manifest.entries[self.source]
+        self.assertEqual(self.target, entry["target"])
+        self.assertEqual(12, entry["size"])
+        self.assertFalse(entry["ok"])
+        self.assertTrue(os.path.isfile(os.path.join(self._directory.name, MANIFEST_NAME)))
+        self.assertTrue(manifest.is_up_to_date(self.source, self.target))
+        self.assertFalse(manifest.is_ok(self.source))
+
+    def test_other_version(self):
+        self.recorded(version="v1")
+        manifest = Manifest.load(self._directory.name, "v2")
+        self.assertEqual({}, manifest.entries)
+        self.assertFalse(manifest.is_up_to_date(self.source, self.target))
+
+    def test_modified(self):
+        manifest = self.recorded()
+        self.write(self.source, "local a = 2\n")
+        os.utime(self.source, ns=(0, manifest.entries[self.source]["mtime"] + 10**9))
+        self.assertFalse(manifest.is_up_to_date(self.source, self.target))
+
+    def test_resized(self):
+        manifest = self.recorded()
+        self.write(self.source, "local a = 10\n")
+        self.assertFalse(manifest.is_up_to_date(self.source, self.target))
+
+    def test_touched(self):
+        manifest = self.recorded()
+        mtime = manifest.entries[self.source]["mtime"] + 10**9
+        os.utime(self.source, ns=(0, mtime))
+        self.assertTrue(manifest.is_up_to_date(self.source, self.target))
+        self.assertEqual(mtime, manifest.entries[self.source]["mtime"])
+
+    def test_other_target(self):
+        manifest = self.recorded()
+        self.assertFalse(manifest.is_up_to_date(self.source, self.target + ".bak"))
+
+    def test_missing_target(self):
+        manifest = self.recorded()
+        os.unlink(self.target)
+        self.assertFalse(manifest.is_up_to_date(self.source, self.target))
+
+    def test_missing_failed_target(self):
+        # a failed conversion has no output
+        manifest = self.recorded(ok=False)
+        os.unlink(self.target)
+        self.assertTrue(manifest.is_up_to_date(self.source, self.target))
+
+    def test_remove_stale(self):
+        manifest = self.recorded()
+        self.assertEqual([self.target], manifest.remove_stale())
+        self.assertEqual({}, manifest.entries)
+        self.assertFalse(os.path.exists(self.target))
+        self.assertTrue(os.path.exists(self.source))
+
+    def test_keep_seen(self):
+        manifest = self.recorded()
+        manifest.is_up_to_date(self.source, self.target)
+        self.assertEqual([], manifest.remove_stale())
+        self.assertIn(self.source, manifest.entries)
+        self.assertTrue(os.path.exists(self.target))